@@ -0,0 +1,117 @@
+"""This module provides the cached application name resolver of the Autonomous Data Collector Agent."""
+
+import threading
+
+from autonomous_data_collection_agent import config
+from autonomous_data_collection_agent.database import get_database_handler, get_database_path
+from autonomous_data_collection_agent.events import get_event_bus
+
+
+# The `AppResolver` class maps application names and short names to ids, and ids to short names,
+# from one projection read of the application database kept in memory.
+#
+# The maps are dropped by `invalidate()` on every application change event adding, removing or renaming
+# applications. The writes of other processes are seen through the external events of a
+# `DatabaseWatcher`, so the sync state updates of the scheduler never cause a read.
+class AppResolver:
+    def __init__(self) -> None:
+        """
+        The function initializes an empty resolver, the maps are read on first use.
+        """
+        self.lock = threading.Lock()
+        self._key = None
+        self._ids_by_name = {}
+        self._ids_by_short_name = {}
+        self._short_names = {}
+
+    def invalidate(self) -> None:
+        """
+        The function `invalidate` drops the cached maps.
+        """
+        with self.lock:
+            self._key = None
+
+    def _load(self) -> None:
+        key = get_database_path(config.CONFIG_FILE_PATH, 'app')
+        with self.lock:
+            if self._key == key:
+                return
+            read = get_database_handler(key).get_fields(['name', 'short_name'])
+            if read.error:
+                self._key = None
+                self._ids_by_name, self._ids_by_short_name, self._short_names = {}, {}, {}
+                return
+            self._ids_by_name = {record['name']: app_id for app_id, record in read.item_list.items()}
+            self._ids_by_short_name = {record['short_name']: app_id for app_id, record in read.item_list.items()}
+            self._short_names = {app_id: record['short_name'] for app_id, record in read.item_list.items()}
+            self._key = key
+
+    def id_by_short_name(self, short_name: str):
+        """
+        The function `id_by_short_name` returns the id of the application with the given short name.
+
+        :param short_name: The `short_name` parameter is the short name of the application
+        :type short_name: str
+        :return: the application id as a string, or `None` when no application has this short name.
+        """
+        self._load()
+        return self._ids_by_short_name.get(short_name)
+
+    def id_by_name(self, name: str):
+        """
+        The function `id_by_name` returns the id of the application with the given name.
+
+        :param name: The `name` parameter is the name of the application
+        :type name: str
+        :return: the application id as a string, or `None` when no application has this name.
+        """
+        self._load()
+        return self._ids_by_name.get(name)
+
+    def short_name_by_id(self, app_id: str):
+        """
+        The function `short_name_by_id` returns the short name of an application.
+
+        :param app_id: The `app_id` parameter is the id of the application
+        :type app_id: str
+        :return: the short name, or `None` when the application does not exist.
+        """
+        self._load()
+        return self._short_names.get(app_id)
+
+    def ids_by_short_name(self) -> dict:
+        """
+        The function `ids_by_short_name` returns the ids of every application keyed by short name.
+        :return: a new dictionary.
+        """
+        self._load()
+        return dict(self._ids_by_short_name)
+
+    def short_names(self) -> dict:
+        """
+        The function `short_names` returns the short names of every application keyed by id.
+        :return: a new dictionary.
+        """
+        self._load()
+        return dict(self._short_names)
+
+
+# Resolver shared by the whole process.
+_resolver = AppResolver()
+
+
+def _on_app_change(event) -> None:
+    # the external events of the changes of other processes do not tell the fields, they always touch
+    if event.touches(('name', 'short_name')):
+        _resolver.invalidate()
+
+
+get_event_bus().subscribe(_on_app_change, 'app')
+
+
+def get_app_resolver() -> AppResolver:
+    """
+    The function `get_app_resolver` returns the application name resolver shared by the process.
+    :return: an `AppResolver` object.
+    """
+    return _resolver
@@ -0,0 +1,262 @@
+"""This module provides the asyncio fetch engine of the Autonomous Data Collector Agent.
+
+In the `asyncio` fetch mode the scheduler runs every due endpoint as a task of one event loop instead
+of a worker thread. A sync mostly waits on the network, so one thread can keep as many requests in
+flight as `concurrent_requests` allows, each costing a small coroutine rather than a thread stack.
+
+The HTTP requests are sent with aiohttp, which is optional: `is_available()` tells whether it is
+installed and the scheduler falls back to the worker threads when it is not.
+"""
+
+import asyncio
+import json
+import logging
+import urllib.parse
+from collections import deque
+
+from autonomous_data_collection_agent.paging import page_count
+from autonomous_data_collection_agent.rate_limit import parse_retry_after
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional
+    aiohttp = None
+
+# Retry policy of the requests, the same as the one of the worker threads.
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 1
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+RETRY_METHODS = frozenset(('HEAD', 'GET', 'OPTIONS', 'POST'))
+# Statuses whose `Retry-After` header sets the wait before the retry, like urllib3.
+RETRY_AFTER_STATUSES = frozenset((413, 429, 503))
+
+# Seconds a request may take, like the socket timeout of the service.
+REQUEST_TIMEOUT = 60
+
+# Errors of a request worth retrying.
+_RETRY_ERRORS = (OSError, asyncio.TimeoutError) + ((aiohttp.ClientError,) if aiohttp is not None else ())
+
+
+def is_available() -> bool:
+    """
+    The function `is_available` tells whether the asyncio fetch mode can be used.
+    :return: `True` when aiohttp is installed.
+    """
+    return aiohttp is not None
+
+
+def backoff_time(retry: int, backoff_factor: float = RETRY_BACKOFF_FACTOR) -> float:
+    """
+    The function `backoff_time` returns the number of seconds to wait before a retry, like urllib3: no
+    wait before the first retry, then `backoff_factor` doubled at every retry.
+
+    :param retry: The `retry` parameter is the number of the retry, starting at 1
+    :type retry: int
+    :param backoff_factor: The `backoff_factor` parameter is the base of the wait
+    :type backoff_factor: float
+    :return: a number of seconds.
+    """
+    return 0 if retry <= 1 else backoff_factor * (2 ** (retry - 1))
+
+
+async def enter_host(limiter) -> None:
+    """
+    The function `enter_host` takes a connection of a host, waiting without blocking the event loop while
+    every connection is in use. The connection is given back with `limiter.leave()`.
+
+    :param limiter: The `limiter` parameter is the `HostLimiter` of the host
+    """
+    loop = asyncio.get_running_loop()
+    entered = loop.create_future()
+    # the connection can be handed over by a worker thread as well as by a task
+    if not limiter.enter_or_queue(lambda: loop.call_soon_threadsafe(entered.set_result, None)):
+        await entered
+
+
+# The `AsyncFetcher` class runs endpoint tasks on an event loop sharing one HTTP session, with at most
+# `concurrent_requests` requests in flight. Each task can have a completion callback, called with its
+# result or error like the callbacks of the `WorkerPool`.
+class AsyncFetcher:
+    def __init__(self, concurrent_requests: int = 100, session_factory=None, page_parallelism: int = 1) -> None:
+        """
+        The function initializes a fetcher.
+
+        :param concurrent_requests: The `concurrent_requests` parameter is the maximum number of requests
+        in flight at the same time
+        :type concurrent_requests: int
+        :param session_factory: The `session_factory` parameter is a callable returning the HTTP session
+        used as an async context manager, defaults to an aiohttp `ClientSession`
+        :param page_parallelism: The `page_parallelism` parameter is the maximum number of pages of an
+        endpoint requested at the same time, `1` fetching the pages one after the other
+        :type page_parallelism: int
+        """
+        self.concurrent_requests = max(1, int(concurrent_requests))
+        self.page_parallelism = max(1, int(page_parallelism))
+        self.session_factory = session_factory or self._open_session
+        self._semaphore = None
+
+    def _open_session(self):
+        if aiohttp is None:
+            raise RuntimeError('The asyncio fetch mode needs aiohttp, which is not installed')
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrent_requests),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+
+    def run(self, tasks) -> None:
+        """
+        The function `run` runs tasks on a new event loop and returns once every task and its callback
+        ran.
+
+        :param tasks: The `tasks` parameter is an iterable of `(task, on_done)` tuples. `task` is an async
+        callable taking the HTTP session, `on_done` a callable taking the result and the error of the
+        task, the error being None when the task succeeded, or None
+        """
+        tasks = list(tasks)
+        if tasks:
+            asyncio.run(self.run_async(tasks))
+
+    async def run_async(self, tasks) -> None:
+        """
+        The function `run_async` runs tasks on the running event loop, see `run()`.
+
+        :param tasks: The `tasks` parameter is an iterable of `(task, on_done)` tuples
+        """
+        self._semaphore = asyncio.Semaphore(self.concurrent_requests)
+        async with self.session_factory() as session:
+            await asyncio.gather(*(self._run_task(session, task, on_done) for task, on_done in tasks))
+
+    @staticmethod
+    async def _run_task(session, task, on_done) -> None:
+        result, error = None, None
+        try:
+            result = await task(session)
+        except Exception as e:
+            error = e
+        if on_done is not None:
+            try:
+                on_done(result, error)
+            except Exception as e:
+                logging.error(f"Completion callback {on_done!r} failed. Error Details : {str(e)}")
+        elif error is not None:
+            logging.error(f"Task {task!r} failed. Error Details : {str(error)}")
+
+    async def request(self, session, method: str, url: str, request_data: dict, headers: dict, run: dict = None, limiter=None):
+        """
+        The function `request` sends one request, retrying on the statuses of `RETRY_STATUSES` and on
+        connection errors, after the wait asked by the `Retry-After` header when there is one. A slot of
+        `concurrent_requests` is held while the request is in flight, not while waiting for a retry or
+        for the rate limits of the host.
+
+        :param session: The `session` parameter is the HTTP session
+        :param method: The `method` parameter is `GET` or `POST`
+        :type method: str
+        :param url: The `url` parameter is the URL of the endpoint, the request data is sent as the query
+        string of a `GET` request and as the JSON body of a `POST` request
+        :type url: str
+        :param request_data: The `request_data` parameter is the request data of the page
+        :type request_data: dict
+        :param headers: The `headers` parameter is the request headers
+        :type headers: dict
+        :param run: The `run` parameter is an optional dictionary counting the pages, response bytes,
+        last HTTP status and retries of the run
+        :type run: dict
+        :param limiter: The `limiter` parameter is the optional `HostLimiter` of the host, whose rate
+        limits are waited for before every attempt
+        :return: a `(status, body)` tuple, the body as bytes.
+        """
+        if method == 'POST':
+            kwargs = {'json': request_data}
+        else:
+            url = url + '?' + urllib.parse.urlencode(request_data)
+            kwargs = {}
+        retry = 0
+        while True:
+            if limiter is not None:
+                delay = limiter.request_delay()
+                if delay:
+                    await asyncio.sleep(delay)
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, headers=headers, **kwargs) as response:
+                        status, body = response.status, await response.read()
+                        if status in RETRY_AFTER_STATUSES:
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except _RETRY_ERRORS:
+                if method not in RETRY_METHODS or retry >= RETRY_TOTAL:
+                    raise
+            else:
+                if limiter is not None:
+                    limiter.received(len(body))
+                if status not in RETRY_STATUSES or method not in RETRY_METHODS or retry >= RETRY_TOTAL:
+                    break
+            retry += 1
+            if run is not None:
+                run["retries"] += 1
+            await asyncio.sleep(retry_after if retry_after is not None else backoff_time(retry))
+        if run is not None:
+            run["pages"] += 1
+            run["response_bytes"] += len(body)
+            run["http_status"] = status
+        return status, body
+
+    async def fetch_pages(self, session, method: str, url: str, request_data: dict, headers: dict, run: dict = None, limiter=None):
+        """
+        The function `fetch_pages` requests the pages of an endpoint until the `total` number of records
+        reported by the first page is received. With a `page_parallelism` above 1 the pages after the
+        first one are requested at the same time, up to `page_parallelism` of them in flight, and read in
+        page order.
+
+        :param session: The `session` parameter is the HTTP session
+        :param method: The `method` parameter is `GET` or `POST`
+        :type method: str
+        :param url: The `url` parameter is the URL of the endpoint
+        :type url: str
+        :param request_data: The `request_data` parameter is the request data without the page number
+        :type request_data: dict
+        :param headers: The `headers` parameter is the request headers
+        :type headers: dict
+        :param run: The `run` parameter is an optional dictionary counting the run, see `request()`
+        :type run: dict
+        :param limiter: The `limiter` parameter is the optional `HostLimiter` of the host
+        :return: a `(records, response_time)` tuple, `response_time` being the last time reported by the
+        source system or an empty string. Raises an exception when a page fails.
+        """
+        records = []
+        response_time = ""
+        page_number = 1
+        # requests of the next pages already in flight, in page order
+        window = deque()
+        following = None
+        try:
+            while True:
+                if window:
+                    status, body = await window.popleft()
+                else:
+                    status, body = await self.request(session, method, url, dict(request_data, page_number=page_number), headers, run, limiter)
+                if status != 200:
+                    raise Exception(f"Request to {url} failed with status code {status}")
+                response_json = json.loads(body)
+                page_data = response_json.get("data", [])
+                records.extend(page_data)
+                response_time = response_json.get("response_time", response_time)
+                # an empty page ends the sync too, so a wrong total cannot loop forever
+                if not page_data or len(records) >= response_json.get("total", 0):
+                    return records, response_time
+                if page_number == 1 and self.page_parallelism > 1:
+                    # the first page tells the number of pages left
+                    following = iter(range(2, page_count(response_json.get("total", 0), len(page_data)) + 1))
+                page_number += 1
+                while following is not None and len(window) < self.page_parallelism:
+                    next_page = next(following, None)
+                    if next_page is None:
+                        # pages past the count, when records were added meanwhile, are requested one by one
+                        following = None
+                    else:
+                        window.append(asyncio.ensure_future(self.request(session, method, url, dict(request_data, page_number=next_page), headers, run, limiter)))
+        finally:
+            for task in window:
+                if not task.cancel():
+                    # retrieves the error of a page not read, so it is not logged as never retrieved
+                    task.exception()
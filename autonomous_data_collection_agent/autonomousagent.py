@@ -6,8 +6,15 @@ import re
 import os
 import json
 import typer
-from autonomous_data_collection_agent import config, APP_NOT_FOUND, ENDPOINT_NOT_FOUND, DUPLICATE_RECORD
-from autonomous_data_collection_agent.database import DatabaseHandler, get_database_path
+from autonomous_data_collection_agent import config, SUCCESS, APP_NOT_FOUND, DB_WRITE_ERROR, ENDPOINT_NOT_FOUND, DUPLICATE_RECORD
+from contextlib import contextmanager
+from autonomous_data_collection_agent.app_resolver import get_app_resolver
+from autonomous_data_collection_agent.bulk_io import prepare_application, prepare_endpoint
+from autonomous_data_collection_agent.database import STORAGE_IO_ERRORS, get_database_handler, get_database_path
+from autonomous_data_collection_agent.events import ADDED, CHANGED, REMOVED, UPDATED, publish_change
+from autonomous_data_collection_agent.query import where
+from autonomous_data_collection_agent.rate_limit import LIMIT_FIELDS
+from autonomous_data_collection_agent.records import ApplicationRecord, EndpointRecord
 import logging  # Import the logging module
 
 logging.basicConfig(filename=config.getLogFilePath(), filemode='a', format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt="%d-%b-%y %H:%M:%S", level=logging.DEBUG)
@@ -80,6 +87,28 @@ class CurrentApplication:
     # }
 
 
+@contextmanager
+def _transaction(*models):
+    # a rolled back transaction undoes changes whose events were already published
+    try:
+        with models[0]._db_handler.transaction(*[model._db_handler for model in models[1:]]):
+            yield
+    except BaseException:
+        for item_type in {'app' if isinstance(model, Applications) else 'endpoint' for model in models}:
+            publish_change(item_type, CHANGED)
+        raise
+
+# The `BulkImport` class represents the result of a bulk import or of an `add_many` batch: the written
+# records, the rejected records with their line numbers or indexes and the error code of the write.
+class BulkImport:
+    records: dict
+    errors: list
+    error: int
+    def __init__(self, records, errors, error):
+        self.records = records
+        self.errors = errors
+        self.error = error
+
 # The `Endpoints` class provides methods for managing and manipulating endpoint data in a database.
 class Endpoints:
     def __init__(self, db_path: str) -> None:
@@ -87,11 +116,22 @@ class Endpoints:
         The function initializes an instance of a class with a database handler object.
         
         :param db_path: The `db_path` parameter is a string that represents the path to the database
-        file. It is used to initialize the `DatabaseHandler` object, which will handle all the
+        file. It is used to get the shared `DatabaseHandler` object, which will handle all the
         interactions with the database
         :type db_path: str
         """
-        self._db_handler = DatabaseHandler(db_path)
+        self._db_handler = get_database_handler(db_path)
+
+    def transaction(self, *models):
+        """
+        The function `transaction` returns a context manager grouping the operations made inside it on
+        the endpoints, and on the databases of the other given models, into one load and one commit.
+        
+        :param models: The `models` parameter is any number of other `Endpoints` or `Applications`
+        objects whose databases take part in the transaction
+        :return: a context manager.
+        """
+        return _transaction(self, *models)
     
     def validate_endpoint_data(self, data: dict):
         """
@@ -176,9 +216,9 @@ class Endpoints:
                 raise typer.Exit(1)
             
         if data["last_sync"] is not None:
-            if not (isinstance(data["last_sync"], str) or isinstance(data["last_sync"], datetime)):
+            if not isinstance(data["last_sync"], (str, datetime, int, float)):
                 typer.secho(
-                    "Endpoint last sync must be of type string", fg=typer.colors.RED
+                    "Endpoint last sync must be a datetime string or timestamp", fg=typer.colors.RED
                 )
                 raise typer.Exit(1)
         
@@ -257,12 +297,7 @@ class Endpoints:
             assert filter['operator'] in [">", "<", "=", ">=", "<=", "!=", "<>"], "Invalid operator. Only '>', '<', '=', '>=', '<=', '!=', '<>' are allowed."
             datetime.strptime(filter['column_value'], '%d-%m-%Y %H:%M:%S')  # This will raise a ValueError if the date format is incorrect
 
-        app_handler = DatabaseHandler(get_database_path(config.CONFIG_FILE_PATH, 'app'))
-        try:
-            app_id = str(next(iter(app_handler.get_by_column('short_name', app_short_name).item_list)))
-        except IndexError:
-            return CurrentEndpoint({}, APP_NOT_FOUND)
-        
+        app_id = get_app_resolver().id_by_short_name(app_short_name)
         if not app_id:
             return CurrentEndpoint({}, APP_NOT_FOUND)
     
@@ -277,7 +312,7 @@ class Endpoints:
             "last_sync": last_sync,
             "process_status": process_status,
             "failed_count": 0,
-            "failed_time": "",
+            "failed_time": None,
             "status": status
         }
 
@@ -289,7 +324,64 @@ class Endpoints:
             return CurrentEndpoint({}, DUPLICATE_RECORD)
         
         read = self._db_handler.add_item(endpoint)
+        if not read.error:
+            publish_change('endpoint', ADDED, read.item_list)
         return CurrentEndpoint(endpoint, read.error)
+
+    def add_many(self, endpoints: list[dict], atomic: bool = False) -> BulkImport:
+        """
+        The function `add_many` validates a batch of endpoints in one pass and adds the valid ones with a
+        single write. The applications are resolved once for the whole batch and the duplicates, against
+        the stored endpoints and within the batch, are found with a set of `(app_id, name)` pairs.
+        
+        :param endpoints: The `endpoints` parameter is a list of endpoint dictionaries with the fields of
+        `add()`. An endpoint gives its application by `app_short_name` or by `app_id`, the missing optional
+        fields get the defaults of `add-endpoint`
+        :type endpoints: list[dict]
+        :param atomic: The `atomic` parameter tells whether no endpoint is added when any is rejected
+        :type atomic: bool
+        :return: an instance of the `BulkImport` class whose errors are `(index, message)` tuples.
+        """
+        return self._add_batch(enumerate(endpoints), atomic)
+
+    def import_endpoints(self, records) -> BulkImport:
+        """
+        The function `import_endpoints` validates a batch of endpoints and adds them all with a single
+        write, or none of them when any endpoint is rejected.
+        
+        :param records: The `records` parameter is an iterable of `(line_number, endpoint)` tuples, as
+        given by `bulk_io.read_records()`. An endpoint gives its application by `app_short_name` or by
+        `app_id`, and a `ValueError` in place of an endpoint rejects its line
+        :return: an instance of the `BulkImport` class.
+        """
+        return self._add_batch(records, atomic=True)
+
+    def _add_batch(self, records, atomic: bool) -> BulkImport:
+        app_ids = get_app_resolver().ids_by_short_name()
+        known_app_ids = set(app_ids.values())
+        # (app_id, name) of the stored endpoints and of the ones accepted so far
+        names = {(record['app_id'], record['name']) for record in self.get_endpoint_fields(['app_id', 'name']).values()}
+        endpoints = []
+        errors = []
+        for line_number, record in records:
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                endpoint = prepare_endpoint(record, app_ids, known_app_ids)
+                key = (endpoint['app_id'], endpoint['name'])
+                if key in names:
+                    raise ValueError(f"duplicate endpoint '{endpoint['name']}' for application #{endpoint['app_id']}")
+            except ValueError as error:
+                errors.append((line_number, str(error)))
+                continue
+            names.add(key)
+            endpoints.append(endpoint)
+        if (errors and atomic) or not endpoints:
+            return BulkImport({}, errors, SUCCESS)
+        write = self._db_handler.write_items(endpoints)
+        if not write.error:
+            publish_change('endpoint', ADDED, write.item_list)
+        return BulkImport(write.item_list if not write.error else {}, errors, write.error)
             
 
     def get_endpoint_list(self) -> list[dict]:
@@ -351,7 +443,7 @@ class Endpoints:
         :return: an instance of the `CurrentEndpoint` class.
         """
 
-        read = self._db_handler.get_by_query(lambda x: x['app_id'] == app_id and x['name'] == name)
+        read = self._db_handler.get_by_columns({'app_id': app_id, 'name': name})
         if read.error:
             return CurrentEndpoint({}, read.error)
         try:
@@ -381,13 +473,84 @@ class Endpoints:
         """
         The function `get_endpoints_by_query` returns a list of endpoints filtered by a custom query.
         
-        :param query: A string representing the custom query to filter the endpoint list
-        :type query: str
+        :param query: A `Query` built with `where()` representing the custom query to filter the
+        endpoint list
+        :type query: Query
         :return: a list of dictionaries.
         """
         read = self._db_handler.get_by_query(query_str=query)
         return read.item_list
     
+    def get_endpoints_by_columns(self, values: dict) -> dict:
+        """
+        The function `get_endpoints_by_columns` returns the endpoints whose columns equal the given
+        values, using the storage engine indexes.
+        
+        :param values: The `values` parameter is a dictionary of column names and values to match, for
+        example `{'app_id': app_id, 'status': 1, 'process_status': 2}`
+        :type values: dict
+        :return: a dictionary of endpoints keyed by id.
+        """
+        read = self._db_handler.get_by_columns(values)
+        return read.item_list
+
+    def get_endpoint_fields(self, fields: list, query=None, values: dict = None) -> dict:
+        """
+        The function `get_endpoint_fields` returns only the given fields of the endpoints, optionally
+        filtered by a query or column values.
+        
+        :param fields: The `fields` parameter is the list of endpoint fields to return
+        :type fields: list
+        :param query: The `query` parameter is an optional `Query` built with `where()`
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: a dictionary of partial endpoints keyed by id.
+        """
+        read = self._db_handler.get_fields(fields, query_str=query, values=values)
+        return read.item_list
+
+    def get_endpoint_records(self, query=None, values: dict = None) -> dict:
+        """
+        The function `get_endpoint_records` returns the endpoints as compact `EndpointRecord` objects,
+        optionally filtered by a query or column values. They take less memory than the dictionaries
+        returned by the other reads and are meant for code holding many endpoints, like the scheduler.
+        
+        :param query: The `query` parameter is an optional `Query` built with `where()`
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: a dictionary of `EndpointRecord` objects keyed by id.
+        """
+        read = self._db_handler.get_records(EndpointRecord.from_record, query_str=query, values=values)
+        return read.item_list
+
+    def get_status_counts(self, app_id: str) -> dict:
+        """
+        The function `get_status_counts` returns how many endpoints of an application are in each
+        `(status, process_status)`, from counters the store keeps up to date on every mutation.
+        
+        :param app_id: The `app_id` parameter is the id of the application
+        :type app_id: str
+        :return: a dictionary of counts keyed by `(status, process_status)` tuples.
+        """
+        read = self._db_handler.group_counts('app_id', app_id)
+        return read.item_list[0] if not read.error else {}
+
+    def count_endpoints(self, query=None, values: dict = None) -> int:
+        """
+        The function `count_endpoints` returns the number of endpoints, optionally filtered by a query or
+        column values, without reading them.
+        
+        :param query: The `query` parameter is an optional `Query` built with `where()`
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match, for example `{'app_id': app_id, 'status': 1}`
+        :type values: dict
+        :return: the number of endpoints.
+        """
+        read = self._db_handler.count(query_str=query, values=values)
+        return read.item_list[0] if not read.error else 0
+    
     def get_app_endpoints(self, app_short_name: str):
         """
         The function `get_app_endpoints` returns the current endpoint list for a given application short
@@ -399,12 +562,7 @@ class Endpoints:
         :return: a list of dictionaries, which represents the current endpoint list for the specified
         application.
         """
-        app_handler = DatabaseHandler(get_database_path(config.CONFIG_FILE_PATH, 'app'))
-        try:
-            app_id = str(next(iter(app_handler.get_by_column('short_name', app_short_name).item_list)))
-        except IndexError:
-            return CurrentEndpoint({}, APP_NOT_FOUND)
-        
+        app_id = get_app_resolver().id_by_short_name(app_short_name)
         if app_id:
             read = self._db_handler.get_by_column('app_id', app_id)
             return read.item_list
@@ -425,17 +583,9 @@ class Endpoints:
         :return: a list of dictionaries that represent the current endpoint list for an application
         filtered by process status.
         """
-        
-        app_handler = DatabaseHandler(get_database_path(config.CONFIG_FILE_PATH, 'app'))
-        all_apps = app_handler.get_by_column('short_name', app_short_name).item_list
-        try:
-            if all_apps:
-                app_id = str(next(iter(app_handler.get_by_column('short_name', app_short_name).item_list)))
-        except IndexError:
-            return CurrentEndpoint({}, APP_NOT_FOUND)
-        
+        app_id = get_app_resolver().id_by_short_name(app_short_name)
         if app_id:
-            read = self._db_handler.get_by_query(lambda x: x['app_id'] == app_id and x['process_status'] == process_status)
+            read = self._db_handler.get_by_columns({'app_id': app_id, 'process_status': process_status})
             return read.item_list
         return CurrentEndpoint({}, APP_NOT_FOUND)
     
@@ -454,15 +604,9 @@ class Endpoints:
         :return: a list of dictionaries that represent the current endpoint list for an application
         filtered by status.
         """
-        
-        app_handler = DatabaseHandler(get_database_path(config.CONFIG_FILE_PATH, 'app'))
-        try:
-            app_id = next(iter(app_handler.get_by_column('short_name', app_short_name).item_list))
-        except IndexError:
-            return CurrentEndpoint({}, APP_NOT_FOUND)
-        
+        app_id = get_app_resolver().id_by_short_name(app_short_name)
         if app_id:
-            read = self._db_handler.get_by_query(lambda x: x['app_id'] == app_id and x['status'] == status)
+            read = self._db_handler.get_by_columns({'app_id': app_id, 'status': status})
             return read.item_list
         return CurrentEndpoint({}, APP_NOT_FOUND)
     
@@ -498,10 +642,9 @@ class Endpoints:
         if duplicate_endpoint_obj.endpoint and next(iter(duplicate_endpoint_obj.endpoint)) != ENDPOINT_ID:
             return CurrentEndpoint({}, DUPLICATE_RECORD)
 
-        if type(endpoint["last_sync"]) is datetime:
-           endpoint["last_sync"] = str(endpoint["last_sync"])
-
         write = self._db_handler.update_by_id(ENDPOINT_ID, data=endpoint)
+        if not write.error:
+            publish_change('endpoint', UPDATED, [ENDPOINT_ID], data)
         return CurrentEndpoint(endpoint, write.error)
     
     def update_endpoint_status(self, ENDPOINT_ID: str, status: int) -> CurrentEndpoint:
@@ -528,6 +671,8 @@ class Endpoints:
             return CurrentEndpoint({}, ENDPOINT_NOT_FOUND)
         endpoint.update({'status': status})
         write = self._db_handler.update_by_id(ENDPOINT_ID, data={'status': status})
+        if not write.error:
+            publish_change('endpoint', UPDATED, [ENDPOINT_ID], ('status',))
         return CurrentEndpoint(endpoint, write.error)
     
     def update_endpoint_process_status(self, ENDPOINT_ID: int, process_status: int) -> CurrentEndpoint:
@@ -553,6 +698,8 @@ class Endpoints:
             return CurrentEndpoint({}, ENDPOINT_NOT_FOUND)
         endpoint.update({'process_status': process_status})
         write = self._db_handler.update_by_id(ENDPOINT_ID, data={'process_status': process_status})
+        if not write.error:
+            publish_change('endpoint', UPDATED, [ENDPOINT_ID], ('process_status',))
         return CurrentEndpoint(endpoint, write.error)
     
     def update_endpoints_by_query(self, query_str: str, data: dict):
@@ -560,19 +707,21 @@ class Endpoints:
         The function `update_endpoints_by_query` updates endpoints based on a query string and returns
         the updated endpoints.
         
-        :param query_str: The query string used to filter the endpoints that need to be updated. It is a
-        string representation of a lambda function that takes a dictionary as input and returns a
-        boolean value. The lambda function is used to define the conditions for updating the endpoints
-        :type query_str: str
+        :param query_str: The query used to filter the endpoints that need to be updated. It is a `Query`
+        built with `where()`, or a lambda function that takes a dictionary as input and returns a
+        boolean value
+        :type query_str: Query
         :param data: A dictionary containing the updated values for the endpoints
         :type data: dict
         :return: a list of updated endpoints.
         """
 
-        # query_str = lambda x: x['app_id'] == app_id and x['process_status'] == status
+        # query_str = (where('app_id') == app_id) & (where('process_status') == status)
         write = self._db_handler.update_by_query(query_str=query_str, data=data)
         if write.error:
             return CurrentEndpoint({}, write.error)
+        if write.item_list:
+            publish_change('endpoint', UPDATED, write.item_list, data)
     
         return write.item_list
 
@@ -588,6 +737,7 @@ class Endpoints:
         write = self._db_handler.delete_by_id(ENDPOINT_ID)
         if write.error:
             return CurrentEndpoint({}, write.error)
+        publish_change('endpoint', REMOVED, [ENDPOINT_ID])
         
         return CurrentEndpoint(ENDPOINT_ID, write.error)
 
@@ -598,6 +748,7 @@ class Endpoints:
         """
         
         write = self._db_handler.purge()
+        publish_change('endpoint', REMOVED)
         return CurrentEndpoint({}, write.error)
     
     def remove_all_by_app(self, app_short_name: str):
@@ -611,17 +762,15 @@ class Endpoints:
         `item_list` and `error`. The `item_list` attribute contains the list of deleted endpoints, and
         the `error` attribute contains any error message that occurred during the deletion process.
         """
-
-        app_handler = DatabaseHandler(get_database_path(config.CONFIG_FILE_PATH, 'app'))
-        try:
-            app_id = next(iter(app_handler.get_by_column('short_name', app_short_name).item_list))
-        except IndexError:
+        app_id = get_app_resolver().id_by_short_name(app_short_name)
+        if not app_id:
             return CurrentEndpoint({}, APP_NOT_FOUND)
-        write = self._db_handler.delete_by_query(lambda x: x['app_id'] == app_id)
+        write = self._db_handler.delete_by_query(where('app_id') == app_id)
 
         if write.error:
             return CurrentEndpoint({}, write.error)
         else:
+            publish_change('endpoint', REMOVED, write.item_list)
             return CurrentEndpoint(write.item_list, write.error)
 
 # The `Applications` class is a Python class that provides methods for managing applications in a
@@ -632,11 +781,24 @@ class Applications:
         The function initializes an instance of a class with a database handler object.
         
         :param db_path: The `db_path` parameter is a string that represents the path to the database
-        file. It is used to initialize the `DatabaseHandler` object, which will handle all the
+        file. It is used to get the shared `DatabaseHandler` object, which will handle all the
         interactions with the database
         :type db_path: str
         """
-        self._db_handler = DatabaseHandler(db_path)
+        self._db_handler = get_database_handler(db_path)
+        # the databases created before the host limits existed get them, with their defaults
+        self._db_handler.add_fields(LIMIT_FIELDS)
+
+    def transaction(self, *models):
+        """
+        The function `transaction` returns a context manager grouping the operations made inside it on
+        the applications, and on the databases of the other given models, into one load and one commit.
+        
+        :param models: The `models` parameter is any number of other `Endpoints` or `Applications`
+        objects whose databases take part in the transaction
+        :return: a context manager.
+        """
+        return _transaction(self, *models)
     
     def is_valid_cronjob(self, sync_frequency):
         """
@@ -768,16 +930,16 @@ class Applications:
         
         if data["last_sync"] is not None:
             print(type(data["last_sync"]), data["last_sync"])
-            if not (isinstance(data["last_sync"], str) or isinstance(data["last_sync"], datetime)):
+            if not isinstance(data["last_sync"], (str, datetime, int, float)):
                 typer.secho(
-                    "App last sync must be of type string", fg=typer.colors.RED
+                    "App last sync must be a datetime string or timestamp", fg=typer.colors.RED
                 )
                 raise typer.Exit(1)
         
         if data["next_sync"] is not None:
-            if not (isinstance(data["next_sync"], str) or isinstance(data["next_sync"], datetime)):
+            if not isinstance(data["next_sync"], (str, datetime, int, float)):
                 typer.secho(
-                    "App next sync must be of type string", fg=typer.colors.RED
+                    "App next sync must be a datetime string or timestamp", fg=typer.colors.RED
                 )
                 raise typer.Exit(1)
 
@@ -843,11 +1005,20 @@ class Applications:
                     "App status must be of type integer", fg=typer.colors.RED
                 )
                 raise typer.Exit(1)
+
+        # the host limits are missing from the applications created before they existed
+        for field, expected in (("max_connections", int), ("rate_limit", (int, float)), ("byte_rate_limit", int)):
+            if data.get(field) is not None:
+                if isinstance(data[field], bool) or not isinstance(data[field], expected) or data[field] < 0:
+                    typer.secho(
+                        f"App {field} must be a positive number, or 0 for no limit", fg=typer.colors.RED
+                    )
+                    raise typer.Exit(1)
             
         return True
 
 
-    def add(self, name: str, short_name: str, host: str, url_scheme: str, auth_type: str, auth_data: dict, dump_path: str, sync_frequency: str, last_sync: datetime, next_sync: datetime, default_payload: dict, default_filters: list[dict], default_page_size: int, process_status: int, status: int ) -> CurrentApplication:
+    def add(self, name: str, short_name: str, host: str, url_scheme: str, auth_type: str, auth_data: dict, dump_path: str, sync_frequency: str, last_sync: datetime, next_sync: datetime, default_payload: dict, default_filters: list[dict], default_page_size: int, process_status: int, status: int, max_connections: int = 0, rate_limit: float = 0, byte_rate_limit: int = 0 ) -> CurrentApplication:
         """
         The function adds a new application to the database with various parameters and performs
         validation checks.
@@ -901,6 +1072,15 @@ class Applications:
         :param status: The "status" parameter is an integer that represents the status of the
         application. It can have one of the following values:
         :type status: int
+        :param max_connections: The `max_connections` parameter is the maximum number of endpoints of
+        the host of the application synced at the same time, `0` for no limit
+        :type max_connections: int
+        :param rate_limit: The `rate_limit` parameter is the maximum number of requests per second sent
+        to the host of the application, `0` for no limit
+        :type rate_limit: float
+        :param byte_rate_limit: The `byte_rate_limit` parameter is the maximum number of response bytes
+        per second received from the host of the application, `0` for no limit
+        :type byte_rate_limit: int
         :return: an instance of the `CurrentApplication` class, along with an error code.
         """
 
@@ -943,20 +1123,80 @@ class Applications:
             "default_filters": default_filters,
             "default_page_size": default_page_size,
             "process_status": process_status,
-            "status": status
+            "status": status,
+            "max_connections": max_connections,
+            "rate_limit": rate_limit,
+            "byte_rate_limit": byte_rate_limit
         }
 
         self.validate_app_data(application)
-        duplicate_app_name_object = self.get_app_by_name(name) 
-        duplicate_app_short_name_object = self.get_app_by_short_name(short_name)
-
-        if duplicate_app_name_object.application or duplicate_app_short_name_object.application:
+        resolver = get_app_resolver()
+        if resolver.id_by_name(name) or resolver.id_by_short_name(short_name):
             return CurrentApplication({}, DUPLICATE_RECORD)
         app_result = self._db_handler.add_item(application)
+        if not app_result.error:
+            publish_change('app', ADDED, app_result.item_list)
         application = app_result.item_list
         error = app_result.error
         return CurrentApplication(application, error)
 
+    def add_many(self, applications: list[dict], atomic: bool = False) -> BulkImport:
+        """
+        The function `add_many` validates a batch of applications in one pass and adds the valid ones
+        with a single write. Duplicate names and short names, against the stored applications and within
+        the batch, are found with sets. The dump directories are created before the write.
+        
+        :param applications: The `applications` parameter is a list of application dictionaries with the
+        fields of `add()`, the missing optional fields get the defaults of `add-app`
+        :type applications: list[dict]
+        :param atomic: The `atomic` parameter tells whether no application is added when any is rejected
+        :type atomic: bool
+        :return: an instance of the `BulkImport` class whose errors are `(index, message)` tuples.
+        """
+        return self._add_batch(enumerate(applications), atomic)
+
+    def import_apps(self, records) -> BulkImport:
+        """
+        The function `import_apps` validates a batch of applications and adds them all with a single
+        write, or none of them when any application is rejected. The dump directories are created once
+        the whole batch is accepted.
+        
+        :param records: The `records` parameter is an iterable of `(line_number, application)` tuples,
+        as given by `bulk_io.read_records()`. A `ValueError` in place of an application rejects its line
+        :return: an instance of the `BulkImport` class.
+        """
+        return self._add_batch(records, atomic=True)
+
+    def _add_batch(self, records, atomic: bool) -> BulkImport:
+        stored = self.get_app_fields(['name', 'short_name']).values()
+        names = {record['name'] for record in stored}
+        short_names = {record['short_name'] for record in stored}
+        applications = []
+        errors = []
+        for line_number, record in records:
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                application = prepare_application(record)
+                if application['name'] in names:
+                    raise ValueError(f"duplicate application name '{application['name']}'")
+                if application['short_name'] in short_names:
+                    raise ValueError(f"duplicate application short name '{application['short_name']}'")
+            except ValueError as error:
+                errors.append((line_number, str(error)))
+                continue
+            names.add(application['name'])
+            short_names.add(application['short_name'])
+            applications.append(application)
+        if (errors and atomic) or not applications:
+            return BulkImport({}, errors, SUCCESS)
+        for dump_path in {application['dump_path'] for application in applications}:
+            self.check_and_create_directory(dump_path)
+        write = self._db_handler.write_items(applications)
+        if not write.error:
+            publish_change('app', ADDED, write.item_list)
+        return BulkImport(write.item_list if not write.error else {}, errors, write.error)
+
 
     def get_applications(self) -> list[dict]:
         """
@@ -1030,7 +1270,7 @@ class Applications:
         :type status: int
         :return: a list of dictionaries.
         """
-        read = self._db_handler.get_by_query(lambda x: x['status'] == status)
+        read = self._db_handler.get_by_columns({'status': status})
         return read.item_list
     
     def get_app_by_query(self, query: str) -> list[dict]:
@@ -1038,15 +1278,60 @@ class Applications:
         The function `get_app_by_query` returns a filtered list of applications based on a custom query.
         
         :param query: The `query` parameter is a string that represents a custom query to filter the
-        current application list. It is used to retrieve specific applications based on certain criteria
-        :type query: str
+        current application list. It is a `Query` built with `where()` used to retrieve specific
+        applications based on certain criteria
+        :type query: Query
         :return: a list of dictionaries.
         """
-        # query_str = lambda x: x['id'] == app_id and x['process_status'] == status
+        # query_str = (where('short_name') == short_name) & (where('process_status') == status)
         
         read = self._db_handler.get_by_query(query_str=query)
         return read.item_list
 
+    def get_app_fields(self, fields: list, query=None, values: dict = None) -> dict:
+        """
+        The function `get_app_fields` returns only the given fields of the applications, optionally
+        filtered by a query or column values.
+        
+        :param fields: The `fields` parameter is the list of application fields to return
+        :type fields: list
+        :param query: The `query` parameter is an optional `Query` built with `where()`
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: a dictionary of partial applications keyed by id.
+        """
+        read = self._db_handler.get_fields(fields, query_str=query, values=values)
+        return read.item_list
+
+    def get_app_records(self, query=None, values: dict = None) -> dict:
+        """
+        The function `get_app_records` returns the applications as compact `ApplicationRecord` objects,
+        optionally filtered by a query or column values.
+        
+        :param query: The `query` parameter is an optional `Query` built with `where()`
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: a dictionary of `ApplicationRecord` objects keyed by id.
+        """
+        read = self._db_handler.get_records(ApplicationRecord.from_record, query_str=query, values=values)
+        return read.item_list
+
+    def count_apps(self, query=None, values: dict = None) -> int:
+        """
+        The function `count_apps` returns the number of applications, optionally filtered by a query or
+        column values, without reading them.
+        
+        :param query: The `query` parameter is an optional `Query` built with `where()`
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: the number of applications.
+        """
+        read = self._db_handler.count(query_str=query, values=values)
+        return read.item_list[0] if not read.error else 0
+
     def get_app_by_process_status(self, process_status: int) -> list[dict]:
         """
         The function returns a list of current applications filtered by process status.
@@ -1058,7 +1343,7 @@ class Applications:
         :return: a list of dictionaries.
         """
     
-        read = self._db_handler.get_by_query(lambda x: x['process_status'] == process_status and x['status']==1)
+        read = self._db_handler.get_by_columns({'process_status': process_status, 'status': 1})
         return read.item_list
     
     def update_app(self, APP_ID: str, data: dict) -> CurrentApplication:
@@ -1075,40 +1360,39 @@ class Applications:
         :type data: dict
         :return: an instance of the `CurrentApplication` class.
         """
-        read = self._db_handler.get_by_id(APP_ID)
-        if read.error:
-            return CurrentApplication({}, read.error)
+        # one load and one write for the reads and the update below
         try:
-            application = read.item_list[0]
-        except IndexError:
-            return CurrentApplication({}, APP_NOT_FOUND)
-        
-        application.update(data)
-
-        self.validate_app_data(application)
+            with self.transaction():
+                read = self._db_handler.get_by_id(APP_ID)
+                if read.error:
+                    return CurrentApplication({}, read.error)
+                try:
+                    application = read.item_list[0]
+                except IndexError:
+                    return CurrentApplication({}, APP_NOT_FOUND)
+        
+                application.update(data)
 
-        duplicate_app_name_object = self.get_app_by_name(application["name"]) 
-        duplicate_app_short_name_object = self.get_app_by_short_name(application["short_name"])
+                self.validate_app_data(application)
 
-        if (duplicate_app_name_object.application and next(iter(duplicate_app_name_object.application)) != APP_ID)  or (duplicate_app_short_name_object.application and next(iter(duplicate_app_short_name_object.application)) != APP_ID):
-            return CurrentApplication({}, DUPLICATE_RECORD)
-        
-        if type(application["default_payload"]) is str:
-            application["default_payload"] = json.loads(application["default_payload"])
-        if type(application["default_filters"]) is str:
-           application["default_filters"] = json.loads(application["default_filters"])
+                resolver = get_app_resolver()
+                if resolver.id_by_name(application["name"]) not in (None, APP_ID) or resolver.id_by_short_name(application["short_name"]) not in (None, APP_ID):
+                    return CurrentApplication({}, DUPLICATE_RECORD)
         
-        if type(application["auth_data"]) is str:
-           application["auth_data"] = json.loads(application["auth_data"])
-
-        if type(application["last_sync"]) is datetime:
-           application["last_sync"] = str(application["last_sync"])
+                if type(application["default_payload"]) is str:
+                    application["default_payload"] = json.loads(application["default_payload"])
+                if type(application["default_filters"]) is str:
+                   application["default_filters"] = json.loads(application["default_filters"])
         
-        if type(application["next_sync"]) is datetime:
-           application["next_sync"] = str(application["next_sync"])
+                if type(application["auth_data"]) is str:
+                   application["auth_data"] = json.loads(application["auth_data"])
 
-        write = self._db_handler.update_by_id(APP_ID, data=application)
-        return CurrentApplication(application, write.error)
+                write = self._db_handler.update_by_id(APP_ID, data=application)
+                if not write.error:
+                    publish_change('app', UPDATED, [APP_ID], data)
+                return CurrentApplication(application, write.error)
+        except STORAGE_IO_ERRORS:
+            return CurrentApplication({}, DB_WRITE_ERROR)
     
     def update_app_status(self, APP_ID: str, status: int) -> CurrentApplication:
         """# The above code is likely updating an application. However, without more context
@@ -1135,6 +1419,8 @@ class Applications:
             return CurrentApplication({}, APP_NOT_FOUND)
         application.update({'status': status})
         write = self._db_handler.update_by_id(APP_ID, data={'status': status})
+        if not write.error:
+            publish_change('app', UPDATED, [APP_ID], ('status',))
         return CurrentApplication(application, write.error)
     
     def update_app_process_status(self, APP_ID: int, process_status: int) -> CurrentApplication:
@@ -1158,6 +1444,8 @@ class Applications:
             return CurrentApplication({}, APP_NOT_FOUND)
         application.update({'process_status': process_status})
         write = self._db_handler.update_by_id(APP_ID, data={'process_status': process_status})
+        if not write.error:
+            publish_change('app', UPDATED, [APP_ID], ('process_status',))
         return CurrentApplication(application, write.error)
     
     def update_app_by_query(self, query_str: str, data: dict) -> list:
@@ -1165,15 +1453,17 @@ class Applications:
         The function updates applications based on a query string and returns a list of updated items.
         
         :param query_str: The query string used to filter the applications that need to be updated. It
-        is a string representation of a lambda function that takes an application object as input and
-        returns a boolean value indicating whether the application should be updated or not
-        :type query_str: str
+        is a `Query` built with `where()`, or a lambda function that takes an application object as input
+        and returns a boolean value indicating whether the application should be updated or not
+        :type query_str: Query
         :param data: A dictionary containing the updated data for the applications that match the query
         :type data: dict
         :return: a list of items that were updated in the database.
         """
-        # query_str = lambda x: x['id'] == app_id and x['process_status'] == status
+        # query_str = (where('short_name') == short_name) & (where('process_status') == status)
         write = self._db_handler.update_by_query(query_str=query_str, data=data)    
+        if write.item_list:
+            publish_change('app', UPDATED, write.item_list, data)
         return write.item_list
     
     def delete_app_by_query(self, query_str: str) -> list:
@@ -1186,8 +1476,10 @@ class Applications:
         :type query_str: str
         :return: a list of items that were deleted.
         """
-        # query_str = lambda x: x['id'] == app_id and x['process_status'] == status
+        # query_str = (where('short_name') == short_name) & (where('process_status') == status)
         write = self._db_handler.delete_by_query(query_str=query_str)    
+        if write.item_list:
+            publish_change('app', REMOVED, write.item_list)
         return write.item_list
 
     def remove(self, APP_ID: int) -> CurrentApplication:
@@ -1201,7 +1493,8 @@ class Applications:
         `error` attribute from the `write` object as the error.
         """
         write = self._db_handler.delete_by_id(APP_ID)
-        
+        if not write.error:
+            publish_change('app', REMOVED, [APP_ID])
         return CurrentApplication({}, write.error)
 
     def remove_all(self) -> CurrentApplication:
@@ -1210,6 +1503,7 @@ class Applications:
         :return: an instance of the `CurrentApplication` class.
         """
         write = self._db_handler.purge()
+        publish_change('app', REMOVED)
         return CurrentApplication({}, write.error)
 
 def get_application_id_by_short_name(app_short_name) -> str:
@@ -1221,18 +1515,7 @@ def get_application_id_by_short_name(app_short_name) -> str:
     an application
     :return: the application ID associated with the given application short name.
     """
-    applications = Applications(get_database_path(config.CONFIG_FILE_PATH, 'app'))
-    app_response = applications.get_app_by_short_name(app_short_name)
-    application = app_response.application
-    error = app_response.error
-
-    if error:
-        return str(error)
-    else:
-        if len(application.keys()):
-            return list(application.keys())[0]
-        else:
-            return ''
+    return get_app_resolver().id_by_short_name(app_short_name) or ''
     
 def get_endpoint_id_by_name(endpoint_name):
     """
@@ -0,0 +1,305 @@
+"""This module provides the bulk import and export of applications and endpoints of the Autonomous Data Collector Agent.
+
+Records are streamed from and to JSON Lines files (one JSON object per line) or CSV files (one row per
+record, with a header row). In CSV files, the dict and list fields are written as JSON strings and empty
+cells stand for missing values. Datetimes are read as timestamps or `'DD-MM-YYYY hh:mm:ss'` strings and
+exported as timestamps.
+"""
+
+import csv
+import json
+import re
+
+from autonomous_data_collection_agent.normalize import FLOAT_FIELDS, INT_FIELDS, JSON_FIELDS, parse_datetime, to_timestamp
+
+# Supported file formats and the file extensions they are detected from.
+FILE_FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv'}
+
+# Stored fields of an endpoint with their default values, in export column order.
+ENDPOINT_FIELDS = {
+    'app_id': None,
+    'name': None,
+    'url_endpoint': None,
+    'method': 'GET',
+    'payload': {},
+    'filters': [],
+    'page_size': 1000,
+    'last_sync': None,
+    'process_status': 0,
+    'failed_count': 0,
+    'failed_time': None,
+    'status': 1,
+}
+
+# Stored fields of an application with their default values, in export column order.
+APP_FIELDS = {
+    'name': None,
+    'short_name': None,
+    'host': None,
+    'url_scheme': 'https',
+    'auth_type': 'NONE',
+    'auth_data': {},
+    'dump_path': None,
+    'sync_frequency': '0 23 * * *',
+    'last_sync': None,
+    'next_sync': None,
+    'default_payload': {},
+    'default_filters': [],
+    'default_page_size': 1000,
+    'process_status': 0,
+    'status': 1,
+    'max_connections': 0,
+    'rate_limit': 0.0,
+    'byte_rate_limit': 0,
+}
+
+# Endpoint column holding the short name of the application, resolved to `app_id` on import.
+APP_SHORT_NAME_FIELD = 'app_short_name'
+
+FILTER_COLUMNS = ('CREATED_AT', 'UPDATED_AT', 'DELETED_AT')
+FILTER_OPERATORS = ('>', '<', '=', '>=', '<=', '!=', '<>')
+
+# Allowed values as sets, checked once per record of a batch.
+_FILTER_COLUMN_SET = frozenset(FILTER_COLUMNS)
+_FILTER_OPERATOR_SET = frozenset(FILTER_OPERATORS)
+_METHODS = frozenset(('GET', 'POST'))
+_URL_SCHEMES = frozenset(('http', 'https'))
+_AUTH_TYPES = frozenset(('NONE', 'KEYCLOAK', 'BASIC'))
+_STATUSES = (0, 1, 2)
+CRON_REGEX = re.compile(r'^\S+\s+\S+\s+\S+\s+\S+\s+\S+$')
+
+
+def detect_format(path: str, file_format: str = None) -> str:
+    """
+    The function `detect_format` returns the format of a bulk file.
+
+    :param path: The `path` parameter is the path of the file
+    :type path: str
+    :param file_format: The `file_format` parameter is the format given by the user, if any
+    :type file_format: str
+    :return: `'jsonl'` or `'csv'`.
+    """
+    if file_format:
+        return file_format
+    for extension, detected in FILE_FORMATS.items():
+        if path.lower().endswith(extension):
+            return detected
+    raise ValueError(f"Cannot detect the format of {path}, use a .jsonl or .csv file or give the format")
+
+
+def read_records(path: str, file_format: str):
+    """
+    The function `read_records` streams the records of a bulk file, one at a time.
+
+    :param path: The `path` parameter is the path of the file
+    :type path: str
+    :param file_format: The `file_format` parameter is `'jsonl'` or `'csv'`
+    :type file_format: str
+    :return: a generator of `(line_number, record)` tuples. CSV cells are given as strings, with the
+    empty cells left out.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+            return
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.decoder.JSONDecodeError as error:
+                yield line_number, ValueError(f"invalid JSON: {error.msg}")
+                continue
+            if not isinstance(record, dict):
+                yield line_number, ValueError("a line must hold a single JSON object")
+                continue
+            yield line_number, record
+
+
+def write_records(path: str, file_format: str, records, fields: list) -> int:
+    """
+    The function `write_records` streams records to a bulk file.
+
+    :param path: The `path` parameter is the path of the file
+    :type path: str
+    :param file_format: The `file_format` parameter is `'jsonl'` or `'csv'`
+    :type file_format: str
+    :param records: The `records` parameter is an iterable of record dictionaries
+    :param fields: The `fields` parameter is the list of fields written, in column order
+    :type fields: list
+    :return: the number of written records.
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for record in records:
+                writer.writerow([_csv_cell(record.get(field)) for field in fields])
+                count += 1
+        else:
+            for record in records:
+                f.write(json.dumps({field: record.get(field) for field in fields}) + '\n')
+                count += 1
+    return count
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _coerce(record: dict, defaults: dict) -> dict:
+    """
+    The function `_coerce` fills the missing fields of an imported record with their defaults and
+    converts the JSON and integer fields given as strings.
+    """
+    coerced = {}
+    for field, default in defaults.items():
+        value = record.get(field)
+        if value is None:
+            # copy the mutable defaults, every record gets its own
+            coerced[field] = json.loads(json.dumps(default)) if isinstance(default, (dict, list)) else default
+            continue
+        if field in JSON_FIELDS and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except json.decoder.JSONDecodeError:
+                raise ValueError(f"{field} must be valid JSON")
+        if field in JSON_FIELDS and not isinstance(value, JSON_FIELDS[field]):
+            raise ValueError(f"{field} must be a JSON {'object' if JSON_FIELDS[field] is dict else 'list'}")
+        if field in INT_FIELDS and isinstance(value, str):
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"{field} must be an integer")
+        if field in FLOAT_FIELDS and isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"{field} must be a number")
+        coerced[field] = value
+    return coerced
+
+
+def _check_type(record: dict, field: str, expected: type) -> None:
+    value = record[field]
+    if value is not None and (not isinstance(value, expected) or (expected is int and isinstance(value, bool))):
+        raise ValueError(f"{field} must be of type {expected.__name__}")
+
+
+def _check_required(record: dict, *fields: str) -> None:
+    for field in fields:
+        if not record[field]:
+            raise ValueError(f"{field} is required")
+        _check_type(record, field, str)
+
+
+def _check_datetime(record: dict, field: str) -> None:
+    try:
+        record[field] = to_timestamp(record[field])
+    except ValueError:
+        raise ValueError(f"{field} must be a timestamp or in the format 'DD-MM-YYYY hh:mm:ss'")
+
+
+def _check_filters(record: dict, field: str) -> None:
+    for item in record[field]:
+        if not isinstance(item, dict):
+            raise ValueError(f"{field} must be a list of objects")
+        if item.get('column_name') not in _FILTER_COLUMN_SET:
+            raise ValueError(f"{field} column_name must be one of {', '.join(FILTER_COLUMNS)}")
+        if item.get('operator') not in _FILTER_OPERATOR_SET:
+            raise ValueError(f"{field} operator must be one of {' '.join(FILTER_OPERATORS)}")
+        try:
+            parse_datetime(item.get('column_value'))
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} column_value must be in the format 'DD-MM-YYYY hh:mm:ss'")
+
+
+def _check_limit(record: dict, field: str, expected) -> None:
+    value = record[field]
+    if isinstance(value, bool) or not isinstance(value, expected) or value < 0:
+        raise ValueError(f"{field} must be a positive number, or 0 for no limit")
+
+
+def _check_range(record: dict, field: str, values) -> None:
+    _check_type(record, field, int)
+    if record[field] not in values:
+        raise ValueError(f"{field} must be one of {', '.join(str(value) for value in values)}")
+
+
+def prepare_endpoint(record: dict, app_ids: dict, known_app_ids=None) -> dict:
+    """
+    The function `prepare_endpoint` validates an imported endpoint and returns it as stored. The
+    application is given by `app_short_name` or by `app_id`.
+
+    :param record: The `record` parameter is the imported endpoint
+    :type record: dict
+    :param app_ids: The `app_ids` parameter maps the short name of every application to its id
+    :type app_ids: dict
+    :param known_app_ids: The `known_app_ids` parameter is the set of the ids of `app_ids`, given by
+    callers validating a batch so it is built once
+    :return: the endpoint dictionary, raises `ValueError` when the endpoint is not valid.
+    """
+    if known_app_ids is None:
+        known_app_ids = set(app_ids.values())
+    endpoint = _coerce(record, ENDPOINT_FIELDS)
+    short_name = record.get(APP_SHORT_NAME_FIELD)
+    if short_name is not None:
+        if short_name not in app_ids:
+            raise ValueError(f"application '{short_name}' not found")
+        endpoint['app_id'] = app_ids[short_name]
+    elif endpoint['app_id'] is None:
+        raise ValueError(f"{APP_SHORT_NAME_FIELD} or app_id is required")
+    else:
+        endpoint['app_id'] = str(endpoint['app_id'])
+        if endpoint['app_id'] not in known_app_ids:
+            raise ValueError(f"application #{endpoint['app_id']} not found")
+    _check_required(endpoint, 'name', 'url_endpoint')
+    if endpoint['method'] not in _METHODS:
+        raise ValueError("method must be GET or POST")
+    _check_filters(endpoint, 'filters')
+    _check_type(endpoint, 'page_size', int)
+    if not 1 <= endpoint['page_size'] <= 10000:
+        raise ValueError("page_size must be between 1 and 10000")
+    _check_datetime(endpoint, 'last_sync')
+    _check_range(endpoint, 'process_status', _STATUSES)
+    _check_range(endpoint, 'status', _STATUSES)
+    _check_type(endpoint, 'failed_count', int)
+    return endpoint
+
+
+def prepare_application(record: dict) -> dict:
+    """
+    The function `prepare_application` validates an imported application and returns it as stored.
+
+    :param record: The `record` parameter is the imported application
+    :type record: dict
+    :return: the application dictionary, raises `ValueError` when the application is not valid.
+    """
+    application = _coerce(record, APP_FIELDS)
+    _check_required(application, 'name', 'short_name', 'host', 'dump_path')
+    if application['url_scheme'] not in _URL_SCHEMES:
+        raise ValueError("url_scheme must be http or https")
+    if application['auth_type'] not in _AUTH_TYPES:
+        raise ValueError("auth_type must be NONE, KEYCLOAK or BASIC")
+    _check_type(application, 'sync_frequency', str)
+    if not CRON_REGEX.match(application['sync_frequency']):
+        raise ValueError(f"'{application['sync_frequency']}' is not a valid cron job frequency")
+    _check_datetime(application, 'last_sync')
+    _check_datetime(application, 'next_sync')
+    _check_filters(application, 'default_filters')
+    _check_type(application, 'default_page_size', int)
+    if not 1 <= application['default_page_size'] <= 10000:
+        raise ValueError("default_page_size must be between 1 and 10000")
+    _check_range(application, 'process_status', _STATUSES)
+    _check_range(application, 'status', _STATUSES)
+    _check_limit(application, 'max_connections', int)
+    _check_limit(application, 'rate_limit', (int, float))
+    _check_limit(application, 'byte_rate_limit', int)
+    return application
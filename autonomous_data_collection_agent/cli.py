@@ -5,10 +5,12 @@
 # module.
 import typer
 from datetime import datetime
-from autonomous_data_collection_agent import ERRORS, __app_name__, __version__, autonomousagent, config, database, random_data, raw_api
+from autonomous_data_collection_agent import ERRORS, __app_name__, __version__, autonomousagent, bulk_io, config, database, random_data, raw_api
 from enum import Enum
-from autonomous_data_collection_agent.database import DatabaseHandler
+from autonomous_data_collection_agent.app_resolver import get_app_resolver
 from autonomous_data_collection_agent.fileencryption import FileEncryption
+from autonomous_data_collection_agent.normalize import format_timestamp
+from autonomous_data_collection_agent.run_history import PERCENTILES, RunHistory, compute_stats, get_history_path
 # from autonomous_data_collection_agent.scheduler_simple import SchedulerService
 import os
 import logging  # Import the logging module
@@ -23,6 +25,27 @@ logging.basicConfig(filename=config.getLogFilePath(), filemode='a', format='%(as
 # (CLIs) in Python.
 app = typer.Typer()
 
+# The `StorageEngines` class is an enumeration of the storage engines the databases can use.
+class StorageEngines(Enum):
+    json = "json"
+    sqlite = "sqlite"
+    snapshot = "snapshot"
+
+# The `FetchModes` class is an enumeration of the ways the scheduler runs the endpoints.
+class FetchModes(Enum):
+    threads = "threads"
+    asyncio = "asyncio"
+
+# The `Databases` class is an enumeration of the databases of the agent.
+class Databases(Enum):
+    endpoint = "endpoint"
+    app = "app"
+
+# The `FileFormats` class is an enumeration of the file formats of bulk imports and exports.
+class FileFormats(Enum):
+    jsonl = "jsonl"
+    csv = "csv"
+
 @app.command()
     
 def init(
@@ -38,6 +61,12 @@ def init(
         "-app-db",
         prompt="application database location?",
     ),
+    storage_engine: StorageEngines = typer.Option(
+        "json",
+        "--storage-engine",
+        "-se",
+        help="Storage engine for the databases (json, sqlite or snapshot).",
+    ),
 ) -> None:
     """
     The `init` function initializes the databases by creating a config file and creating the endpoint
@@ -51,6 +80,10 @@ def init(
     database will be created or initialized. It is a string that represents the file path of the
     application database
     :type app_db_path: str
+    :param storage_engine: The `storage_engine` parameter selects the storage engine used for both
+    databases. `json` keeps the PysonDB files, `sqlite` stores the records in SQLite running in WAL mode
+    and `snapshot` stores the PysonDB document in a compact binary file
+    :type storage_engine: StorageEngines
     """
     
     # Insert a log message
@@ -62,7 +95,7 @@ def init(
     ]
     
     def _run_init():
-        app_init_error = config.init_app(db_list)
+        app_init_error = config.init_app(db_list, storage_engine.value)
         if app_init_error:
             typer.secho(
                 f'Creating config file failed with "{ERRORS[app_init_error]}"',
@@ -74,7 +107,7 @@ def init(
         logging.info("Config file created successfully")
 
         for db_name, db_path in db_list:
-            db_init_error = database.init_database(db_path)
+            db_init_error = database.init_database(db_path, storage_engine.value)
             if db_init_error:
                 typer.secho(
                     f'Creating {db_name} database failed with "{ERRORS[db_init_error]}"',
@@ -108,6 +141,185 @@ def init(
     else:
         _run_init()
 
+@app.command("migrate-storage")
+def migrate_storage(
+    storage_engine: StorageEngines = typer.Option(
+        "sqlite",
+        "--storage-engine",
+        "-se",
+        help="Storage engine to migrate the databases to.",
+    ),
+    force: bool = typer.Option(
+        False,
+        "--force",
+        "-f",
+        help="Migrate without confirmation.",
+    ),
+) -> None:
+    """
+    The `migrate_storage` function copies the endpoint and app databases to the given storage engine,
+    keeping every record id, and switches the config file over to the new database files.
+    
+    :param storage_engine: The `storage_engine` parameter is the storage engine to migrate to
+    :type storage_engine: StorageEngines
+    :param force: The `force` parameter is a boolean option that skips the confirmation prompt
+    :type force: bool
+    """
+    if not os.path.isfile(config.CONFIG_FILE_PATH):
+        typer.secho(
+            'Config file not found. Please, run "autonomous_data_collection_agent init"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    source_engine = database.get_storage_engine(config.CONFIG_FILE_PATH)
+    target_engine = storage_engine.value
+    if source_engine == target_engine:
+        typer.secho(f"Databases are already using the {target_engine} storage engine.", fg=typer.colors.YELLOW)
+        raise typer.Exit()
+
+    if not force and not typer.confirm("Stop the scheduler service before migrating. Do you want to proceed?"):
+        typer.echo("Operation canceled")
+        raise typer.Exit()
+
+    db_list = []
+    for db_name in ('endpoint', 'app'):
+        source_path = database.get_database_path(config.CONFIG_FILE_PATH, db_name)
+        target_path = database.get_migration_path(source_path, target_engine)
+        result = database.migrate_database(source_path, source_engine, target_path, target_engine)
+        if result.error:
+            typer.secho(
+                f'Migrating {db_name} database failed with "{ERRORS[result.error]}"',
+                fg=typer.colors.RED,
+            )
+            logging.error(f'Migrating {db_name} database failed with "{ERRORS[result.error]}"')
+            raise typer.Exit(1)
+        typer.secho(f"Migrated {len(result.item_list)} {db_name} records to {target_path}", fg=typer.colors.GREEN)
+        logging.info(f"Migrated {len(result.item_list)} {db_name} records from {source_path} to {target_path}")
+        db_list.append((db_name, target_path))
+
+    error = config.set_storage(target_engine, db_list)
+    if error:
+        typer.secho(f'Updating config file failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(f"Storage engine is set to {target_engine}.", fg=typer.colors.GREEN)
+    logging.info(f"Storage engine is set to {target_engine}")
+
+@app.command("export-database")
+def export_database(
+    db_name: Databases = typer.Argument(..., help="Database to export (endpoint or app)."),
+    json_path: str = typer.Argument(..., help="Path of the PysonDB JSON file to write."),
+) -> None:
+    """
+    The `export_database` function writes the endpoint or app database, whatever its storage engine, as a
+    PysonDB JSON file.
+    
+    :param db_name: The `db_name` parameter is the database to export
+    :type db_name: Databases
+    :param json_path: The `json_path` parameter is the path of the JSON file to write
+    :type json_path: str
+    """
+    if not os.path.isfile(config.CONFIG_FILE_PATH):
+        typer.secho(
+            'Config file not found. Please, run "autonomous_data_collection_agent init"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    engine = database.get_storage_engine(config.CONFIG_FILE_PATH)
+    db_path = database.get_database_path(config.CONFIG_FILE_PATH, db_name.value)
+    result = database.export_database(db_path, engine, json_path)
+    if result.error:
+        typer.secho(
+            f'Exporting {db_name.value} database failed with "{ERRORS[result.error]}"',
+            fg=typer.colors.RED,
+        )
+        logging.error(f'Exporting {db_name.value} database failed with "{ERRORS[result.error]}"')
+        raise typer.Exit(1)
+    typer.secho(f"Exported {len(result.item_list)} {db_name.value} records to {json_path}", fg=typer.colors.GREEN)
+    logging.info(f"Exported {len(result.item_list)} {db_name.value} records from {db_path} to {json_path}")
+
+@app.command("import-database")
+def import_database(
+    db_name: Databases = typer.Argument(..., help="Database to replace (endpoint or app)."),
+    json_path: str = typer.Argument(..., help="Path of the PysonDB JSON file to read."),
+    force: bool = typer.Option(
+        False,
+        "--force",
+        "-f",
+        help="Import without confirmation.",
+    ),
+) -> None:
+    """
+    The `import_database` function replaces the endpoint or app database, whatever its storage engine,
+    with the records of a PysonDB JSON file.
+    
+    :param db_name: The `db_name` parameter is the database to replace
+    :type db_name: Databases
+    :param json_path: The `json_path` parameter is the path of the JSON file to read
+    :type json_path: str
+    :param force: The `force` parameter is a boolean option that skips the confirmation prompt
+    :type force: bool
+    """
+    if not os.path.isfile(config.CONFIG_FILE_PATH):
+        typer.secho(
+            'Config file not found. Please, run "autonomous_data_collection_agent init"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    if not os.path.isfile(json_path):
+        typer.secho(f"File {json_path} not found.", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if not force and not typer.confirm(f"This replaces every {db_name.value} record. Do you want to proceed?"):
+        typer.echo("Operation canceled")
+        raise typer.Exit()
+
+    engine = database.get_storage_engine(config.CONFIG_FILE_PATH)
+    db_path = database.get_database_path(config.CONFIG_FILE_PATH, db_name.value)
+    result = database.import_database(json_path, db_path, engine)
+    if result.error:
+        typer.secho(
+            f'Importing {db_name.value} database failed with "{ERRORS[result.error]}"',
+            fg=typer.colors.RED,
+        )
+        logging.error(f'Importing {db_name.value} database failed with "{ERRORS[result.error]}"')
+        raise typer.Exit(1)
+    typer.secho(f"Imported {len(result.item_list)} {db_name.value} records from {json_path}", fg=typer.colors.GREEN)
+    logging.info(f"Imported {len(result.item_list)} {db_name.value} records from {json_path} to {db_path}")
+
+@app.command("normalize-records")
+def normalize_records() -> None:
+    """
+    The `normalize_records` function migrates the application and endpoint records written by older
+    versions, with JSON strings and 'DD-MM-YYYY hh:mm:ss' datetimes, to native types and timestamps.
+    The scheduler also runs it when it starts.
+    """
+    if not os.path.isfile(config.CONFIG_FILE_PATH):
+        typer.secho(
+            'Config file not found. Please, run "autonomous_data_collection_agent init"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    engine = database.get_storage_engine(config.CONFIG_FILE_PATH)
+    failed = False
+    for db_name in Databases:
+        db_path = database.get_database_path(config.CONFIG_FILE_PATH, db_name.value)
+        result = database.normalize_database(db_path, engine)
+        if result.error:
+            failed = True
+            typer.secho(
+                f'Normalizing {db_name.value} records failed with "{ERRORS[result.error]}" for IDs: {", ".join(result.item_list)}',
+                fg=typer.colors.RED,
+            )
+            logging.error(f'Normalizing {db_name.value} records failed with "{ERRORS[result.error]}"')
+        else:
+            typer.secho(f"Normalized {len(result.item_list)} {db_name.value} records.", fg=typer.colors.GREEN)
+            logging.info(f"Normalized {len(result.item_list)} {db_name.value} records in {db_path}")
+    if failed:
+        raise typer.Exit(1)
+
 @app.command("enable-threading")
 def enable_threading(
     is_enabled: str = typer.Option(
@@ -204,7 +416,145 @@ def set_concurrent_threads(
         if set_threads:
             _set_threads()
         else:
-            typer.echo("Operation canceled") 
+            typer.echo("Operation canceled")
+
+@app.command("set-fetch-mode")
+def set_fetch_mode(
+    mode: FetchModes = typer.Option(
+        FetchModes.threads.value,
+        "--mode",
+        "-m",
+        help="Run the endpoints on worker threads or as asyncio tasks (needs aiohttp).",
+    ),
+    concurrent_requests: int = typer.Option(
+        100,
+        "--concurrent-requests",
+        "-cr",
+        min=1,
+        help="Maximum number of requests in flight at the same time in the asyncio mode.",
+    ),
+    page_parallelism: int = typer.Option(
+        1,
+        "--page-parallelism",
+        "-pp",
+        min=1,
+        help="Maximum number of pages of an endpoint requested at the same time, 1 for one page after the other.",
+    )
+) -> None:
+    """
+    The function `set_fetch_mode` sets how the scheduler runs the endpoints when threading is enabled,
+    on `concurrent_threads` worker threads or as asyncio tasks sharing one thread.
+
+    :param mode: The `mode` parameter is the fetch mode, `threads` or `asyncio`
+    :type mode: FetchModes
+    :param concurrent_requests: The `concurrent_requests` parameter is the maximum number of requests
+    in flight at the same time in the asyncio mode
+    :type concurrent_requests: int
+    :param page_parallelism: The `page_parallelism` parameter is the maximum number of pages of an
+    endpoint requested at the same time once the first page tells the total
+    :type page_parallelism: int
+    """
+    if os.path.isfile(config.CONFIG_FILE_PATH):
+        status = config.set_fetch_mode(mode.value, concurrent_requests, page_parallelism)
+
+        if status:
+            logging.info(f'Set fetch mode failed with "{ERRORS[status]}"')
+            typer.secho(
+                f'Set fetch mode failed with "{ERRORS[status]}"', fg=typer.colors.RED
+            )
+            raise typer.Exit(1)
+        else:
+            typer.secho(
+                f"""Fetch mode is set to {mode.value}.""",
+                fg=typer.colors.GREEN,
+            )
+            logging.info(f"Fetch mode is set to {mode.value} (concurrent requests: {concurrent_requests}, page parallelism: {page_parallelism})")
+
+@app.command("set-write-back")
+def set_write_back(
+    is_enabled: str = typer.Option(
+        True,
+        "--enabled",
+        "-e",
+        help="Keep database changes in memory and write them once per scheduler run.",
+    ),
+    flush_operations: int = typer.Option(
+        0,
+        "--flush-operations",
+        "-fo",
+        help="Also write the changes every N database operations (0 to disable).",
+    ),
+    flush_interval: float = typer.Option(
+        0,
+        "--flush-interval",
+        "-fi",
+        help="Also write the changes every N seconds (0 to disable).",
+    )
+) -> None:
+    """
+    The function `set_write_back` enables or disables the write-back mode of the scheduler, in which the
+    database changes of a scheduler run are written to the database files in one go.
+
+    :param is_enabled: The `is_enabled` parameter is a string that represents whether write-back should
+    be enabled or disabled. It is set as a command-line option with a default value of `True`
+    :type is_enabled: str
+    :param flush_operations: The `flush_operations` parameter is the number of database operations after
+    which the pending changes are written
+    :type flush_operations: int
+    :param flush_interval: The `flush_interval` parameter is the number of seconds after which the
+    pending changes are written
+    :type flush_interval: float
+    """
+    if os.path.isfile(config.CONFIG_FILE_PATH):
+        status = config.set_write_back(str(is_enabled) == "True", flush_operations, flush_interval)
+        state = "enabled" if str(is_enabled) == "True" else "disabled"
+
+        if status:
+            logging.info(f'Write-back failed with "{ERRORS[status]}"')
+            typer.secho(
+                f'Write-back failed with "{ERRORS[status]}"', fg=typer.colors.RED
+            )
+            raise typer.Exit(1)
+        else:
+            typer.secho(
+                f"""Write-back is set to {state}.""",
+                fg=typer.colors.GREEN,
+            )
+            logging.info(f"Write-back is set to {state} (flush operations: {flush_operations}, flush interval: {flush_interval})")
+
+@app.command("enable-lazy-load")
+def enable_lazy_load(
+    is_enabled: str = typer.Option(
+        True,
+        "--enabled",
+        "-e",
+        help="Read the JSON database records from disk on demand instead of loading whole files.",
+    )
+) -> None:
+    """
+    The function `enable_lazy_load` enables or disables the lazy loading of the JSON databases, in which
+    only an offset index of the records is kept in memory and records are read from disk when needed.
+
+    :param is_enabled: The `is_enabled` parameter is a string that represents whether lazy loading should
+    be enabled or disabled. It is set as a command-line option with a default value of `True`
+    :type is_enabled: str
+    """
+    if os.path.isfile(config.CONFIG_FILE_PATH):
+        status = config.enable_lazy_load(str(is_enabled) == "True")
+        state = "enabled" if str(is_enabled) == "True" else "disabled"
+
+        if status:
+            logging.info(f'Lazy load failed with "{ERRORS[status]}"')
+            typer.secho(
+                f'Lazy load failed with "{ERRORS[status]}"', fg=typer.colors.RED
+            )
+            raise typer.Exit(1)
+        else:
+            typer.secho(
+                f"""Lazy load is set to {state}.""",
+                fg=typer.colors.GREEN,
+            )
+            logging.info(f"Lazy load is set to {state}")
 
 @app.command("enable-encryption")
 def enable_encryption(
@@ -449,6 +799,15 @@ def add_endpoint(
         )
         logging.info(f"Added endpoint: {name} for app: {app_short_name} with URL endpoint: {url_endpoint}")
 
+# Endpoint fields shown by `cli_render_endpints`, list commands only read these fields.
+ENDPOINT_RENDER_FIELDS = ['name', 'app_id', 'url_endpoint', 'method', 'payload', 'filters', 'page_size', 'last_sync', 'process_status', 'status']
+
+# Application fields shown by `cli_render_application`, in column order.
+APP_RENDER_FIELDS = [
+    'name', 'short_name', 'host', 'url_scheme', 'auth_type', 'auth_data', 'dump_path', 'sync_frequency', 'last_sync',
+    'next_sync', 'default_payload', 'default_filters', 'default_page_size', 'process_status', 'status',
+]
+
 def cli_render_endpints(endpoints) -> None:
     """
     The `cli_render_endpoints` function lists given endpoints on the screen with specific formatting.
@@ -480,7 +839,7 @@ def cli_render_endpints(endpoints) -> None:
     headers = "".join(columns)
     typer.secho(headers, fg=typer.colors.BLUE, bold=True)
     typer.secho("-" * len(headers), fg=typer.colors.BLUE)
-    app_handler = DatabaseHandler(database.get_database_path(config.CONFIG_FILE_PATH, 'app'))
+    app_short_names = get_app_resolver().short_names()
     
     def _column_len(column_val):
         if column_val is None:
@@ -499,15 +858,11 @@ def cli_render_endpints(endpoints) -> None:
         payload = endpoint['payload']
         filters = endpoint['filters']
         page_size = endpoint['page_size']
-        last_sync = endpoint['last_sync']
+        last_sync = format_timestamp(endpoint['last_sync'])
         process_status = endpoint['process_status']
         status = endpoint['status']
 
-        try:
-            app_data = app_handler.get_by_id(app_id)
-            app_short_name = app_data.item_list[0]["short_name"]
-        except IndexError:
-            app_short_name = app_id
+        app_short_name = app_short_names.get(app_id, app_id)
         
         typer.secho(
             f"{endpoint_id}{(len(columns[0]) - _column_len(str(endpoint_id))) * ' '}"
@@ -532,7 +887,7 @@ def list_endpoints() -> None:
     The function `list_endpoints()` lists all endpoints.
     """
     endpoints = get_endpoints()
-    all_endpoints = endpoints.get_endpoint_list()
+    all_endpoints = endpoints.get_endpoint_fields(ENDPOINT_RENDER_FIELDS)
     cli_render_endpints(all_endpoints)
 
 @app.command("list-app-endpoints")
@@ -727,13 +1082,11 @@ def update_endpoint(
     if name is not None:
         endpoint["name"] = name
     if app_short_name is not None:
-        app_handler = DatabaseHandler(database.get_database_path(config.CONFIG_FILE_PATH, 'app'))
-        try:
-            app_id = next(iter(app_handler.get_by_column("short_name", app_short_name).item_list))
-            endpoint["app_id"] = app_id
-        except IndexError:
+        app_id = get_app_resolver().id_by_short_name(app_short_name)
+        if not app_id:
             typer.secho(f"App {app_short_name} not found.", fg=typer.colors.RED)
             raise typer.Exit(1)
+        endpoint["app_id"] = app_id
     if url_endpoint is not None:
         endpoint["url_endpoint"] = url_endpoint
     if method is not None:
@@ -1033,6 +1386,9 @@ def add_application(
     default_page_size: int = typer.Option(1000, "--default-page-size", "-dp", min=1, max=10000, help="Default page size (1000)"),
     process_status: int = typer.Option(0, "--process-status", "-prs", min=0, max=2, help="Process status (0=>not processed, 1=>inprocess, or 2=>processed)"),
     status: int = typer.Option(1, "--status", "-s", min=0, max=2, help="Applicaiton status (0=>disabled, 1=>enabled)"),
+    max_connections: int = typer.Option(0, "--max-connections", "-mc", min=0, help="Maximum number of endpoints of the host synced at the same time (0 for no limit)"),
+    rate_limit: float = typer.Option(0, "--rate-limit", "-rl", min=0, help="Maximum number of requests per second sent to the host (0 for no limit)"),
+    byte_rate_limit: int = typer.Option(0, "--byte-rate-limit", "-brl", min=0, help="Maximum number of response bytes per second received from the host (0 for no limit)"),
 ):
     """
     The `add_application` function adds a new application with the provided details.
@@ -1090,6 +1446,15 @@ def add_application(
     :param status: The `status` parameter is used to specify the status of the application. It can have
     three possible values:
     :type status: int
+    :param max_connections: The `max_connections` parameter is the maximum number of endpoints of the
+    host of the application synced at the same time, `0` for no limit
+    :type max_connections: int
+    :param rate_limit: The `rate_limit` parameter is the maximum number of requests per second sent to
+    the host of the application, `0` for no limit
+    :type rate_limit: float
+    :param byte_rate_limit: The `byte_rate_limit` parameter is the maximum number of response bytes per
+    second received from the host of the application, `0` for no limit
+    :type byte_rate_limit: int
     """
 
     last_sync_datetime = datetime.strptime(last_sync, '%d-%m-%Y %H:%M:%S') if last_sync  else None
@@ -1097,7 +1462,8 @@ def add_application(
 
     applications = get_applications()
     application_result = applications.add(
-        name, short_name, host, url_scheme.value, auth_type.value, auth_data, dump_path, sync_frequency, last_sync_datetime, next_sync_datetime, default_payload, default_filters, default_page_size, process_status, status
+        name, short_name, host, url_scheme.value, auth_type.value, auth_data, dump_path, sync_frequency, last_sync_datetime, next_sync_datetime, default_payload, default_filters, default_page_size, process_status, status,
+        max_connections=max_connections, rate_limit=rate_limit, byte_rate_limit=byte_rate_limit
     )
     application = application_result.application
     error = application_result.error
@@ -1147,6 +1513,9 @@ def update_application(
     default_page_size: int = typer.Option(None, "--default-page-size", "-dp", min=1, max=10000, help="Default page size (1000)"),
     process_status: int = typer.Option(None, "--process-status", "-prs", min=0, max=2, help="Process status (0=>not processed, 1=>inprocess, or 2=>processed)"),
     status: int = typer.Option(None, "--status", "-s", min=0, max=2, help="Application status (0=>disabled, 1=>enabled)"),
+    max_connections: int = typer.Option(None, "--max-connections", "-mc", min=0, help="Maximum number of endpoints of the host synced at the same time (0 for no limit)"),
+    rate_limit: float = typer.Option(None, "--rate-limit", "-rl", min=0, help="Maximum number of requests per second sent to the host (0 for no limit)"),
+    byte_rate_limit: int = typer.Option(None, "--byte-rate-limit", "-brl", min=0, help="Maximum number of response bytes per second received from the host (0 for no limit)"),
 ):
     """
     The `update_application` function updates an existing application with the provided details.
@@ -1204,6 +1573,15 @@ def update_application(
     :param status: The `status` parameter is used to specify the status of the application. It can have
     three possible values:
     :type status: int
+    :param max_connections: The `max_connections` parameter is the maximum number of endpoints of the
+    host of the application synced at the same time, `0` for no limit
+    :type max_connections: int
+    :param rate_limit: The `rate_limit` parameter is the maximum number of requests per second sent to
+    the host of the application, `0` for no limit
+    :type rate_limit: float
+    :param byte_rate_limit: The `byte_rate_limit` parameter is the maximum number of response bytes per
+    second received from the host of the application, `0` for no limit
+    :type byte_rate_limit: int
     """
 
     applications = get_applications()
@@ -1241,6 +1619,12 @@ def update_application(
         application["process_status"] = process_status
     if status is not None:
         application["status"] = status
+    if max_connections is not None:
+        application["max_connections"] = max_connections
+    if rate_limit is not None:
+        application["rate_limit"] = rate_limit
+    if byte_rate_limit is not None:
+        application["byte_rate_limit"] = byte_rate_limit
 
     application_result = applications.update_app(APP_ID=app_id, data=application)
     application = application_result.application
@@ -1303,7 +1687,8 @@ def cli_render_application(applications) -> None:
     # print(applications)
     # exit(1)   
     for app_id in applications:
-        name, short_name, host, url_scheme, auth_type, auth_data, dump_path, sync_frequency, last_sync, next_sync, default_payload, default_filters, default_page_size, process_status, status = applications[app_id].values()
+        name, short_name, host, url_scheme, auth_type, auth_data, dump_path, sync_frequency, last_sync, next_sync, default_payload, default_filters, default_page_size, process_status, status = [applications[app_id].get(field) for field in APP_RENDER_FIELDS]
+        last_sync, next_sync = format_timestamp(last_sync), format_timestamp(next_sync)
 
         typer.secho(
             f"{app_id}{(len(columns[0]) - _column_len(str(app_id))) * ' '}"
@@ -1334,7 +1719,7 @@ def list_applications() -> None:
     command-line interface.
     """
     applications = get_applications()
-    application_list = applications.get_applications()
+    application_list = applications.get_app_fields(APP_RENDER_FIELDS)
     cli_render_application(application_list)
 
 @app.command(name="get-app")
@@ -1603,6 +1988,113 @@ def remove_all_apps(
     else:
         typer.echo("Operation canceled")
 
+# Number of rejected records listed when a bulk import fails.
+IMPORT_ERRORS_SHOWN = 20
+
+@app.command("import")
+def import_records(
+    db_name: Databases = typer.Argument(..., help="Records to import (endpoint or app)."),
+    path: str = typer.Argument(..., help="Path of the JSON Lines or CSV file to read."),
+    file_format: FileFormats = typer.Option(
+        None,
+        "--format",
+        "-fmt",
+        help="File format, detected from the file extension by default.",
+    ),
+) -> None:
+    """
+    The `import_records` function adds the applications or endpoints of a JSON Lines or CSV file. The
+    whole file is validated first and its records are added with a single write, or none of them are
+    added when any record is rejected. Endpoints give their application by `app_short_name` or `app_id`.
+    
+    :param db_name: The `db_name` parameter tells whether applications or endpoints are imported
+    :type db_name: Databases
+    :param path: The `path` parameter is the path of the file to read
+    :type path: str
+    :param file_format: The `file_format` parameter is the format of the file
+    :type file_format: FileFormats
+    """
+    if not os.path.isfile(path):
+        typer.secho(f"File {path} not found.", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    try:
+        detected_format = bulk_io.detect_format(path, file_format.value if file_format else None)
+    except ValueError as error:
+        typer.secho(str(error), fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    records = bulk_io.read_records(path, detected_format)
+    if db_name is Databases.endpoint:
+        result = get_endpoints().import_endpoints(records)
+    else:
+        result = get_applications().import_apps(records)
+
+    if result.errors:
+        typer.secho(f"Import of {path} failed, {len(result.errors)} {db_name.value} records were rejected:", fg=typer.colors.RED)
+        for line_number, message in result.errors[:IMPORT_ERRORS_SHOWN]:
+            typer.secho(f"  line {line_number}: {message}", fg=typer.colors.RED)
+        if len(result.errors) > IMPORT_ERRORS_SHOWN:
+            typer.secho(f"  ... and {len(result.errors) - IMPORT_ERRORS_SHOWN} more", fg=typer.colors.RED)
+        logging.error(f"Import of {path} failed, {len(result.errors)} {db_name.value} records were rejected")
+        raise typer.Exit(1)
+    if result.error:
+        typer.secho(f'Importing {db_name.value} records failed with "{ERRORS[result.error]}"', fg=typer.colors.RED)
+        logging.error(f'Importing {db_name.value} records from {path} failed with "{ERRORS[result.error]}"')
+        raise typer.Exit(1)
+    typer.secho(f"Imported {len(result.records)} {db_name.value} records from {path}", fg=typer.colors.GREEN)
+    logging.info(f"Imported {len(result.records)} {db_name.value} records from {path}")
+
+@app.command("export")
+def export_records(
+    db_name: Databases = typer.Argument(..., help="Records to export (endpoint or app)."),
+    path: str = typer.Argument(..., help="Path of the JSON Lines or CSV file to write."),
+    file_format: FileFormats = typer.Option(
+        None,
+        "--format",
+        "-fmt",
+        help="File format, detected from the file extension by default.",
+    ),
+) -> None:
+    """
+    The `export_records` function writes the applications or endpoints to a JSON Lines or CSV file that
+    `import` can read back. Endpoints are written with the short name of their application.
+    
+    :param db_name: The `db_name` parameter tells whether applications or endpoints are exported
+    :type db_name: Databases
+    :param path: The `path` parameter is the path of the file to write
+    :type path: str
+    :param file_format: The `file_format` parameter is the format of the file
+    :type file_format: FileFormats
+    """
+    try:
+        detected_format = bulk_io.detect_format(path, file_format.value if file_format else None)
+    except ValueError as error:
+        typer.secho(str(error), fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if db_name is Databases.endpoint:
+        fields = list(bulk_io.ENDPOINT_FIELDS)
+        records = get_endpoints().get_endpoint_fields(fields)
+        app_short_names = get_app_resolver().short_names()
+        rows = (
+            dict(record, id=record_id, app_short_name=app_short_names.get(record['app_id']))
+            for record_id, record in records.items()
+        )
+        fields = ['id', bulk_io.APP_SHORT_NAME_FIELD] + fields
+    else:
+        fields = list(bulk_io.APP_FIELDS)
+        records = get_applications().get_app_fields(fields)
+        rows = (dict(record, id=record_id) for record_id, record in records.items())
+        fields = ['id'] + fields
+
+    try:
+        count = bulk_io.write_records(path, detected_format, rows, fields)
+    except OSError as error:
+        typer.secho(f"Writing {path} failed: {error}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(f"Exported {count} {db_name.value} records to {path}", fg=typer.colors.GREEN)
+    logging.info(f"Exported {count} {db_name.value} records to {path}")
+
 @app.command("generate-fake")
 def generate_fake(
     app_count: int = typer.Option(
@@ -1655,6 +2147,83 @@ def run_fake_server() -> None:
     """
     raw_api.run_fake_api()
 
+@app.command("stats")
+def stats(
+    by_app: bool = typer.Option(
+        False,
+        "--by-app",
+        "-a",
+        help="Group the runs per application instead of per endpoint.",
+    ),
+    app_id: str = typer.Option(
+        None,
+        "--app-id",
+        "-id",
+        help="Only show the runs of this application.",
+    ),
+) -> None:
+    """
+    The function `stats` shows the latency percentiles, throughput and failure rate of the recorded sync
+    runs per endpoint or per application.
+    
+    :param by_app: The `by_app` parameter tells whether the runs are grouped per application instead of
+    per endpoint
+    :type by_app: bool
+    :param app_id: The `app_id` parameter is an optional application id to filter the runs
+    :type app_id: str
+    """
+    if not os.path.isfile(config.CONFIG_FILE_PATH):
+        typer.secho(
+            'Config file not found. Please, run "autonomous_data_collection_agent init"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        typer.secho('The stats command needs NumPy. Please, run "pip install numpy"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    history = RunHistory(get_history_path(database.get_database_path(config.CONFIG_FILE_PATH, "endpoint")))
+    runs = history.load()
+    if app_id:
+        if not app_id.isdigit():
+            typer.secho(f'Invalid application id "{app_id}"', fg=typer.colors.RED)
+            raise typer.Exit(1)
+        runs = runs[runs["app_id"] == int(app_id)]
+    rows = compute_stats(runs, by_endpoint=not by_app)
+    if not rows:
+        typer.secho("There are no recorded runs yet", fg=typer.colors.RED)
+        raise typer.Exit()
+
+    typer.secho(f"\nSync run statistics ({len(runs)} runs):\n", fg=typer.colors.BLUE, bold=True)
+    columns = ["App ID              "] + ([] if by_app else ["| Endpoint ID         "]) + [
+        "| Runs     ",
+        "| Failed %  ",
+    ] + [f"| p{q} (s)    " for q in PERCENTILES] + [
+        "| Records/s   ",
+        "| KB/s        ",
+        "| Retries  ",
+    ]
+    headers = "".join(columns)
+    typer.secho(headers, fg=typer.colors.BLUE, bold=True)
+    typer.secho("-" * len(headers), fg=typer.colors.BLUE)
+    for row in rows:
+        values = [row["app_id"]] + ([] if by_app else [row["endpoint_id"]]) + [
+            str(row["runs"]),
+            f"{row['failure_rate'] * 100:.1f}",
+        ] + [f"{row[f'p{q}']:.3f}" for q in PERCENTILES] + [
+            f"{row['records_per_second']:.1f}",
+            f"{row['bytes_per_second'] / 1024:.1f}",
+            str(row["retries"]),
+        ]
+        line = ""
+        for column, value in zip(columns, values):
+            prefix = "| " if column.startswith("|") else ""
+            line += f"{prefix}{value}".ljust(len(column))
+        typer.secho(line, fg=typer.colors.BLUE)
+    typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)
+
 # @app.command("test-scheduler")
 # def test_scheduler() -> None:
 #     """
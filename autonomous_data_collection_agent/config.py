@@ -18,7 +18,10 @@ CONFIG_DIR_PATH = os.path.join(os.getcwd(), __app_name__)
 CONFIG_FILE_PATH = CONFIG_DIR_PATH + "/" + "config.ini"
 LOG_FILE_PATH = CONFIG_DIR_PATH  + "/" +  "app.log"
 
-def init_app(db_paths: []) -> int:
+# How the scheduler runs the endpoints when threading is enabled: on worker threads or as asyncio tasks.
+FETCH_MODES = ("threads", "asyncio")
+
+def init_app(db_paths: [], storage_engine: str = "json") -> int:
     """
     The `init_app` function initializes the application by performing various setup tasks such as
     creating a configuration file, creating a database, creating a logfile, generating an encryption
@@ -27,12 +30,15 @@ def init_app(db_paths: []) -> int:
     :param db_paths: The `db_paths` parameter is a list of paths to the databases that need to be
     created
     :type db_paths: []
+    :param storage_engine: The `storage_engine` parameter is the storage engine used for the
+    databases (`json`, `sqlite` or `snapshot`), defaults to `json`
+    :type storage_engine: str
     :return: an integer value.
     """
     config_code = _init_config_file()
     if config_code != SUCCESS:
         return config_code
-    database_code = _create_database(db_paths)
+    database_code = _create_database(db_paths, storage_engine)
     if database_code != SUCCESS:
         return database_code
 
@@ -62,6 +68,10 @@ def init_app(db_paths: []) -> int:
     else:
         typer.secho(f"Threading config basic setup done. Please update details for realtime use.", fg=typer.colors.BRIGHT_CYAN)
 
+    write_back_error_code = _create_write_back_config()
+    if write_back_error_code != SUCCESS:
+        return write_back_error_code
+
     return SUCCESS
 
 
@@ -94,7 +104,7 @@ def _create_threading_config() -> int:
     """
     config_parser = configparser.ConfigParser()
     config_parser.read(CONFIG_FILE_PATH)
-    config_parser["Threading"] = {"enabled": True, "concurrent_threads": 2 }
+    config_parser["Threading"] = {"enabled": True, "concurrent_threads": 2, "mode": "threads", "concurrent_requests": 100, "page_parallelism": 1 }
 
     try:
         with CONFIG_FILE_PATH.open("w") as file:
@@ -151,6 +161,58 @@ def set_concurrent_threads(thread_count: int = 2) -> int:
         return DB_WRITE_ERROR
     return SUCCESS
 
+def _create_write_back_config() -> int:
+    """
+    The function `_create_write_back_config()` creates the write-back configuration with write-back
+    disabled and no automatic flush.
+    :return: an integer value. If the write operation to the config file is successful, it will return
+    the value of the constant `SUCCESS`. If there is an error while writing to the file, it will return
+    the value of the constant `DB_WRITE_ERROR`.
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(CONFIG_FILE_PATH)
+    config_parser["WriteBack"] = {"enabled": False, "flush_operations": 0, "flush_interval": 0}
+
+    try:
+        with open(CONFIG_FILE_PATH, "w") as file:
+            config_parser.write(file)
+    except OSError:
+        return DB_WRITE_ERROR
+    return SUCCESS
+
+def set_write_back(is_enabled: bool = True, flush_operations: int = 0, flush_interval: float = 0) -> int:
+    """
+    The function enables or disables the write-back mode of the scheduler and sets when the pending
+    database changes are flushed.
+    
+    :param is_enabled: A boolean value indicating whether write-back should be enabled or not, defaults
+    to True
+    :type is_enabled: bool (optional)
+    :param flush_operations: The `flush_operations` parameter is the number of database mutations after
+    which the changes are flushed, `0` to flush once per scheduler run
+    :type flush_operations: int (optional)
+    :param flush_interval: The `flush_interval` parameter is the number of seconds after which the
+    changes are flushed, `0` to flush once per scheduler run
+    :type flush_interval: float (optional)
+    :return: an integer value. If the write operation to the configuration file is successful, it will
+    return the value of the constant `SUCCESS`. If there is an error while writing to the file, it will
+    return the value of the constant `DB_WRITE_ERROR`.
+    """
+    config_parser = configparser.ConfigParser()
+    # Read the existing file first
+    config_parser.read(CONFIG_FILE_PATH)
+    config_parser["WriteBack"] = {
+        "enabled": str(is_enabled),
+        "flush_operations": str(flush_operations),
+        "flush_interval": str(flush_interval),
+    }
+    try:
+        with open(CONFIG_FILE_PATH, "w") as file:
+            config_parser.write(file)
+    except OSError:
+        return DB_WRITE_ERROR
+    return SUCCESS
+
 def _create_keycloak_config() -> int:
     """
     The function `_create_keycloak_config()` creates a Keycloak configuration file with default values.
@@ -174,7 +236,7 @@ def _create_keycloak_config() -> int:
         return DB_WRITE_ERROR
     return SUCCESS
 
-def _create_database(db_paths: []) -> int:
+def _create_database(db_paths: [], storage_engine: str = "json") -> int:
     """
     The function `_create_database` creates a database configuration file with the provided database
     paths.
@@ -183,13 +245,16 @@ def _create_database(db_paths: []) -> int:
     `db_name` and the `db_path`. The `db_name` is a string representing the name of the database, and
     the `db_path` is a string representing the path to the database file
     :type db_paths: []
+    :param storage_engine: The `storage_engine` parameter is the storage engine used for the
+    databases, defaults to `json`
+    :type storage_engine: str
     :return: an integer value. If the writing of the database configuration file is successful, it will
     return the value of the constant `SUCCESS`. If there is an error while writing the file, it will
     return the value of the constant `DB_WRITE_ERROR`.
     """
     config_parser = configparser.ConfigParser()
     config_parser.read(CONFIG_FILE_PATH)
-    db_obj = {}
+    db_obj = {"storage_engine": storage_engine, "lazy_load": False}
     for db_name, db_path in db_paths:
         db_obj[f"{db_name}_database"] =  db_path
 
@@ -201,6 +266,58 @@ def _create_database(db_paths: []) -> int:
         return DB_WRITE_ERROR
     return SUCCESS
 
+def set_storage(storage_engine: str, db_paths: []) -> int:
+    """
+    The function `set_storage` switches the storage engine and points the database paths of the
+    `[General]` section to the given files.
+    
+    :param storage_engine: The `storage_engine` parameter is the storage engine to use (`json`,
+    `sqlite` or `snapshot`)
+    :type storage_engine: str
+    :param db_paths: The `db_paths` parameter is a list of `(db_name, db_path)` tuples
+    :type db_paths: []
+    :return: an integer value. If the file write operation is successful, it will return the value of
+    the constant `SUCCESS`. If there is an error while writing to the file, it will return the value of
+    the constant `DB_WRITE_ERROR`.
+    """
+    config_parser = configparser.ConfigParser()
+    # Read the existing file first
+    config_parser.read(CONFIG_FILE_PATH)
+    config_parser["General"]["storage_engine"] = storage_engine
+    for db_name, db_path in db_paths:
+        config_parser["General"][f"{db_name}_database"] = str(db_path)
+    try:
+        with open(CONFIG_FILE_PATH, "w") as file:
+            config_parser.write(file)
+    except OSError:
+        return DB_WRITE_ERROR
+    return SUCCESS
+
+def enable_lazy_load(is_enabled: bool = True) -> int:
+    """
+    The function `enable_lazy_load` enables or disables the lazy loading of the JSON databases by
+    updating the `lazy_load` key of the `[General]` section of the configuration file.
+    
+    :param is_enabled: A boolean value indicating whether lazy loading should be enabled or not,
+    defaults to True
+    :type is_enabled: bool (optional)
+    :return: an integer value. If the file write operation is successful, it will return the value of
+    the constant `SUCCESS`. If there is an error while writing to the file, it will return the value of
+    the constant `DB_WRITE_ERROR`.
+    """
+    config_parser = configparser.ConfigParser()
+    # Read the existing file first
+    config_parser.read(CONFIG_FILE_PATH)
+    if not config_parser.has_section("General"):
+        config_parser["General"] = {}
+    config_parser["General"]["lazy_load"] = str(is_enabled)
+    try:
+        with open(CONFIG_FILE_PATH, "w") as file:
+            config_parser.write(file)
+    except OSError:
+        return DB_WRITE_ERROR
+    return SUCCESS
+
 def _create_logfile(log_file_path: str) -> int:
     """
     The function `_create_logfile` creates a log file path in a configuration file and creates an empty
@@ -349,4 +466,84 @@ def get_threading_config():
             f'Threading Config File Error : {str(e)}',
             fg=typer.colors.RED,
         )
-        raise typer.Exit(1)
\ No newline at end of file
+        raise typer.Exit(1)
+
+def set_fetch_mode(mode: str = "threads", concurrent_requests: int = 100, page_parallelism: int = 1) -> int:
+    """
+    The function sets how the scheduler runs the endpoints when threading is enabled, on the worker
+    threads or as asyncio tasks, in a configuration file.
+    
+    :param mode: The `mode` parameter is one of `FETCH_MODES`, defaults to `threads`
+    :type mode: str (optional)
+    :param concurrent_requests: The `concurrent_requests` parameter is the maximum number of requests in
+    flight at the same time in the `asyncio` mode, defaults to 100
+    :type concurrent_requests: int (optional)
+    :param page_parallelism: The `page_parallelism` parameter is the maximum number of pages of an
+    endpoint requested at the same time once the first page tells the total, `1` fetching the pages one
+    after the other, defaults to 1
+    :type page_parallelism: int (optional)
+    :return: an integer value. If the write operation to the configuration file is successful, it will
+    return the value of the constant `SUCCESS`. If there is an error while writing to the file, it will
+    return the value of the constant `DB_WRITE_ERROR`.
+    """
+    config_parser = configparser.ConfigParser()
+    # Read the existing file first
+    config_parser.read(CONFIG_FILE_PATH)
+    if not config_parser.has_section("Threading"):
+        config_parser["Threading"] = {}
+    config_parser["Threading"]["mode"] = mode
+    config_parser["Threading"]["concurrent_requests"] = str(concurrent_requests)
+    config_parser["Threading"]["page_parallelism"] = str(page_parallelism)
+    try:
+        with open(CONFIG_FILE_PATH, "w") as file:
+            config_parser.write(file)
+    except OSError:
+        return DB_WRITE_ERROR
+    return SUCCESS
+
+def get_fetch_config() -> dict:
+    """
+    The function `get_fetch_config()` reads how the scheduler runs the endpoints when threading is
+    enabled. Config files created before the asyncio mode existed fall back to the worker threads, and
+    the ones created before parallel page fetching existed to sequential pages.
+    :return: a dictionary with the `mode`, `concurrent_requests` and `page_parallelism` settings.
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(CONFIG_FILE_PATH)
+    try:
+        mode = config_parser.get("Threading", "mode", fallback="threads")
+        if mode not in FETCH_MODES:
+            raise ValueError(f"mode must be one of {', '.join(FETCH_MODES)}")
+        return {
+            "mode": mode,
+            "concurrent_requests": max(1, config_parser.getint("Threading", "concurrent_requests", fallback=100)),
+            "page_parallelism": max(1, config_parser.getint("Threading", "page_parallelism", fallback=1)),
+        }
+    except ValueError as e:
+        typer.secho(
+            f'Threading Config File Error : {str(e)}',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+def get_write_back_config() -> dict:
+    """
+    The function `get_write_back_config()` reads the write-back configuration. Config files created
+    before write-back existed fall back to write-back disabled.
+    :return: a dictionary with the `enabled`, `flush_operations` and `flush_interval` settings, ready
+    to be passed to `database.write_back()`.
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(CONFIG_FILE_PATH)
+    try:
+        return {
+            "enabled": config_parser.get("WriteBack", "enabled", fallback="False") == "True",
+            "flush_operations": config_parser.getint("WriteBack", "flush_operations", fallback=0),
+            "flush_interval": config_parser.getfloat("WriteBack", "flush_interval", fallback=0.0),
+        }
+    except ValueError as e:
+        typer.secho(
+            f'Write-back Config File Error : {str(e)}',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
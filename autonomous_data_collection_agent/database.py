@@ -2,18 +2,84 @@
 
 import configparser
 import json
-from pysondb import PysonDB
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pysondb import errors as pysonErrors
 import typer
 import os
 
-from autonomous_data_collection_agent import DB_READ_ERROR, DB_WRITE_ERROR, JSON_ERROR, SUCCESS, __app_name__
+from autonomous_data_collection_agent import DB_READ_ERROR, DB_WRITE_ERROR, JSON_ERROR, SUCCESS, __app_name__, config
+from autonomous_data_collection_agent.json_db import JOURNAL_SUFFIX, JsonDB
+from autonomous_data_collection_agent.normalize import is_normalized, normalize_record
+from autonomous_data_collection_agent.snapshot import SnapshotDB, SnapshotError, write_snapshot
+from autonomous_data_collection_agent.sqlite_db import SQLiteDB
 
 # The code is creating file paths for two JSON database files: `database_endpoint.json` and
 # `database_application.json`.
 ENDPOINT_DB_FILE_PATH = os.path.join(os.getcwd(), __app_name__, "database_endpoint.json")
 APP_DB_FILE_PATH = os.path.join(os.getcwd(), __app_name__, "database_application.json")
 
+# Storage engines which can be selected with `storage_engine` in the `[General]` section of the config
+# file, together with the file extension used for their database files.
+STORAGE_ENGINES = {
+    "json": ".json",
+    "sqlite": ".sqlite3",
+    "snapshot": ".snap",
+}
+DEFAULT_STORAGE_ENGINE = "json"
+
+# File IO problems raised by any of the storage engines.
+STORAGE_IO_ERRORS = (OSError, sqlite3.Error)
+
+# Storage engines shared by every `DatabaseHandler` of the process, keyed by the real path of the
+# database file and the engine name, together with the identity of the file they were opened on.
+_storage_registry = {}
+
+# Long-lived handlers returned by `get_database_handler()`, keyed like `_storage_registry`.
+_handler_registry = {}
+
+# Storage engines switched to write-back by the active `write_back()` block, keyed by `id()`. `None`
+# when no write-back block is active.
+_write_back_storage = None
+_write_back_settings = {}
+_registry_lock = threading.RLock()
+
+# Parsed config files keyed by path, with the stat of the file when it was parsed.
+_config_cache = {}
+
+# A file modified less than this many seconds before it was parsed can change again without its
+# modification time moving, so it is not trusted and parsed again on the next read.
+_RACY_WINDOW = 1.0
+
+
+def _read_config(config_file: str) -> configparser.ConfigParser:
+    """
+    The function `_read_config` returns the parsed config file, parsing it again only when its inode,
+    modification time or size changed. The returned parser is shared and must not be modified.
+    
+    :param config_file: The `config_file` parameter is a string that represents the path to the
+    configuration file
+    :type config_file: str
+    :return: a `ConfigParser` object.
+    """
+    try:
+        stat = os.stat(config_file)
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        key = None
+    cached = _config_cache.get(config_file)
+    if key is not None and cached is not None and cached[0] == key:
+        return cached[1]
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    if key is not None and time.time() - stat.st_mtime > _RACY_WINDOW:
+        _config_cache[config_file] = (key, config_parser)
+    else:
+        _config_cache.pop(config_file, None)
+    return config_parser
+
 
 def get_database_path(config_file: str, item_type) -> str:
     """
@@ -29,31 +95,112 @@ def get_database_path(config_file: str, item_type) -> str:
     :return: the current path to the database as a string.
     """
 
-    config_parser = configparser.ConfigParser()
-    config_parser.read(config_file)
+    config_parser = _read_config(config_file)
     return str(config_parser["General"][f"{item_type}_database"])
 
 
-def init_database(db_path: str) -> int:
+def get_storage_engine(config_file: str) -> str:
+    """
+    The function `get_storage_engine` returns the storage engine selected in the `[General]` section of
+    the config file, falling back to the PysonDB JSON engine.
+    
+    :param config_file: The `config_file` parameter is a string that represents the path to the
+    configuration file
+    :type config_file: str
+    :return: the name of the storage engine, one of the keys of `STORAGE_ENGINES`.
+    """
+    config_parser = _read_config(config_file)
+    engine = config_parser.get("General", "storage_engine", fallback=DEFAULT_STORAGE_ENGINE)
+    return engine if engine in STORAGE_ENGINES else DEFAULT_STORAGE_ENGINE
+
+
+def get_lazy_load(config_file: str) -> bool:
+    """
+    The function `get_lazy_load` tells whether the JSON databases are read lazily, record by record,
+    instead of being loaded in memory as a whole. It reads the `lazy_load` key of the `[General]`
+    section of the config file and defaults to `False`.
+    
+    :param config_file: The `config_file` parameter is a string that represents the path to the
+    configuration file
+    :type config_file: str
+    :return: a boolean value.
+    """
+    config_parser = _read_config(config_file)
+    try:
+        return config_parser.getboolean("General", "lazy_load", fallback=False)
+    except ValueError:
+        return False
+
+
+def open_storage(db_path: str, engine: str, lazy: bool = False):
+    """
+    The function `open_storage` opens the database file with the given storage engine.
+    
+    :param db_path: The `db_path` parameter is a string that represents the path to the database file
+    :type db_path: str
+    :param engine: The `engine` parameter is the name of the storage engine (`json`, `sqlite` or
+    `snapshot`)
+    :type engine: str
+    :param lazy: The `lazy` parameter tells whether a JSON database reads its records from the file on
+    demand instead of keeping them in memory
+    :type lazy: bool
+    :return: a `JsonDB`, `SQLiteDB` or `SnapshotDB` instance.
+    """
+    if engine == "sqlite":
+        return SQLiteDB(db_path)
+    if engine == "snapshot":
+        return SnapshotDB(db_path)
+    return JsonDB(db_path, lazy=lazy)
+
+
+def init_database(db_path: str, engine: str = DEFAULT_STORAGE_ENGINE) -> int:
     """
-    The function `init_database` creates a new database by writing an empty JSON object to a specified
-    file path.
+    The function `init_database` creates a new, empty database at the specified file path for the given
+    storage engine.
     
     :param db_path: The `db_path` parameter is a string that represents the path to the database file
     :type db_path: str
+    :param engine: The `engine` parameter is the name of the storage engine, defaults to `json`
+    :type engine: str
     :return: an integer value. The possible return values are:
     """
     try:
-        with open(db_path, 'w') as file:
-            json.dump({
-            "version": 2,
-            "keys": [],
-            "data": {}
-        }, file)
+        if engine == "sqlite":
+            db = SQLiteDB(db_path)
+            db.purge()
+            db.close()
+            return SUCCESS
+        if engine == "snapshot":
+            write_snapshot(db_path, {"version": 2, "keys": [], "data": {}})
+        else:
+            with open(db_path, 'w') as file:
+                json.dump({
+                "version": 2,
+                "keys": [],
+                "data": {}
+            }, file)
+        # a journal left by a previous database would be replayed onto the new one
+        if os.path.exists(db_path + JOURNAL_SUFFIX):
+            os.remove(db_path + JOURNAL_SUFFIX)
         return SUCCESS
-    except OSError:
+    except STORAGE_IO_ERRORS:
         return DB_WRITE_ERROR
 
+
+def get_migration_path(db_path: str, engine: str) -> str:
+    """
+    The function `get_migration_path` returns the path of the database file that a migration to the
+    given storage engine will write, next to the current database file.
+    
+    :param db_path: The `db_path` parameter is the path of the current database file
+    :type db_path: str
+    :param engine: The `engine` parameter is the name of the target storage engine
+    :type engine: str
+    :return: the target database path as a string.
+    """
+    return os.path.splitext(db_path)[0] + STORAGE_ENGINES[engine]
+
+
 # The `DBResponse` class represents a response from a database query, containing a list of items and
 # an error code.
 class DBResponse:
@@ -66,17 +213,21 @@ class DBResponse:
 # The `DatabaseHandler` class provides methods for interacting with a database, including adding,
 # retrieving, updating, and deleting items.
 class DatabaseHandler:
-    def __init__(self, db_path: str) -> None:
+    def __init__(self, db_path: str, engine: str = None) -> None:
         """
         The function initializes an instance of a class with a given database path.
         
         :param db_path: The `db_path` parameter is a string that represents the path to the database
         file. It is used to initialize the `self._db_path` attribute of the class. This attribute stores
-        the path to the database file, which will be used to create an instance of the `PysonDB`
+        the path to the database file, which will be used to create an instance of the storage engine
         :type db_path: str
+        :param engine: The `engine` parameter is the storage engine to use (`json`, `sqlite` or
+        `snapshot`). When it is not given, the engine selected in the config file is used
+        :type engine: str
         """
         self._db_path = db_path
-        self._db = PysonDB(self._db_path)
+        self._engine = engine or get_storage_engine(config.CONFIG_FILE_PATH)
+        self._db = _open_shared_storage(self._db_path, self._engine)
     
     def add_item(self, item: dict) -> DBResponse:
         """
@@ -89,9 +240,11 @@ class DatabaseHandler:
         """
         try:
             # returns id of the item
-            return DBResponse([self._db.add(item)], SUCCESS)
-        except OSError:  # Catch file IO problems
+            return DBResponse([self._db.add(normalize_record(item))], SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_WRITE_ERROR)
+        except ValueError:  # A field has no valid canonical value
+            return DBResponse([], JSON_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
                     f"ID Not found/mismatch Error: {error.message}", fg=typer.colors.RED
@@ -110,7 +263,7 @@ class DatabaseHandler:
         """
         try:
             return DBResponse([self._db.get_by_id(id)], SUCCESS)
-        except OSError:  # Catch file IO problems
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
@@ -123,17 +276,17 @@ class DatabaseHandler:
         The function `get_by_query` retrieves data from a database based on a query string and returns a
         `DBResponse` object.
         
-        :param query_str: The `query_str` parameter is a string that represents a query to be executed
-        on the database. It can be a lambda expression that filters the data based on certain
-        conditions. For example, `lambda x: x['name'] == 'abi'` filters the data where the value of the
-        '
-        :type query_str: str
+        :param query_str: The `query_str` parameter is a `Query` built with `where()` that filters the data
+        based on certain conditions. For example, `where('name') == 'abi'` filters the data where the
+        value of the 'name' column is 'abi'. A `Query` is answered from the indexes when possible; a
+        lambda expression is still accepted but is checked against every record
+        :type query_str: Query
         :return: The code is returning a `DBResponse` object.
         """
-        # example query lambda x: x['name'] == 'abi' or lambda x: x['knows_python'] is False
+        # example query where('name') == 'abi', or lambda x: x['knows_python'] is False
         try:
             return DBResponse(self._db.get_by_query(query=query_str), SUCCESS) 
-        except OSError:  # Catch file IO problems
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
@@ -155,11 +308,23 @@ class DatabaseHandler:
         :type column_value: str
         :return: a `DBResponse` object.
         """
-        # example query lambda x: x['name'] == 'abi' or lambda x: x['knows_python'] is False
-    
+        return self.get_by_columns({column_name: column_value})
+
+    def get_by_columns(self, values: dict) -> DBResponse:
+        """
+        The function `get_by_columns` retrieves the records whose columns all equal the given values.
+        Lookups on the hot columns (`app_id`, `short_name`, `name`, `url_endpoint`, `status`,
+        `process_status` and the `(app_id, status, process_status)` combination) are answered by
+        the storage engine indexes instead of scanning every record.
+        
+        :param values: The `values` parameter is a dictionary of column names and the values they must
+        be equal to, for example `{'app_id': app_id, 'status': 1}`
+        :type values: dict
+        :return: a `DBResponse` object.
+        """
         try:
-            return  DBResponse(self._db.get_by_query(query=lambda x: x[column_name] == column_value), SUCCESS) 
-        except OSError:  # Catch file IO problems
+            return DBResponse(self._db.get_by_columns(values), SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
@@ -167,6 +332,82 @@ class DatabaseHandler:
                 )
             raise typer.Exit(1)
         
+    def get_fields(self, fields: list, query_str=None, values: dict = None) -> DBResponse:
+        """
+        The function `get_fields` retrieves only the given fields of the records, so callers listing or
+        checking a few columns do not copy whole records with their payloads and filters.
+        
+        :param fields: The `fields` parameter is the list of fields to return, for example
+        `['name', 'status']`. An empty list returns the matching ids with empty records
+        :type fields: list
+        :param query_str: The `query_str` parameter is an optional `Query` built with `where()` to filter
+        the records
+        :type query_str: Query
+        :param values: The `values` parameter is an optional dictionary of column names and the values
+        they must be equal to
+        :type values: dict
+        :return: a `DBResponse` object whose `item_list` is a dictionary of partial records keyed by id.
+        """
+        try:
+            return DBResponse(self._db.get_fields(fields, query=query_str, values=values), SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
+            return DBResponse({}, DB_READ_ERROR)
+
+    def get_records(self, factory, query_str=None, values: dict = None) -> DBResponse:
+        """
+        The function `get_records` builds an object from each record, for example a compact record of
+        the `records` module, without copying the stored records first.
+        
+        :param factory: The `factory` parameter is a callable taking the id and the record and returning
+        the object, such as `EndpointRecord.from_record`
+        :param query_str: The `query_str` parameter is an optional `Query` built with `where()` to filter
+        the records
+        :type query_str: Query
+        :param values: The `values` parameter is an optional dictionary of column names and the values
+        they must be equal to
+        :type values: dict
+        :return: a `DBResponse` object whose `item_list` is a dictionary of the built objects keyed by id.
+        """
+        try:
+            return DBResponse(self._db.get_records(factory, query=query_str, values=values), SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
+            return DBResponse({}, DB_READ_ERROR)
+
+    def count(self, query_str=None, values: dict = None) -> DBResponse:
+        """
+        The function `count` counts the records, or the records matching a query or column values,
+        without copying them.
+        
+        :param query_str: The `query_str` parameter is an optional `Query` built with `where()` to filter
+        the records
+        :type query_str: Query
+        :param values: The `values` parameter is an optional dictionary of column names and the values
+        they must be equal to
+        :type values: dict
+        :return: a `DBResponse` object whose `item_list` holds the number of records.
+        """
+        try:
+            return DBResponse([self._db.count(query=query_str, values=values)], SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
+            return DBResponse([], DB_READ_ERROR)
+
+    def group_counts(self, group_column: str, group_value) -> DBResponse:
+        """
+        The function `group_counts` counts the records of a group for each combination of the counted
+        columns, for example the endpoints of an application by `(status, process_status)`. The JSON
+        engine keeps these counts up to date on every mutation, so no record is read.
+        
+        :param group_column: The `group_column` parameter is the column the records are grouped by
+        :type group_column: str
+        :param group_value: The `group_value` parameter is the value of the group column
+        :return: a `DBResponse` object whose `item_list` holds a dictionary of counts keyed by tuples of
+        values of the counted columns.
+        """
+        try:
+            return DBResponse([self._db.group_counts(group_column, group_value)], SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
+            return DBResponse([], DB_READ_ERROR)
+
     def read_items(self) -> DBResponse:
         """
         The function reads items from a database and returns a response object.
@@ -174,7 +415,7 @@ class DatabaseHandler:
         """
         try:
             return DBResponse(self._db.get_all(), SUCCESS)
-        except OSError:  # Catch file IO problems
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
@@ -195,9 +436,11 @@ class DatabaseHandler:
         :return: a `DBResponse` object.
         """
         try:
-            return DBResponse(self._db.update_by_id(str(id), data), SUCCESS)
-        except OSError:  # Catch file IO problems
+            return DBResponse(self._db.update_by_id(str(id), normalize_record(data)), SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
+        except ValueError:  # A field has no valid canonical value
+            return DBResponse([], JSON_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
                     f"ID Not found/mismatch Error: {error.message}", fg=typer.colors.RED
@@ -209,21 +452,23 @@ class DatabaseHandler:
         The function `update_by_query` updates data in a database based on a query string and returns a
         response.
         
-        :param query_str: The `query_str` parameter is a string that represents a query condition. It
-        can be a lambda function that takes a dictionary as input and returns a boolean value. The
-        lambda function is used to filter the data in the database based on certain conditions
-        :type query_str: str
+        :param query_str: The `query_str` parameter is a `Query` built with `where()` that selects the
+        documents to update. It can also be a lambda function that takes a dictionary as input and
+        returns a boolean value, which is checked against every document
+        :type query_str: Query
         :param data: The `data` parameter is a dictionary that contains the updated values for the
         fields in the database. It is used to specify the new values that should be applied to the
         documents that match the query
         :type data: dict
         :return: a `DBResponse` object.
         """
-         # example query lambda x: x['name'] == 'abi' or lambda x: x['knows_python'] is False
+        # example query where('name') == 'abi', or lambda x: x['knows_python'] is False
         try:
-            return DBResponse(self._db.update_by_query(query_str, new_data=data), SUCCESS)
-        except OSError:  # Catch file IO problems
+            return DBResponse(self._db.update_by_query(query_str, new_data=normalize_record(data)), SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
+        except ValueError:  # A field has no valid canonical value
+            return DBResponse([], JSON_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
                     f"ID Not found/mismatch Error: {error.message}", fg=typer.colors.RED
@@ -243,7 +488,7 @@ class DatabaseHandler:
         try:
             self._db.delete_by_id(id)
             return DBResponse([], SUCCESS)
-        except OSError:  # Catch file IO problems
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
@@ -257,16 +502,16 @@ class DatabaseHandler:
         returns a response indicating the success or failure of the operation.
         
         :param query_str: The `query_str` parameter is a string that represents a query used to filter
-        and select specific data in the database. It can be a lambda expression that defines the
-        conditions for deleting data. For example, `lambda x: x['name'] == 'abi'` would delete all
-        records where the
-        :type query_str: str
+        and select specific data in the database. It is a `Query` built with `where()`, or a lambda
+        expression, that defines the conditions for deleting data. For example, `where('name') == 'abi'`
+        would delete all records where the name is 'abi'
+        :type query_str: Query
         :return: The function `delete_by_query` returns a `DBResponse` object.
         """
-         # example query lambda x: x['name'] == 'abi' or lambda x: x['knows_python'] is False
+        # example query where('name') == 'abi', or lambda x: x['knows_python'] is False
         try:
             return  DBResponse(self._db.delete_by_query(query_str), SUCCESS)
-        except OSError:  # Catch file IO problems
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
@@ -286,16 +531,32 @@ class DatabaseHandler:
         """
         # test = '[{"column_name":"created_at", "operator":"<", "column_value":"15-03-1988 10:58:15"}]'
         try:
-            item_list_ids = self._db.add_many(item_list, json_response= True)
+            item_list_ids = self._db.add_many([normalize_record(item) for item in item_list], json_response= True)
             return DBResponse(item_list_ids, SUCCESS)
-        except OSError:  # Catch file IO problems
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse(item_list, DB_WRITE_ERROR)
+        except ValueError:  # A field has no valid canonical value
+            return DBResponse(item_list, JSON_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
                     f"ID Not found/mismatch Error: {error.message}", fg=typer.colors.RED
                 )
             raise typer.Exit(1)
     
+    def add_fields(self, defaults: dict) -> DBResponse:
+        """
+        The function `add_fields` adds fields to the schema of a database written by an older version,
+        the existing records get the default values.
+        
+        :param defaults: The `defaults` parameter maps the fields to add to their default values
+        :type defaults: dict
+        :return: a `DBResponse` object with the list of the updated ids.
+        """
+        try:
+            return DBResponse(self._db.add_fields(defaults), SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
+            return DBResponse([], DB_WRITE_ERROR)
+
     def purge(self) -> DBResponse:
         """
         The `purge` function purges the database and returns a `DBResponse` object with an empty list
@@ -306,7 +567,7 @@ class DatabaseHandler:
         try:
             self._db.purge()
             return DBResponse([], SUCCESS)
-        except OSError:  # Catch file IO problems
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
             return DBResponse([], DB_READ_ERROR)
         except pysonErrors.IdDoesNotExistError as error:
             typer.secho(
@@ -314,4 +575,320 @@ class DatabaseHandler:
                 )
             raise typer.Exit(1)
 
-# python -m autonomous_data_collection_agent update-app 331280544566123098 -df "[{\"column_name\":\"CREATED_AT\",\"operator\":\"=\",\"column_value\":\"15-03-1988 10:58:15\"},{\"column_name\":\"UPDATED_AT\",\"operator\":\"=\", \"column_value\":\"15-03-1988 10:58:15\"}]"
\ No newline at end of file
+    def flush(self) -> DBResponse:
+        """
+        The function `flush` writes the changes kept in memory by write-back mode to the database file.
+        :return: a `DBResponse` object.
+        """
+        try:
+            self._db.flush()
+            return DBResponse([], SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
+            return DBResponse([], DB_WRITE_ERROR)
+
+    def transaction(self, *handlers: "DatabaseHandler"):
+        """
+        The function `transaction` returns a context manager grouping the operations made inside it on
+        this database, and on the databases of the other given handlers, into one transaction. See
+        `transaction()` at module level.
+        
+        :param handlers: The `handlers` parameter is any number of other `DatabaseHandler` objects whose
+        databases take part in the transaction
+        :return: a context manager.
+        """
+        return transaction(self, *handlers)
+
+    def compact(self) -> DBResponse:
+        """
+        The function `compact` folds the sync state journal into the database file (JSON engine) or
+        checkpoints the write-ahead log into the database file (SQLite engine).
+        :return: a `DBResponse` object.
+        """
+        try:
+            self._db.compact()
+            return DBResponse([], SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
+            return DBResponse([], DB_WRITE_ERROR)
+
+    def revision(self) -> DBResponse:
+        """
+        The function `revision` returns the revision of the database, a number increased by every write
+        made by any process. Changes made in write-back mode or inside a transaction are committed with a
+        compare-and-swap on this revision and applied again on top of the writes of other processes when
+        it moved.
+        :return: a `DBResponse` object whose `item_list` holds the revision.
+        """
+        try:
+            return DBResponse([self._db.revision()], SUCCESS)
+        except STORAGE_IO_ERRORS:  # Catch file IO problems
+            return DBResponse([], DB_READ_ERROR)
+
+    def wrote_revisions(self, since: int, until: int) -> bool:
+        """
+        The function `wrote_revisions` tells whether the database moved from a revision to another by
+        the writes of the current process only.
+        
+        :param since: The `since` parameter is the last revision already seen
+        :type since: int
+        :param until: The `until` parameter is the current revision
+        :type until: int
+        :return: `True` when every revision in between was written through the storage shared by the
+        process, `False` when another process may have written.
+        """
+        return self._db.wrote_revisions(since, until)
+
+def _storage_identity(db_path: str, engine: str):
+    # an SQLite connection keeps using the file it opened, so a replaced file needs a new connection,
+    # while `JsonDB` notices changed files by itself
+    try:
+        stat = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_dev, stat.st_ino) if engine == "sqlite" else True
+
+def _open_shared_storage(db_path: str, engine: str):
+    """
+    The function `_open_shared_storage` returns the storage engine shared by the whole process for the
+    given database file, opening it on first use or when the file was removed or replaced. Inside a
+    `write_back()` block the storage engine is switched to write-back.
+    
+    :param db_path: The `db_path` parameter is a string that represents the path to the database file
+    :type db_path: str
+    :param engine: The `engine` parameter is the name of the storage engine (`json`, `sqlite` or
+    `snapshot`)
+    :type engine: str
+    :return: a `JsonDB` or `SQLiteDB` instance.
+    """
+    key = (os.path.realpath(db_path), engine)
+    identity = _storage_identity(db_path, engine)
+    lazy = engine == "json" and get_lazy_load(config.CONFIG_FILE_PATH)
+    with _registry_lock:
+        entry = _storage_registry.get(key)
+        if entry is not None and identity is not None and entry[1] == identity and getattr(entry[0], "lazy", False) != lazy:
+            # the lazy load setting changed, keep the unflushed changes of the storage being replaced
+            entry[0].flush()
+            entry = None
+        if entry is None or identity is None or entry[1] != identity:
+            storage = open_storage(db_path, engine, lazy)
+            entry = (storage, _storage_identity(db_path, engine))
+            _storage_registry[key] = entry
+        storage = entry[0]
+        if _write_back_storage is not None and id(storage) not in _write_back_storage:
+            storage.set_write_back(True, **_write_back_settings)
+            _write_back_storage[id(storage)] = storage
+        return storage
+
+def get_database_handler(db_path: str, engine: str = None) -> DatabaseHandler:
+    """
+    The function `get_database_handler` returns the long-lived `DatabaseHandler` of the given database
+    file, so callers do not open and load the database again on every call.
+    
+    :param db_path: The `db_path` parameter is a string that represents the path to the database file
+    :type db_path: str
+    :param engine: The `engine` parameter is the storage engine to use (`json`, `sqlite` or
+    `snapshot`). When it is not given, the engine selected in the config file is used
+    :type engine: str
+    :return: a `DatabaseHandler` object.
+    """
+    engine = engine or get_storage_engine(config.CONFIG_FILE_PATH)
+    key = (os.path.realpath(db_path), engine)
+    with _registry_lock:
+        storage = _open_shared_storage(db_path, engine)
+        handler = _handler_registry.get(key)
+        if handler is None or handler._db is not storage:
+            handler = DatabaseHandler(db_path, engine)
+            _handler_registry[key] = handler
+        return handler
+
+@contextmanager
+def write_back(enabled: bool = True, flush_operations: int = 0, flush_interval: float = 0.0):
+    """
+    The function `write_back` is a context manager batching the database writes made inside it. The
+    shared storage engines of the process are switched to write-back, mutations are kept in memory and
+    written once when the block exits, or earlier every `flush_operations` mutations or
+    `flush_interval` seconds. Other processes only see the changes once they are flushed.
+    
+    :param enabled: The `enabled` parameter turns write-back on, when `False` the block does nothing
+    :type enabled: bool
+    :param flush_operations: The `flush_operations` parameter is the number of mutations after which a
+    database is flushed, `0` to only flush at the end of the block
+    :type flush_operations: int
+    :param flush_interval: The `flush_interval` parameter is the number of seconds after which a
+    database is flushed, `0` to only flush at the end of the block
+    :type flush_interval: float
+    """
+    global _write_back_storage, _write_back_settings
+    with _registry_lock:
+        if not enabled or _write_back_storage is not None:
+            # nested blocks are flushed by the outermost one
+            owner = False
+        else:
+            owner = True
+            _write_back_storage = {}
+            _write_back_settings = {"flush_operations": flush_operations, "flush_interval": flush_interval}
+            for storage, _ in _storage_registry.values():
+                storage.set_write_back(True, **_write_back_settings)
+                _write_back_storage[id(storage)] = storage
+    try:
+        yield
+    finally:
+        if owner:
+            with _registry_lock:
+                storages = list(_write_back_storage.values())
+                _write_back_storage = None
+            errors = []
+            for storage in storages:
+                try:
+                    storage.set_write_back(False)
+                except STORAGE_IO_ERRORS as error:
+                    errors.append(error)
+            if errors:
+                raise errors[0]
+
+@contextmanager
+def transaction(*handlers: DatabaseHandler):
+    """
+    The function `transaction` is a context manager running the operations made inside it on the
+    databases of the given handlers as one unit of work. Each database is loaded once and locked for
+    the other threads, the changes are committed together when the block exits and are all rolled
+    back when it raises. The JSON databases are committed first so that they can be reverted if a
+    later commit fails; a failed commit on a second SQLite database cannot undo the first one.
+    
+    :param handlers: The `handlers` parameter is one or more `DatabaseHandler` objects
+    """
+    storages = []
+    for handler in handlers:
+        if not any(handler._db is storage for storage in storages):
+            storages.append(handler._db)
+
+    begun = []
+    try:
+        for storage in storages:
+            storage.begin()
+            begun.append(storage)
+        yield
+    except BaseException:
+        for storage in reversed(begun):
+            storage.rollback()
+        raise
+
+    storages.sort(key=lambda storage: not hasattr(storage, "revert"))
+    committed = []
+    try:
+        for storage in storages:
+            storage.commit()
+            committed.append(storage)
+    except BaseException:
+        # the failed storage rolled itself back, release the ones not committed yet
+        for storage in storages[len(committed) + 1:]:
+            storage.rollback()
+        for storage in committed:
+            if hasattr(storage, "revert"):
+                storage.revert()
+        raise
+
+def migrate_database(source_path: str, source_engine: str, target_path: str, target_engine: str) -> DBResponse:
+    """
+    The function `migrate_database` copies every record, keeping its id, from one database file to
+    another, converting between storage engines. The target database is replaced.
+    
+    :param source_path: The `source_path` parameter is the path of the database to read from
+    :type source_path: str
+    :param source_engine: The `source_engine` parameter is the storage engine of the source database
+    :type source_engine: str
+    :param target_path: The `target_path` parameter is the path of the database to write to
+    :type target_path: str
+    :param target_engine: The `target_engine` parameter is the storage engine of the target database
+    :type target_engine: str
+    :return: a `DBResponse` object with the list of migrated ids.
+    """
+    try:
+        source = _open_shared_storage(source_path, source_engine)
+        records = source.get_all()
+        if target_engine == "sqlite":
+            target = SQLiteDB(target_path)
+            target.import_records(records)
+            target.close()
+        else:
+            keys = sorted(next(iter(records.values())).keys()) if records else []
+            if target_engine == "snapshot":
+                write_snapshot(target_path, {"version": 2, "keys": keys, "data": records})
+            else:
+                with open(target_path, 'w', encoding='utf-8') as file:
+                    json.dump({"version": 2, "keys": keys, "data": records}, file, indent=4)
+            if os.path.exists(target_path + JOURNAL_SUFFIX):
+                os.remove(target_path + JOURNAL_SUFFIX)
+        return DBResponse(list(records), SUCCESS)
+    except STORAGE_IO_ERRORS:
+        return DBResponse([], DB_WRITE_ERROR)
+    except (json.decoder.JSONDecodeError, SnapshotError):
+        return DBResponse([], JSON_ERROR)
+
+def normalize_database(db_path: str, engine: str) -> DBResponse:
+    """
+    The function `normalize_database` migrates the records stored by older versions, with JSON strings
+    and `'DD-MM-YYYY hh:mm:ss'` datetimes, to the canonical types of `normalize`. The records are
+    rewritten in a single commit, records already normalized are not touched.
+    
+    :param db_path: The `db_path` parameter is the path of the database to migrate
+    :type db_path: str
+    :param engine: The `engine` parameter is the storage engine of the database
+    :type engine: str
+    :return: a `DBResponse` object with the list of migrated ids. When some records hold values which
+    cannot be converted, they are left unchanged and the error is `JSON_ERROR` with their ids.
+    """
+    handler = get_database_handler(db_path, engine)
+    read = handler.read_items()
+    if read.error:
+        return read
+    migrated = []
+    invalid = []
+    try:
+        with handler.transaction():
+            for record_id, record in read.item_list.items():
+                if is_normalized(record):
+                    continue
+                try:
+                    normalized = normalize_record(record)
+                except ValueError:
+                    invalid.append(record_id)
+                    continue
+                handler._db.update_by_id(record_id, normalized)
+                migrated.append(record_id)
+    except STORAGE_IO_ERRORS:
+        return DBResponse([], DB_WRITE_ERROR)
+    if invalid:
+        return DBResponse(invalid, JSON_ERROR)
+    return DBResponse(migrated, SUCCESS)
+
+def export_database(db_path: str, engine: str, json_path: str) -> DBResponse:
+    """
+    The function `export_database` writes a database of any storage engine as a PysonDB JSON file,
+    keeping every record id.
+    
+    :param db_path: The `db_path` parameter is the path of the database to export
+    :type db_path: str
+    :param engine: The `engine` parameter is the storage engine of the database
+    :type engine: str
+    :param json_path: The `json_path` parameter is the path of the JSON file to write
+    :type json_path: str
+    :return: a `DBResponse` object with the list of exported ids.
+    """
+    return migrate_database(db_path, engine, json_path, "json")
+
+def import_database(json_path: str, db_path: str, engine: str) -> DBResponse:
+    """
+    The function `import_database` replaces a database of any storage engine with the records of a
+    PysonDB JSON file, keeping every record id.
+    
+    :param json_path: The `json_path` parameter is the path of the JSON file to read
+    :type json_path: str
+    :param db_path: The `db_path` parameter is the path of the database to replace
+    :type db_path: str
+    :param engine: The `engine` parameter is the storage engine of the database
+    :type engine: str
+    :return: a `DBResponse` object with the list of imported ids.
+    """
+    return migrate_database(json_path, "json", db_path, engine)
+
+# python -m autonomous_data_collection_agent update-app 331280544566123098 -df "[{\"column_name\":\"CREATED_AT\",\"operator\":\"=\",\"column_value\":\"15-03-1988 10:58:15\"},{\"column_name\":\"UPDATED_AT\",\"operator\":\"=\", \"column_value\":\"15-03-1988 10:58:15\"}]"
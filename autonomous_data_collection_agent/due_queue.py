@@ -0,0 +1,117 @@
+"""This module provides the queue of the applications due for a sync of the Autonomous Data Collector Agent.
+
+The scheduler service keeps the active applications in a min-heap of `(due time, app id)`, so it can
+sleep until the earliest one is due instead of reading every application on a fixed tick. The queue
+is built again from the `next_sync` of the applications when they change.
+
+An application whose sync leaves it due, because some endpoints failed and the application is still
+in progress, is deferred by `RETRY_INTERVAL` seconds like the fixed tick did, until its `next_sync`
+moves.
+"""
+
+import heapq
+import itertools
+
+# Seconds before an application still due after a sync is synced again.
+RETRY_INTERVAL = 60.0
+
+
+# The `DueQueue` class is a min-heap of applications by due time. Rescheduled applications leave stale
+# entries in the heap, skipped when they reach the top.
+class DueQueue:
+    def __init__(self) -> None:
+        """
+        The function initializes an empty queue.
+        """
+        self._heap = []
+        # app id -> (due time, sequence, next_sync) of its live entry
+        self._entries = {}
+        # app id -> (next_sync, time) before which the application is not due while its next_sync is unchanged
+        self._deferrals = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, app_id) -> bool:
+        return app_id in self._entries
+
+    def schedule(self, app_id: str, next_sync=None) -> float:
+        """
+        The function `schedule` adds an application to the queue, or moves it.
+
+        :param app_id: The `app_id` parameter is the id of the application
+        :type app_id: str
+        :param next_sync: The `next_sync` parameter is the timestamp of the next sync of the application,
+        an unset `next_sync` is due now
+        :return: the due time of the application.
+        """
+        due = float(next_sync) if next_sync is not None else 0.0
+        deferral = self._deferrals.get(app_id)
+        if deferral is not None:
+            if deferral[0] == next_sync:
+                due = max(due, deferral[1])
+            else:
+                del self._deferrals[app_id]
+        sequence = next(self._sequence)
+        self._entries[app_id] = (due, sequence, next_sync)
+        heapq.heappush(self._heap, (due, sequence, app_id))
+        return due
+
+    def rebuild(self, applications: dict) -> None:
+        """
+        The function `rebuild` replaces the content of the queue. The deferrals of the applications whose
+        `next_sync` did not change are kept.
+
+        :param applications: The `applications` parameter maps the id of every application to schedule to
+        a record with its `next_sync`
+        :type applications: dict
+        """
+        self._heap = []
+        self._entries = {}
+        self._deferrals = {app_id: deferral for app_id, deferral in self._deferrals.items() if app_id in applications}
+        for app_id, application in applications.items():
+            self.schedule(app_id, application.get('next_sync'))
+
+    def _top(self):
+        # drops the stale entries from the top of the heap
+        heap = self._heap
+        while heap:
+            due, sequence, app_id = heap[0]
+            entry = self._entries.get(app_id)
+            if entry is not None and entry[0] == due and entry[1] == sequence:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def next_due(self):
+        """
+        The function `next_due` returns the earliest due time.
+        :return: the timestamp, or None when the queue is empty.
+        """
+        top = self._top()
+        return top[0] if top is not None else None
+
+    def defer_due(self, now: float, until: float) -> list:
+        """
+        The function `defer_due` defers the applications due at a time, called after a sync for the
+        applications it left due.
+
+        :param now: The `now` parameter is the current timestamp
+        :type now: float
+        :param until: The `until` parameter is the timestamp before which the applications are not due
+        again, unless their `next_sync` changes
+        :type until: float
+        :return: the ids of the deferred applications.
+        """
+        deferred = []
+        while True:
+            top = self._top()
+            # an application deferred to a time already past is due again at once, stop there
+            if top is None or top[0] > now or top[2] in deferred:
+                return deferred
+            app_id = top[2]
+            next_sync = self._entries[app_id][2]
+            self._deferrals[app_id] = (next_sync, until)
+            self.schedule(app_id, next_sync)
+            deferred.append(app_id)
@@ -0,0 +1,205 @@
+"""This module provides the change notifications of the applications and endpoints of the Autonomous Data Collector Agent.
+
+`Applications` and `Endpoints` publish a `ChangeEvent` on the process event bus after every mutation,
+so caches and the scheduler can follow the changes instead of reading the databases again. Changes
+made by other processes, like the CLI editing the databases while the scheduler service runs, are
+reported by a `DatabaseWatcher`, which polls the revision of the databases and publishes a `CHANGED`
+event when it moved.
+"""
+
+import logging
+import threading
+
+# Kinds of change.
+ADDED = 'added'
+UPDATED = 'updated'
+REMOVED = 'removed'
+# Records changed in a way the publisher cannot tell, for example by another process or by a rolled
+# back transaction. Subscribers should read the records again.
+CHANGED = 'changed'
+
+# Seconds between two checks of the database revisions by a `DatabaseWatcher`.
+WATCH_INTERVAL = 1.0
+
+
+# The `ChangeEvent` class represents a change of applications or endpoints: the item type (`'app'` or
+# `'endpoint'`), the kind of change, the ids of the changed records and the changed fields. `ids` is
+# `None` when every record may have changed and `fields` is `None` when every field may have changed.
+class ChangeEvent:
+    item_type: str
+    kind: str
+    ids: list
+    fields: tuple
+    external: bool
+    def __init__(self, item_type, kind, ids=None, fields=None, external=False):
+        self.item_type = item_type
+        self.kind = kind
+        self.ids = ids
+        self.fields = fields
+        self.external = external
+
+    def touches(self, fields) -> bool:
+        """
+        The function `touches` tells whether the change may affect any of the given fields.
+
+        :param fields: The `fields` parameter is an iterable of field names
+        :return: a boolean value.
+        """
+        return self.kind != UPDATED or self.fields is None or any(field in self.fields for field in fields)
+
+
+# The `EventBus` class delivers change events to the subscribed callbacks, synchronously in the thread
+# of the publisher. A failing callback is logged and does not stop the delivery to the others.
+class EventBus:
+    def __init__(self) -> None:
+        """
+        The function initializes a bus without subscribers.
+        """
+        self.lock = threading.Lock()
+        self._subscribers = []
+
+    def subscribe(self, callback, item_type: str = None):
+        """
+        The function `subscribe` registers a callback for the change events.
+
+        :param callback: The `callback` parameter is a callable taking a `ChangeEvent`
+        :param item_type: The `item_type` parameter limits the events to `'app'` or `'endpoint'`, all the
+        events are delivered when it is None
+        :type item_type: str
+        :return: a function without parameters which unsubscribes the callback.
+        """
+        subscriber = (callback, item_type)
+        with self.lock:
+            self._subscribers = self._subscribers + [subscriber]
+
+        def unsubscribe():
+            with self.lock:
+                self._subscribers = [other for other in self._subscribers if other is not subscriber]
+        return unsubscribe
+
+    def publish(self, event: ChangeEvent) -> None:
+        """
+        The function `publish` delivers an event to the subscribers of its item type.
+
+        :param event: The `event` parameter is the change event
+        :type event: ChangeEvent
+        """
+        # the list is replaced on change, so it can be walked without the lock
+        for callback, item_type in self._subscribers:
+            if item_type is not None and item_type != event.item_type:
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(f"Change event subscriber {callback!r} failed. Error Details : {str(e)}")
+
+
+# Bus shared by the whole process.
+_bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    """
+    The function `get_event_bus` returns the event bus shared by the process.
+    :return: an `EventBus` object.
+    """
+    return _bus
+
+
+def publish_change(item_type: str, kind: str, ids=None, fields=None) -> None:
+    """
+    The function `publish_change` publishes a change of the current process on the shared event bus.
+
+    :param item_type: The `item_type` parameter is `'app'` or `'endpoint'`
+    :type item_type: str
+    :param kind: The `kind` parameter is one of `ADDED`, `UPDATED`, `REMOVED` or `CHANGED`
+    :type kind: str
+    :param ids: The `ids` parameter is the list of the changed record ids, or None for every record
+    :param fields: The `fields` parameter is the collection of the changed fields, or None for every
+    field
+    """
+    _bus.publish(ChangeEvent(item_type, kind, list(ids) if ids is not None else None, tuple(fields) if fields is not None else None))
+
+
+# The `DatabaseWatcher` class bridges the changes made by other processes to the event bus. It reads
+# the revision of each database, a number increased by every write, and publishes an external
+# `CHANGED` event for the databases whose revision moved. The revisions written by the current process,
+# which publishes its own events, are skipped.
+class DatabaseWatcher:
+    def __init__(self, handlers: dict, interval: float = WATCH_INTERVAL, bus: EventBus = None) -> None:
+        """
+        The function initializes a watcher, the revisions are read once so only later changes are
+        reported.
+
+        :param handlers: The `handlers` parameter maps the item types (`'app'`, `'endpoint'`) to the
+        `DatabaseHandler` objects of their databases
+        :type handlers: dict
+        :param interval: The `interval` parameter is the number of seconds between two checks when the
+        watcher runs in the background
+        :type interval: float
+        :param bus: The `bus` parameter is the event bus to publish on, defaults to the shared one
+        :type bus: EventBus
+        """
+        self.handlers = dict(handlers)
+        self.interval = interval
+        self.bus = bus or _bus
+        self._revisions = {item_type: self._read_revision(handler) for item_type, handler in self.handlers.items()}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _read_revision(handler):
+        revision = handler.revision()
+        return revision.item_list[0] if not revision.error else None
+
+    def sync(self) -> None:
+        """
+        The function `sync` reads the current revisions without publishing, so the writes made so far by
+        other processes are not reported.
+        """
+        for item_type, handler in self.handlers.items():
+            self._revisions[item_type] = self._read_revision(handler)
+
+    def poll(self) -> list:
+        """
+        The function `poll` checks the revisions once and publishes an event per changed database.
+        :return: the list of the item types whose database changed.
+        """
+        changed = []
+        for item_type, handler in self.handlers.items():
+            revision = self._read_revision(handler)
+            previous = self._revisions.get(item_type)
+            if revision is None or revision == previous:
+                continue
+            self._revisions[item_type] = revision
+            if previous is not None and handler.wrote_revisions(previous, revision):
+                continue
+            changed.append(item_type)
+            self.bus.publish(ChangeEvent(item_type, CHANGED, external=True))
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error(f"Watching the databases failed. Error Details : {str(e)}")
+
+    def start(self) -> None:
+        """
+        The function `start` starts checking the revisions every `interval` seconds in a daemon thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='adca-database-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        The function `stop` stops the background thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,175 @@
+"""This module provides the cross-process advisory file lock and store revision of the Autonomous Data Collector Agent databases."""
+
+import os
+import threading
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Suffix added to the database file name to get the lock file name.
+LOCK_SUFFIX = '.lock'
+
+# Number of the latest revisions written by a store that it remembers.
+OWN_REVISIONS = 4096
+
+
+# The `FileLock` class is an exclusive advisory lock on a lock file next to a database file, shared by
+# every process using the database (`fcntl.flock` on POSIX, `msvcrt.locking` on Windows). The lock file
+# also holds the revision of the store, a number increased by every write made under the lock, so a
+# process can tell whether another one wrote the database since it loaded it.
+#
+# The lock is reentrant but not thread safe, callers serialize threads with their own lock.
+class FileLock:
+    def __init__(self, path: str) -> None:
+        """
+        The function initializes the lock. The lock file is created on first use.
+
+        :param path: The `path` parameter is the path of the lock file
+        :type path: str
+        """
+        self.path = path
+        self._file = None
+        self._depth = 0
+
+    @property
+    def locked(self) -> bool:
+        return self._depth > 0
+
+    def acquire(self) -> None:
+        """
+        The function `acquire` blocks until the lock is held by this process.
+        """
+        if self._depth == 0:
+            f = open(self.path, 'a+b')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                else:
+                    f.seek(0)
+                    while True:
+                        try:
+                            # `LK_LOCK` gives up after 10 seconds, keep waiting like `flock` does
+                            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue
+            except BaseException:
+                f.close()
+                raise
+            self._file = f
+        self._depth += 1
+
+    def release(self) -> None:
+        """
+        The function `release` releases the lock once it was released as many times as it was acquired.
+        """
+        self._depth -= 1
+        if self._depth:
+            return
+        f, self._file = self._file, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def read_revision(self) -> int:
+        """
+        The function `read_revision` returns the revision of the store. Must be called with the lock held.
+        :return: the revision as an integer, `0` for a store never written under the lock.
+        """
+        self._file.seek(0)
+        try:
+            return int(self._file.read().strip() or 0)
+        except ValueError:
+            return 0
+
+    def write_revision(self, revision: int) -> None:
+        """
+        The function `write_revision` stores the revision of the store. Must be called with the lock held.
+
+        :param revision: The `revision` parameter is the new revision
+        :type revision: int
+        """
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(str(revision).encode('ascii'))
+        self._file.flush()
+
+
+def read_revision(path: str) -> int:
+    """
+    The function `read_revision` returns the revision stored in a lock file without taking the lock.
+
+    :param path: The `path` parameter is the path of the lock file
+    :type path: str
+    :return: the revision as an integer, `0` when the lock file does not exist.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+# The `OwnRevisions` class remembers the latest revisions written by a store object, so the writes of
+# the current process can be told from the writes of other processes. Every write increases the
+# revision by one, so a range of revisions was written by the store when it remembers each of them.
+class OwnRevisions:
+    def __init__(self, size: int = OWN_REVISIONS) -> None:
+        """
+        The function initializes an empty record of revisions.
+
+        :param size: The `size` parameter is the number of the latest revisions remembered
+        :type size: int
+        """
+        self.lock = threading.Lock()
+        self.size = size
+        self._order = deque()
+        self._revisions = set()
+
+    def add(self, revision: int) -> None:
+        """
+        The function `add` records a revision written by the store, once the write is committed.
+
+        :param revision: The `revision` parameter is the revision
+        :type revision: int
+        """
+        with self.lock:
+            if revision in self._revisions:
+                return
+            self._order.append(revision)
+            self._revisions.add(revision)
+            if len(self._order) > self.size:
+                self._revisions.discard(self._order.popleft())
+
+    def covers(self, since: int, until: int) -> bool:
+        """
+        The function `covers` tells whether every revision after `since` up to `until` was written by the
+        store.
+
+        :param since: The `since` parameter is the last revision already seen
+        :type since: int
+        :param until: The `until` parameter is the current revision
+        :type until: int
+        :return: `False` when another process may have written, or when the revision went back because
+        the database was replaced.
+        """
+        if until <= since or until - since > self.size:
+            return False
+        with self.lock:
+            return all(revision in self._revisions for revision in range(since + 1, until + 1))
@@ -0,0 +1,293 @@
+"""This module provides the in-memory secondary indexes used by the Autonomous Data Collector Agent storage engines."""
+
+# Columns looked up on every CLI command and scheduler tick. Each one gets its own hash index.
+HOT_COLUMNS = ('app_id', 'short_name', 'name', 'url_endpoint', 'status', 'process_status')
+
+# Column combinations queried together by the scheduler. Each one gets a composite hash index.
+COMPOSITE_INDEXES = (('app_id', 'status', 'process_status'),)
+
+# Columns counted per value of a group column, so the scheduler reads how many endpoints of an
+# application are in each `(status, process_status)` without looking at them.
+COUNTERS = (('app_id', ('status', 'process_status')),)
+
+_MISSING = object()
+
+
+# The `HashIndex` class maps the values of one or more columns to the set of record ids holding them.
+class HashIndex:
+    def __init__(self, columns: tuple) -> None:
+        """
+        The function initializes an empty hash index over the given columns.
+
+        :param columns: The `columns` parameter is a tuple of the column names covered by the index
+        :type columns: tuple
+        """
+        self.columns = tuple(columns)
+        self._buckets = {}
+
+    def key(self, record: dict):
+        """
+        The function `key` returns the index key of a record, or `None` when the record does not have
+        every indexed column or holds an unhashable value in one of them.
+
+        :param record: The `record` parameter is the record to build the key for
+        :type record: dict
+        :return: a tuple of the column values, or `None`.
+        """
+        values = tuple(record.get(column, _MISSING) for column in self.columns)
+        if _MISSING in values:
+            return None
+        try:
+            hash(values)
+        except TypeError:
+            return None
+        return values
+
+    def add(self, record_id: str, record: dict) -> None:
+        key = self.key(record)
+        if key is not None:
+            self._buckets.setdefault(key, set()).add(record_id)
+
+    def remove(self, record_id: str, record: dict) -> None:
+        key = self.key(record)
+        if key is None:
+            return
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.discard(record_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def lookup(self, values: tuple) -> set:
+        """
+        The function `lookup` returns the ids of the records whose indexed columns equal `values`.
+
+        :param values: The `values` parameter is a tuple of values in the order of the index columns
+        :type values: tuple
+        :return: a set of record ids. The set must not be modified by the caller.
+        """
+        try:
+            return self._buckets.get(tuple(values), frozenset())
+        except TypeError:
+            return frozenset()
+
+    def clear(self) -> None:
+        self._buckets = {}
+
+
+# The `GroupCounter` class counts the records holding each combination of values of some columns, per
+# value of a group column. A missing column counts as `None`, like in equality lookups. Records with an
+# unhashable value in one of the columns are not counted, the counter then declines to answer.
+class GroupCounter:
+    def __init__(self, group_column: str, columns: tuple) -> None:
+        """
+        The function initializes empty counters.
+
+        :param group_column: The `group_column` parameter is the name of the column the records are
+        grouped by
+        :type group_column: str
+        :param columns: The `columns` parameter is a tuple of the column names counted in each group
+        :type columns: tuple
+        """
+        self.group_column = group_column
+        self.columns = tuple(columns)
+        self._counts = {}
+        self._uncounted = 0
+
+    def key(self, record: dict):
+        values = (record.get(self.group_column),) + tuple(record.get(column) for column in self.columns)
+        try:
+            hash(values)
+        except TypeError:
+            return None
+        return values
+
+    def _change(self, key, delta: int) -> None:
+        if key is None:
+            self._uncounted += delta
+            return
+        group = self._counts.setdefault(key[0], {})
+        count = group.get(key[1:], 0) + delta
+        if count:
+            group[key[1:]] = count
+        else:
+            group.pop(key[1:], None)
+            if not group:
+                del self._counts[key[0]]
+
+    def add(self, record: dict) -> None:
+        self._change(self.key(record), 1)
+
+    def remove(self, record: dict) -> None:
+        self._change(self.key(record), -1)
+
+    def update(self, old_record: dict, new_record: dict) -> None:
+        old_key = self.key(old_record)
+        new_key = self.key(new_record)
+        if old_key != new_key:
+            self._change(old_key, -1)
+            self._change(new_key, 1)
+
+    def counts(self, group_value):
+        """
+        The function `counts` returns the number of records of a group for each combination of values.
+
+        :param group_value: The `group_value` parameter is the value of the group column
+        :return: a new dictionary keyed by tuples of values in the order of the counted columns, or
+        `None` when some records could not be counted.
+        """
+        if self._uncounted:
+            return None
+        try:
+            return dict(self._counts.get(group_value, {}))
+        except TypeError:
+            return None
+
+    def count(self, values: dict):
+        """
+        The function `count` returns the number of records whose columns equal `values`.
+
+        :param values: The `values` parameter is a dictionary of column names and values to match, it
+        must give the group column and may give any of the counted columns
+        :type values: dict
+        :return: the number of records, or `None` when the counter cannot answer for these columns.
+        """
+        if self.group_column not in values or not set(values) <= {self.group_column, *self.columns}:
+            return None
+        counts = self.counts(values[self.group_column])
+        if counts is None:
+            return None
+        wanted = [(position, values[column]) for position, column in enumerate(self.columns) if column in values]
+        return sum(count for key, count in counts.items() if all(key[position] == value for position, value in wanted))
+
+    def clear(self) -> None:
+        self._counts = {}
+        self._uncounted = 0
+
+
+# The `IndexSet` class keeps a group of hash indexes in sync with the records of one database and
+# answers equality lookups on any combination of columns.
+class IndexSet:
+    def __init__(self, columns: tuple = HOT_COLUMNS, composites: tuple = COMPOSITE_INDEXES, counters: tuple = COUNTERS) -> None:
+        """
+        The function initializes one hash index per column and per composite column group, and the
+        group counters.
+
+        :param columns: The `columns` parameter is a tuple of the column names to index individually
+        :type columns: tuple
+        :param composites: The `composites` parameter is a tuple of column name tuples to index together
+        :type composites: tuple
+        :param counters: The `counters` parameter is a tuple of `(group_column, columns)` tuples to count
+        :type counters: tuple
+        """
+        self._indexes = {}
+        for column in columns:
+            self._indexes[(column,)] = HashIndex((column,))
+        for composite in composites:
+            self._indexes[tuple(composite)] = HashIndex(composite)
+        self._counters = {group_column: GroupCounter(group_column, counted) for group_column, counted in counters}
+
+    def rebuild(self, records: dict) -> None:
+        """
+        The function `rebuild` drops every index and builds them again from `records`.
+
+        :param records: The `records` parameter is a dictionary of records keyed by id
+        :type records: dict
+        """
+        for index in self._indexes.values():
+            index.clear()
+        for counter in self._counters.values():
+            counter.clear()
+        for record_id, record in records.items():
+            self.add(record_id, record)
+
+    def add(self, record_id: str, record: dict) -> None:
+        for index in self._indexes.values():
+            index.add(record_id, record)
+        for counter in self._counters.values():
+            counter.add(record)
+
+    def remove(self, record_id: str, record: dict) -> None:
+        for index in self._indexes.values():
+            index.remove(record_id, record)
+        for counter in self._counters.values():
+            counter.remove(record)
+
+    def update(self, record_id: str, old_record: dict, new_record: dict) -> None:
+        """
+        The function `update` moves a record between buckets of the indexes whose columns changed.
+
+        :param record_id: The `record_id` parameter is the id of the updated record
+        :type record_id: str
+        :param old_record: The `old_record` parameter is the record before the update
+        :type old_record: dict
+        :param new_record: The `new_record` parameter is the record after the update
+        :type new_record: dict
+        """
+        for index in self._indexes.values():
+            old_key = index.key(old_record)
+            new_key = index.key(new_record)
+            if old_key != new_key:
+                index.remove(record_id, old_record)
+                index.add(record_id, new_record)
+        for counter in self._counters.values():
+            counter.update(old_record, new_record)
+
+    def count(self, values: dict):
+        """
+        The function `count` answers a count of the records whose columns equal `values` from the group
+        counters, without looking at the records.
+
+        :param values: The `values` parameter is a dictionary of column names and values to match
+        :type values: dict
+        :return: the number of records, or `None` when no counter covers the columns.
+        """
+        for counter in self._counters.values():
+            count = counter.count(values)
+            if count is not None:
+                return count
+        return None
+
+    def group_counts(self, group_column: str, group_value):
+        """
+        The function `group_counts` returns the counts of a group kept by the counter of `group_column`.
+
+        :param group_column: The `group_column` parameter is the name of the group column
+        :type group_column: str
+        :param group_value: The `group_value` parameter is the value of the group column
+        :return: a dictionary keyed by tuples of values of the counted columns, or `None` when the column
+        has no counter or the counter cannot answer.
+        """
+        counter = self._counters.get(group_column)
+        return counter.counts(group_value) if counter is not None else None
+
+    def is_indexed(self, column: str) -> bool:
+        return (column,) in self._indexes
+
+    def lookup(self, values: dict):
+        """
+        The function `lookup` returns the candidate ids for an equality lookup on the given columns. A
+        composite index covering exactly those columns is used when there is one, otherwise the smallest
+        bucket among the single column indexes. The caller still has to check the remaining columns.
+
+        :param values: The `values` parameter is a dictionary of column names and the values to match
+        :type values: dict
+        :return: a tuple `(ids, covered)` where `covered` tells whether every column was matched by the
+        index, or `None` when none of the columns is indexed.
+        """
+        columns = tuple(values)
+        for index_columns, index in self._indexes.items():
+            if len(index_columns) == len(columns) and set(index_columns) == set(columns):
+                return index.lookup(tuple(values[column] for column in index_columns)), True
+
+        best = None
+        for column in columns:
+            index = self._indexes.get((column,))
+            if index is None:
+                continue
+            ids = index.lookup((values[column],))
+            if best is None or len(ids) < len(best):
+                best = ids
+        if best is None:
+            return None
+        return best, len(columns) == 1
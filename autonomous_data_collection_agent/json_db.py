@@ -0,0 +1,884 @@
+"""This module provides the cached and indexed PysonDB JSON storage engine for the Autonomous Data Collector Agent database."""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pysondb import PysonDB
+from pysondb import errors as pysonErrors
+
+from autonomous_data_collection_agent.file_lock import LOCK_SUFFIX, FileLock, OwnRevisions, read_revision
+from autonomous_data_collection_agent.indexes import COUNTERS, IndexSet
+from autonomous_data_collection_agent.lazy_json import (
+    OFFSETS_SUFFIX, LazyRecords, file_identity, hot_values, load_lazy, write_database, write_offsets
+)
+from autonomous_data_collection_agent.query import Query
+
+# Sync state fields changed on every scheduler run. Updates touching only these fields are appended to
+# the journal instead of rewriting the database file.
+JOURNAL_FIELDS = ('process_status', 'failed_count', 'failed_time', 'last_sync')
+
+# Suffix added to the database file name to get the journal file name.
+JOURNAL_SUFFIX = '.journal'
+
+# Number of journal entries after which the journal is folded into the database file.
+JOURNAL_COMPACT_ENTRIES = 500
+
+
+def copy_record(value):
+    """
+    The function `copy_record` returns a copy of a JSON compatible value, copying nested dicts and lists
+    so callers can change the returned record without touching the cached one.
+
+    :param value: The `value` parameter is a record or any value stored in a record
+    :return: the copied value.
+    """
+    if isinstance(value, dict):
+        return {k: copy_record(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_record(v) for v in value]
+    return value
+
+
+# The `JsonDB` class is a `PysonDB` that keeps the parsed database file in memory together with hash
+# indexes on the hot columns. The file is only parsed again when its modification time or size
+# changes, so lookups do not pay for a full `json.load` and equality lookups on indexed columns do not
+# scan every record. The file format stays the PysonDB format.
+#
+# In write-back mode mutations only change the in-memory document and the file is written once per
+# `flush()`, or automatically every `flush_operations` mutations or `flush_interval` seconds.
+#
+# Updates which only change `journal_fields` are appended to a journal file next to the database file
+# (`<database>.journal`, one JSON line per changed record) and replayed on load. The journal is folded
+# into the database file by the next full write, or by a background compaction once it grows past
+# `JOURNAL_COMPACT_ENTRIES` entries.
+#
+# `begin()`, `commit()` and `rollback()` group several operations into one transaction: the file is
+# loaded once, the operations only change the in-memory document and `commit()` writes them at once.
+#
+# In lazy mode the records are not kept in memory: the file is scanned once into an offset index
+# (`<database>.offsets`) and records are parsed from the file when they are read, so memory grows with
+# the number of ids instead of the size of the records. Writes stream the file record by record.
+#
+# Several processes can share the database. Every write takes an advisory lock on `<database>.lock`,
+# which also holds the revision of the store, increased by every write. Single operations load and
+# write the file under the lock. Changes kept in memory by write-back mode or a transaction are
+# committed with a compare-and-swap on the revision: when another process wrote the database in the
+# meantime, the file is loaded again and the logged operations are applied on top of it before writing.
+class JsonDB(PysonDB):
+    def __init__(self, filename: str, indent: int = 4, journal_fields: tuple = JOURNAL_FIELDS, lazy: bool = False) -> None:
+        """
+        The function initializes the engine and creates the database file if it does not exist.
+
+        :param filename: The `filename` parameter is a string that represents the path to the JSON
+        database file
+        :type filename: str
+        :param indent: The `indent` parameter is the indentation used when writing the file
+        :type indent: int
+        :param journal_fields: The `journal_fields` parameter is the tuple of fields whose updates are
+        appended to the journal, an empty tuple disables the journal
+        :type journal_fields: tuple
+        :param lazy: The `lazy` parameter tells whether records are read from the file on demand instead
+        of being kept in memory
+        :type lazy: bool
+        """
+        self.lazy = lazy
+        self.offsets_path = filename + OFFSETS_SUFFIX
+        self.journal_path = filename + JOURNAL_SUFFIX
+        self.file_lock = FileLock(filename + LOCK_SUFFIX)
+        self._revision = 0
+        # revisions written by this object, told apart from the writes of other processes
+        self._own_revisions = OwnRevisions()
+        self._ops = []
+        self.journal_fields = frozenset(journal_fields)
+        self._journal_entries = 0
+        self._compactor = None
+        self._doc = None
+        self._stat = None
+        self.indexes = IndexSet()
+        self.write_back = False
+        self.flush_operations = 0
+        self.flush_interval = 0.0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._txn = None
+        self._txn_depth = 0
+        self._undo = None
+        super().__init__(filename, auto_update=True, indent=indent)
+        # transactions hold the lock while the operations inside them take it again
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def _path_stat(path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # atomic writes replace the file, so the inode changes even when the time and size do not
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _file_stat(self):
+        return (self._path_stat(self.filename), self._path_stat(self.journal_path))
+
+    def _load(self) -> dict:
+        """
+        The function `_load` returns the cached database document, parsing the file and replaying the
+        journal again and rebuilding the indexes only when one of them changed on disk. Must be called
+        with the lock held.
+        :return: the database document.
+        """
+        if self._pending or self._txn is not None:
+            # the document holds changes the file does not have yet
+            return self._doc
+        stat = self._file_stat()
+        if self._doc is None or stat != self._stat:
+            self._read_doc(stat)
+        return self._doc
+
+    def _read_doc(self, stat) -> None:
+        # writers store the file before the revision, so reading the revision first never pairs an old
+        # file with a newer revision
+        if self.file_lock.locked:
+            revision = self.file_lock.read_revision()
+        else:
+            revision = read_revision(self.file_lock.path)
+        if self.lazy:
+            doc = load_lazy(self.filename)
+        else:
+            doc = self._load_file()
+            if not isinstance(doc.get('data'), dict):
+                raise pysonErrors.SchemaTypeError('"data" key in the DB must be of type dict')
+        self._journal_entries = self._replay_journal(doc['data'])
+        self._doc = doc
+        self._stat = stat
+        self._revision = revision
+        self._rebuild_indexes()
+
+    @contextmanager
+    def _exclusive(self):
+        # the thread lock is always taken before the file lock
+        with self.lock, self.file_lock:
+            yield
+
+    def _check_revision(self) -> bool:
+        """
+        The function `_check_revision` is the compare part of the compare-and-swap done before every
+        write. When another process wrote the database since it was loaded, the file is loaded again and
+        the logged operations are applied on top of it. Must be called with the file lock held.
+        :return: `True` when the document was up to date, `False` when it was rebased.
+        """
+        if self.file_lock.read_revision() == self._revision:
+            return True
+        ops = self._ops
+        self._read_doc(self._file_stat())
+        for op in ops:
+            try:
+                self._replay(self._doc, op)
+            except pysonErrors.UnknownKeyError:
+                # the other process changed the keys of the database, the operation no longer applies
+                continue
+        self._ops = ops
+        return False
+
+    def _replay(self, doc: dict, op: tuple) -> None:
+        kind = op[0]
+        if kind == 'add':
+            for record_id, record in op[1].items():
+                self._check_new_keys(doc, record)
+                doc['data'][record_id] = record
+                self.indexes.add(record_id, record)
+        elif kind in ('update', 'delete'):
+            # queries are matched again against the records written by the other process
+            if callable(op[1]):
+                ids = self._match_query(op[1])
+            else:
+                ids = [record_id for record_id in op[1] if record_id in doc['data']]
+            if kind == 'update':
+                self._update_ids(doc, ids, op[2])
+            else:
+                self._delete_ids(doc, ids)
+        elif kind == 'fields':
+            self._add_fields(doc, op[1])
+        elif kind == 'purge':
+            doc['data'] = {}
+            doc['keys'] = []
+            self.indexes.rebuild({})
+        elif kind == 'restore':
+            doc['data'] = op[1].copy()
+            doc['keys'] = list(op[2])
+            self._rebuild_indexes()
+
+    def _swap_revision(self) -> None:
+        # the swap part of the compare-and-swap, done once the write succeeded
+        self._revision += 1
+        self.file_lock.write_revision(self._revision)
+        self._own_revisions.add(self._revision)
+        self._ops = []
+
+    def revision(self) -> int:
+        """
+        The function `revision` returns the revision of the store, a number increased by every write of
+        any process.
+        """
+        with self.lock:
+            if self.file_lock.locked:
+                return self.file_lock.read_revision()
+            return read_revision(self.file_lock.path)
+
+    def wrote_revisions(self, since: int, until: int) -> bool:
+        """
+        The function `wrote_revisions` tells whether the store moved from revision `since` to `until`
+        by its own writes only, see `OwnRevisions.covers()`.
+        """
+        return self._own_revisions.covers(since, until)
+
+    def _rebuild_indexes(self) -> None:
+        data = self._doc['data']
+        # in lazy mode the hot columns kept in the offset index are enough to build the indexes
+        self.indexes.rebuild(data.index_view() if isinstance(data, LazyRecords) else data)
+
+    def _dump_file(self, data: dict) -> None:
+        # write to a temporary file first so a crash never leaves a half written database behind
+        tmp_path = f"{self.filename}.tmp"
+        if not self.lazy:
+            with open(tmp_path, encoding='utf-8', mode='w') as f:
+                json.dump(data, f, indent=self.indent)
+            os.replace(tmp_path, self.filename)
+            return
+        records = data['data']
+        if isinstance(records, LazyRecords):
+            items = records.write_items()
+        else:
+            items = ((record_id, None, record, hot_values(record)) for record_id, record in records.items())
+        entries = write_database(tmp_path, data['version'], data['keys'], items, self.indent)
+        os.replace(tmp_path, self.filename)
+        identity = file_identity(self.filename)
+        write_offsets(self.offsets_path, identity, data['version'], data['keys'], entries)
+        data['data'] = LazyRecords(self.filename, identity[0], entries)
+
+    @staticmethod
+    def _select(data, ids):
+        # read the records in one pass over the file in lazy mode
+        if isinstance(data, LazyRecords):
+            return data.select(ids)
+        return ((record_id, data[record_id]) for record_id in ids if record_id in data)
+
+    def _replay_journal(self, data: dict) -> int:
+        """
+        The function `_replay_journal` applies the journal entries to the records loaded from the
+        database file.
+
+        :param data: The `data` parameter is the dictionary of records keyed by id
+        :type data: dict
+        :return: the number of journal entries.
+        """
+        try:
+            f = open(self.journal_path, encoding='utf-8')
+        except FileNotFoundError:
+            return 0
+        count = 0
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn line left by a crash in the middle of an append
+                    continue
+                record = data.get(entry['id'])
+                if record is not None:
+                    data[entry['id']] = {**record, **entry['data']}
+                count += 1
+        return count
+
+    def _append_journal(self, changes: dict) -> None:
+        """
+        The function `_append_journal` appends one journal entry per changed record and starts a
+        background compaction when the journal grew too long. Must be called with the lock held.
+
+        :param changes: The `changes` parameter is a dictionary of changed fields keyed by record id
+        :type changes: dict
+        """
+        with self.file_lock:
+            if not self._check_revision():
+                # the changes are part of the rebased document
+                self._write_file()
+                return
+            with open(self.journal_path, encoding='utf-8', mode='a') as f:
+                f.write(''.join(json.dumps({'id': record_id, 'data': changed}) + '\n' for record_id, changed in changes.items()))
+            self._stat = self._file_stat()
+            self._journal_entries += len(changes)
+            self._swap_revision()
+        if self._journal_entries >= JOURNAL_COMPACT_ENTRIES and (self._compactor is None or not self._compactor.is_alive()):
+            self._compactor = threading.Thread(target=self._compact_in_background, daemon=True)
+            self._compactor.start()
+
+    def _write_doc(self) -> None:
+        with self.file_lock:
+            self._check_revision()
+            self._write_file()
+
+    def _write_file(self) -> None:
+        # the database file now holds every journaled change, so the journal can go
+        self._dump_file(self._doc)
+        if self._journal_entries or os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+            self._journal_entries = 0
+        self._stat = self._file_stat()
+        self._swap_revision()
+
+    def _save(self) -> None:
+        if self._txn is not None:
+            self._txn['full'] = True
+            return
+        if not self.write_back:
+            self._write_doc()
+            return
+        self._pending += 1
+        if (self.flush_operations and self._pending >= self.flush_operations) or \
+                (self.flush_interval and time.monotonic() - self._last_flush >= self.flush_interval):
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._write_doc()
+            self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _invalidate(self) -> None:
+        if self._pending or self._txn is not None:
+            # unflushed changes only live in memory, keep them for the next flush
+            return
+        self._doc = None
+        self._stat = None
+        self._ops = []
+
+    def set_write_back(self, enabled: bool, flush_operations: int = 0, flush_interval: float = 0.0) -> None:
+        """
+        The function `set_write_back` switches write-back mode on or off. Switching it off writes the
+        pending changes to the file.
+
+        :param enabled: The `enabled` parameter tells whether mutations are kept in memory until flushed
+        :type enabled: bool
+        :param flush_operations: The `flush_operations` parameter is the number of mutations after which
+        the changes are written automatically, `0` to disable
+        :type flush_operations: int
+        :param flush_interval: The `flush_interval` parameter is the number of seconds after which the
+        changes are written automatically, `0` to disable
+        :type flush_interval: float
+        """
+        with self.lock:
+            if not enabled:
+                self._flush()
+            self.write_back = enabled
+            self.flush_operations = flush_operations
+            self.flush_interval = flush_interval
+
+    def flush(self) -> None:
+        """
+        The function `flush` writes the changes made in write-back mode to the file in one atomic write.
+        """
+        with self.lock:
+            self._flush()
+
+    def compact(self) -> None:
+        """
+        The function `compact` folds the journal into the database file.
+        """
+        with self._exclusive():
+            self._load()
+            if self._journal_entries and not self._pending:
+                self._write_doc()
+
+    def begin(self) -> None:
+        """
+        The function `begin` starts a transaction and keeps the lock until `commit()` or `rollback()`. A
+        transaction started while another one is active on the same database joins it, and only the
+        outermost one commits or rolls back.
+        """
+        self.lock.acquire()
+        if self._txn_depth == 0:
+            try:
+                doc = self._load()
+            except BaseException:
+                self.lock.release()
+                raise
+            # records are replaced and never changed in place, so a shallow copy is a full snapshot
+            self._txn = {'data': doc['data'].copy(), 'keys': list(doc['keys']), 'full': False, 'changes': {}, 'ops': len(self._ops)}
+            self._undo = None
+        self._txn_depth += 1
+
+    def _restore(self, snapshot: dict) -> None:
+        self._doc['data'] = snapshot['data']
+        self._doc['keys'] = snapshot['keys']
+        del self._ops[snapshot['ops']:]
+        self._rebuild_indexes()
+
+    def commit(self) -> None:
+        """
+        The function `commit` writes the changes of the transaction, in one append to the journal when
+        they only touch sync state fields or else in one atomic write of the file. When the write fails
+        the changes are rolled back.
+        """
+        try:
+            self._txn_depth -= 1
+            if self._txn_depth:
+                return
+            txn, self._txn = self._txn, None
+            try:
+                if txn['full']:
+                    self._save()
+                elif txn['changes']:
+                    self._append_journal(txn['changes'])
+            except OSError:
+                self._restore(txn)
+                self._invalidate()
+                raise
+            self._undo = txn
+        finally:
+            self.lock.release()
+
+    def rollback(self) -> None:
+        """
+        The function `rollback` drops the changes of the transaction.
+        """
+        try:
+            self._txn_depth -= 1
+            if self._txn_depth:
+                return
+            txn, self._txn = self._txn, None
+            self._restore(txn)
+        finally:
+            self.lock.release()
+
+    def revert(self) -> None:
+        """
+        The function `revert` undoes the last committed transaction by writing the records it started
+        from. It is used when a transaction spanning several databases fails to commit on one of them.
+        """
+        with self.lock:
+            if self._undo is None:
+                return
+            undo, self._undo = self._undo, None
+            self._doc['data'] = undo['data']
+            self._doc['keys'] = undo['keys']
+            self._rebuild_indexes()
+            self._ops.append(('restore', undo['data'].copy(), list(undo['keys'])))
+            self._save()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except OSError:
+            # the journal is still valid, the next compaction tries again
+            pass
+
+    def _check_new_keys(self, doc: dict, data: dict) -> None:
+        keys = doc['keys']
+        if len(keys) == 0:
+            doc['keys'] = sorted(list(data.keys()))
+        elif not sorted(keys) == sorted(data.keys()):
+            raise pysonErrors.UnknownKeyError(
+                f'Unrecognized / missing key(s) {set(keys) ^ set(data.keys())}'
+                '(Either the key(s) does not exists in the DB or is missing in the given data)'
+            )
+
+    def _check_update_keys(self, doc: dict, new_data: dict) -> None:
+        keys = doc['keys']
+        if isinstance(keys, list) and not all(i in keys for i in new_data):
+            raise pysonErrors.UnknownKeyError(f'Unrecognized key(s) {[i for i in new_data if i not in keys]}')
+
+    def add(self, data: object) -> str:
+        if not isinstance(data, dict):
+            raise TypeError(f'data must be of type dict and not {type(data)}')
+        with self._exclusive():
+            doc = self._load()
+            self._check_new_keys(doc, data)
+            _id = str(self._id_generator())
+            record = copy_record(data)
+            doc['data'][_id] = record
+            self.indexes.add(_id, record)
+            self._ops.append(('add', {_id: record}))
+            try:
+                self._save()
+            except OSError:
+                self._invalidate()
+                raise
+            return _id
+
+    def add_many(self, data: object, json_response: bool = False):
+        if not data:
+            return None
+        if not isinstance(data, list):
+            raise TypeError(f'data must be of type "list" and not {type(data)}')
+        if not all(isinstance(i, dict) for i in data):
+            raise TypeError('all the new data in the data list must of type dict')
+
+        with self._exclusive():
+            doc = self._load()
+            for d in data:
+                self._check_new_keys(doc, d)
+            new_data = {}
+            added = {}
+            for d in data:
+                _id = str(self._id_generator())
+                record = copy_record(d)
+                doc['data'][_id] = record
+                self.indexes.add(_id, record)
+                added[_id] = record
+                if json_response:
+                    new_data[_id] = d
+            self._ops.append(('add', added))
+            try:
+                self._save()
+            except OSError:
+                self._invalidate()
+                raise
+        return new_data if json_response else None
+
+    def get_all_select_keys(self, keys: list) -> dict:
+        with self.lock:
+            doc = self._load()
+            existing_keys = doc['keys']
+            if not set(keys).issubset(existing_keys):
+                raise pysonErrors.UnknownKeyError(
+                    f'Unrecognized key(s) {set(keys) ^ set(existing_keys)}'
+                    '(Unable to find the key(s) in the DB)'
+                )
+            return {k: {i: copy_record(v[i]) for i in keys} for k, v in doc['data'].items()}
+
+    def get_all(self) -> dict:
+        with self.lock:
+            return {record_id: copy_record(record) for record_id, record in self._load()['data'].items()}
+
+    def get_by_id(self, id: str) -> dict:
+        if not isinstance(id, str):
+            raise TypeError(f'id must be of type "str" and not {type(id)}')
+        with self.lock:
+            data = self._load()['data']
+            if id not in data:
+                raise pysonErrors.IdDoesNotExistError(f'{id!r} does not exists in the DB')
+            return copy_record(data[id])
+
+    def _match_columns(self, values: dict) -> list:
+        """
+        The function `_match_columns` returns the ids of the records whose columns equal `values`,
+        using the indexes when possible. Must be called with the lock held.
+
+        :param values: The `values` parameter is a dictionary of column names and values to match
+        :type values: dict
+        :return: a list of record ids.
+        """
+        data = self._load()['data']
+        # the indexes only hold the records having the column, `None` also matches the records without it
+        looked_up = {column: value for column, value in values.items() if value is not None}
+        planned = self.indexes.lookup(looked_up) if looked_up else None
+        if planned is None:
+            records = data.items()
+        else:
+            candidates, covered = planned
+            if covered and len(looked_up) == len(values):
+                return [record_id for record_id in candidates if record_id in data]
+            records = self._select(data, candidates)
+        return [
+            record_id for record_id, record in records
+            if all(record.get(column) == value for column, value in values.items())
+        ]
+
+    def get_by_columns(self, values: dict) -> dict:
+        """
+        The function `get_by_columns` returns every record whose columns equal the given values.
+
+        :param values: The `values` parameter is a dictionary of column names and values to match
+        :type values: dict
+        :return: a dictionary of matching records keyed by id.
+        """
+        with self.lock:
+            data = self._load()['data']
+            return {record_id: copy_record(record) for record_id, record in self._select(data, self._match_columns(values))}
+
+    def _match_query(self, query) -> list:
+        """
+        The function `_match_query` returns the ids of the records matching `query`. A `Query` is
+        planned against the indexes so only the candidate records are checked, a plain callable is
+        checked against every record. Must be called with the lock held.
+
+        :param query: The `query` parameter is a `Query` or a callable that takes a record and returns
+        a boolean
+        :return: a list of record ids.
+        """
+        if not callable(query):
+            raise TypeError(f'"query" must be a callable and not {type(query)!r}')
+        data = self._load()['data']
+        if isinstance(query, Query):
+            candidates = query.plan(self.indexes)
+            if candidates is not None:
+                return [record_id for record_id, record in self._select(data, candidates) if query(record)]
+        return [record_id for record_id, values in data.items() if query(values)]
+
+    def get_by_query(self, query) -> dict:
+        with self.lock:
+            data = self._load()['data']
+            return {record_id: copy_record(record) for record_id, record in self._select(data, self._match_query(query))}
+
+    def _match(self, query=None, values: dict = None):
+        # ids matching a query, column values, or every record. Must be called with the lock held.
+        if query is not None:
+            return self._match_query(query)
+        if values is not None:
+            return self._match_columns(values)
+        return list(self._load()['data'])
+
+    def get_fields(self, fields: list, query=None, values: dict = None) -> dict:
+        """
+        The function `get_fields` returns only the given fields of every record, or of the records
+        matching `query` or `values`, without copying the other fields. A missing field is `None`.
+
+        :param fields: The `fields` parameter is the list of fields to return, an empty list returns the
+        matching ids only
+        :type fields: list
+        :param query: The `query` parameter is an optional `Query` or callable to filter the records
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: a dictionary of partial records keyed by id.
+        """
+        with self.lock:
+            data = self._load()['data']
+            ids = self._match(query, values)
+            if not fields:
+                return {record_id: {} for record_id in ids}
+            return {
+                record_id: {field: copy_record(record.get(field)) for field in fields}
+                for record_id, record in self._select(data, ids)
+            }
+
+    def get_records(self, factory, query=None, values: dict = None) -> dict:
+        """
+        The function `get_records` builds an object from every record, or from the records matching
+        `query` or `values`, straight from the cached records without copying them first.
+
+        :param factory: The `factory` parameter is a callable taking the id and the record and returning
+        the object. It may keep references to the nested values of the record, since an update replaces
+        the record with a new one and never changes it in place (see `_update_ids()`), but it must not
+        change them
+        :param query: The `query` parameter is an optional `Query` or callable to filter the records
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: a dictionary of the built objects keyed by id.
+        """
+        with self.lock:
+            data = self._load()['data']
+            return {record_id: factory(record_id, record) for record_id, record in self._select(data, self._match(query, values))}
+
+    def count(self, query=None, values: dict = None) -> int:
+        """
+        The function `count` returns the number of records, or of the records matching `query` or
+        `values`, without copying any of them. Counts on indexed columns do not read the records.
+
+        :param query: The `query` parameter is an optional `Query` or callable to filter the records
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: the number of records.
+        """
+        with self.lock:
+            if query is None and values is None:
+                return len(self._load()['data'])
+            if query is None:
+                self._load()
+                counted = self.indexes.count(values)
+                if counted is not None:
+                    return counted
+            return len(self._match(query, values))
+
+    def group_counts(self, group_column: str, group_value) -> dict:
+        """
+        The function `group_counts` returns the number of records of a group for each combination of the
+        counted columns, read from the counters kept with the indexes.
+
+        :param group_column: The `group_column` parameter is the column the records are grouped by, for
+        example `'app_id'`
+        :type group_column: str
+        :param group_value: The `group_value` parameter is the value of the group column
+        :return: a dictionary keyed by tuples of values of the counted columns.
+        """
+        with self.lock:
+            data = self._load()['data']
+            counts = self.indexes.group_counts(group_column, group_value)
+            if counts is not None:
+                return counts
+            columns = dict(COUNTERS).get(group_column)
+            if columns is None:
+                raise ValueError(f'The column {group_column!r} has no counter')
+            counts = {}
+            for _, record in self._select(data, self._match_columns({group_column: group_value})):
+                key = tuple(record.get(column) for column in columns)
+                try:
+                    counts[key] = counts.get(key, 0) + 1
+                except TypeError:
+                    continue
+            return counts
+
+    def _update_ids(self, doc: dict, ids, new_data: dict) -> dict:
+        """
+        The function `_update_ids` merges `new_data` into the given records and keeps the indexes in
+        sync. Must be called with the lock held.
+
+        :return: a dictionary of the fields which actually changed, keyed by record id.
+        """
+        data = doc['data']
+        changes = {}
+        for record_id, old_record in list(self._select(data, ids)):
+            changed = {
+                k: copy_record(v) for k, v in new_data.items()
+                if k not in old_record or type(old_record[k]) is not type(v) or old_record[k] != v
+            }
+            if not changed:
+                continue
+            new_record = {**old_record, **changed}
+            data[record_id] = new_record
+            self.indexes.update(record_id, old_record, new_record)
+            changes[record_id] = changed
+        return changes
+
+    def _save_updates(self, changes: dict) -> None:
+        # sync state changes are appended to the journal, anything else rewrites the file
+        if not changes:
+            return
+        if not self.write_back and self.journal_fields and all(changed.keys() <= self.journal_fields for changed in changes.values()):
+            if self._txn is None:
+                self._append_journal(changes)
+            else:
+                for record_id, changed in changes.items():
+                    self._txn['changes'].setdefault(record_id, {}).update(changed)
+        else:
+            self._save()
+
+    def update_by_id(self, id: str, new_data: object) -> dict:
+        if not isinstance(new_data, dict):
+            raise TypeError(f'new_data must be of type dict and not {type(new_data)!r}')
+        with self._exclusive():
+            doc = self._load()
+            self._check_update_keys(doc, new_data)
+            if id not in doc['data']:
+                raise pysonErrors.IdDoesNotExistError(f'The id {id!r} does noe exists in the DB')
+            changes = self._update_ids(doc, [id], new_data)
+            if changes:
+                self._ops.append(('update', [id], copy_record(new_data)))
+            try:
+                self._save_updates(changes)
+            except OSError:
+                self._invalidate()
+                raise
+            return copy_record(doc['data'][id])
+
+    def update_by_query(self, query, new_data: object) -> list:
+        if not isinstance(new_data, dict):
+            raise TypeError(f'"new_data" must be of type dict and not f{type(new_data)!r}')
+        with self._exclusive():
+            doc = self._load()
+            self._check_update_keys(doc, new_data)
+            updated_keys = self._match_query(query)
+            changes = self._update_ids(doc, updated_keys, new_data)
+            if changes:
+                self._ops.append(('update', query, copy_record(new_data)))
+            try:
+                self._save_updates(changes)
+            except OSError:
+                self._invalidate()
+                raise
+            return updated_keys
+
+    def _delete_ids(self, doc: dict, ids) -> None:
+        data = doc['data']
+        for record_id, record in list(self._select(data, ids)):
+            del data[record_id]
+            self.indexes.remove(record_id, record)
+
+    def delete_by_id(self, id: str) -> None:
+        with self._exclusive():
+            doc = self._load()
+            if id not in doc['data']:
+                raise pysonErrors.IdDoesNotExistError(f'ID {id} does not exists in the DB')
+            self._delete_ids(doc, [id])
+            self._ops.append(('delete', [id]))
+            try:
+                self._save()
+            except OSError:
+                self._invalidate()
+                raise
+
+    def delete_by_query(self, query) -> list:
+        with self._exclusive():
+            doc = self._load()
+            ids_to_delete = self._match_query(query)
+            self._delete_ids(doc, ids_to_delete)
+            if ids_to_delete:
+                self._ops.append(('delete', query))
+                try:
+                    self._save()
+                except OSError:
+                    self._invalidate()
+                    raise
+            return ids_to_delete
+
+    def _add_fields(self, doc: dict, defaults: dict) -> list:
+        """
+        The function `_add_fields` adds the missing fields to the keys of the document and sets their
+        default on the records without them. Must be called with the lock held.
+
+        :return: the list of the updated ids.
+        """
+        missing = {k: v for k, v in defaults.items() if k not in doc['keys']}
+        if not doc['keys'] or not missing:
+            return []
+        doc['keys'] = sorted(set(doc['keys']) | missing.keys())
+        updated = []
+        for record_id, record in list(doc['data'].items()):
+            fields = {k: v for k, v in missing.items() if k not in record}
+            if self._update_ids(doc, [record_id], fields):
+                updated.append(record_id)
+        return updated
+
+    def add_fields(self, defaults: dict) -> list:
+        """
+        The function `add_fields` adds fields to the schema of a database written by an older version,
+        the records get the default values. A database without any record is not changed, its keys are
+        set by its first record.
+
+        :param defaults: The `defaults` parameter maps the fields to add to their default values
+        :type defaults: dict
+        :return: the list of the updated ids.
+        """
+        with self.lock:
+            keys = self._load()['keys']
+            if not keys or defaults.keys() <= set(keys):
+                return []
+        with self._exclusive():
+            doc = self._load()
+            if not doc['keys'] or defaults.keys() <= set(doc['keys']):
+                return []
+            updated = self._add_fields(doc, defaults)
+            self._ops.append(('fields', copy_record(defaults)))
+            try:
+                # the keys are not journaled, the whole file is written
+                self._save()
+            except OSError:
+                self._invalidate()
+                raise
+            return updated
+
+    def purge(self) -> None:
+        with self._exclusive():
+            doc = self._load()
+            doc['data'] = {}
+            doc['keys'] = []
+            self.indexes.rebuild({})
+            self._ops.append(('purge',))
+            try:
+                self._save()
+            except OSError:
+                self._invalidate()
+                raise
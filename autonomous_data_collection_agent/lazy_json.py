@@ -0,0 +1,381 @@
+"""This module provides the streaming, low-memory access to PysonDB JSON database files used by the lazy mode of `JsonDB`."""
+
+import json
+import os
+from collections.abc import MutableMapping
+
+from autonomous_data_collection_agent.indexes import HOT_COLUMNS
+
+# Suffix added to the database file name to get the offset index file name.
+OFFSETS_SUFFIX = '.offsets'
+
+# Version of the offset index file format.
+OFFSETS_VERSION = 1
+
+_CHUNK_SIZE = 1 << 20
+_WHITESPACE = ' \t\n\r'
+_DECODER = json.JSONDecoder()
+_MISSING = object()
+
+
+def file_identity(path: str):
+    """
+    The function `file_identity` returns the inode, modification time and size of a file, used to
+    check that an offset index still matches its database file.
+
+    :param path: The `path` parameter is the path of the file
+    :type path: str
+    :return: a list `[inode, mtime_ns, size]`.
+    """
+    stat = os.stat(path)
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+
+def hot_values(record: dict) -> tuple:
+    # the hot column values of a record, kept in memory to rebuild the indexes without the record
+    return tuple(record.get(column, _MISSING) for column in HOT_COLUMNS)
+
+
+# The `DatabaseScanner` class reads a PysonDB database file chunk by chunk and yields its records one
+# at a time together with their byte offsets, so the file is never loaded as a whole. PysonDB writes
+# ASCII only JSON, the file is decoded as latin-1 to keep characters and bytes aligned.
+class DatabaseScanner:
+    def __init__(self, path: str) -> None:
+        """
+        The function initializes the scanner. The `header` attribute holds the `version` and `keys` of the
+        database once `records()` has been consumed.
+
+        :param path: The `path` parameter is the path of the database file
+        :type path: str
+        """
+        self.path = path
+        self.header = {'version': 2, 'keys': []}
+        self._file = None
+        self._buf = ''
+        self._base = 0
+        self._pos = 0
+
+    def _more(self) -> bool:
+        chunk = self._file.read(_CHUNK_SIZE)
+        if not chunk:
+            return False
+        if self._pos > _CHUNK_SIZE:
+            # drop what was consumed already
+            self._buf = self._buf[self._pos:]
+            self._base += self._pos
+            self._pos = 0
+        self._buf += chunk.decode('latin-1')
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._more():
+                raise ValueError(f'Unexpected end of the database file {self.path!r}')
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f'Expected {char!r} at byte {self._base + self._pos} of {self.path!r}')
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._more():
+                    continue
+                raise
+            if end == len(self._buf) and self._more():
+                # a number at the end of the buffer may continue in the next chunk
+                continue
+            start, self._pos = self._pos, end
+            text = self._buf[start:end]
+            if not text.isascii():
+                value = json.loads(text.encode('latin-1'))
+            return value, self._base + start, self._base + end
+
+    def records(self):
+        """
+        The function `records` yields a tuple `(id, start, end, record)` for every record of the database,
+        where `start` and `end` are the byte offsets of the record in the file.
+        """
+        with open(self.path, 'rb') as self._file:
+            self._expect('{')
+            if self._peek() == '}':
+                return
+            while True:
+                key, _, _ = self._value()
+                self._expect(':')
+                if key == 'data':
+                    self._expect('{')
+                    if self._peek() != '}':
+                        while True:
+                            record_id, _, _ = self._value()
+                            self._expect(':')
+                            record, start, end = self._value()
+                            yield record_id, start, end, record
+                            if self._peek() != ',':
+                                break
+                            self._pos += 1
+                    self._expect('}')
+                else:
+                    self.header[key] = self._value()[0]
+                if self._peek() != ',':
+                    break
+                self._pos += 1
+            self._expect('}')
+
+
+def write_database(path: str, version, keys: list, items, indent: int = 4) -> dict:
+    """
+    The function `write_database` writes a PysonDB database file record by record.
+
+    :param path: The `path` parameter is the path of the file to write
+    :type path: str
+    :param version: The `version` parameter is the PysonDB format version
+    :param keys: The `keys` parameter is the list of record keys of the database
+    :type keys: list
+    :param items: The `items` parameter is an iterable of tuples `(id, raw, record, hot)`, where `raw`
+    is the JSON text of the record as bytes when it can be copied as is, else `None`
+    :param indent: The `indent` parameter is the indentation used in the file
+    :type indent: int
+    :return: a dictionary of `(start, end, hot)` tuples keyed by record id.
+    """
+    newline = '\n' if indent is not None else ''
+    pad = ' ' * indent if indent else ''
+    separator = (',', ': ') if indent is not None else (', ', ': ')
+    entries = {}
+    with open(path, 'wb') as f:
+        head = '{' + newline + pad + '"version": ' + json.dumps(version) + ',' + newline
+        head += pad + '"keys": ' + json.dumps(keys, indent=indent, separators=separator).replace('\n', '\n' + pad) + ',' + newline
+        head += pad + '"data": {'
+        f.write(head.encode('utf-8'))
+        first = True
+        for record_id, raw, record, hot in items:
+            f.write((('' if first else ',') + newline + pad * 2 + json.dumps(record_id) + ': ').encode('utf-8'))
+            first = False
+            if raw is None:
+                raw = json.dumps(record, indent=indent, separators=separator).replace('\n', '\n' + pad * 2).encode('utf-8')
+            start = f.tell()
+            f.write(raw)
+            entries[record_id] = (start, f.tell(), hot)
+        f.write(((newline + pad if not first else '') + '}' + newline + '}').encode('utf-8'))
+    return entries
+
+
+def read_offsets(path: str, identity: list):
+    """
+    The function `read_offsets` reads the offset index of a database file, one record per line.
+
+    :param path: The `path` parameter is the path of the offset index file
+    :type path: str
+    :param identity: The `identity` parameter is the `file_identity()` of the database file, the index
+    is ignored when it was written for another version of the file
+    :type identity: list
+    :return: a tuple `(header, entries)` or `None` when there is no valid index.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != OFFSETS_VERSION or header.get('identity') != identity:
+                return None
+            entries = {}
+            for line in f:
+                record_id, start, end, hot = json.loads(line)
+                entries[record_id] = (start, end, tuple(hot.get(column, _MISSING) for column in HOT_COLUMNS))
+            return header, entries
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_offsets(path: str, identity: list, version, keys: list, entries: dict) -> None:
+    """
+    The function `write_offsets` writes the offset index of a database file. The index is only a cache,
+    so failing to write it is not an error.
+
+    :param path: The `path` parameter is the path of the offset index file
+    :type path: str
+    :param identity: The `identity` parameter is the `file_identity()` of the database file
+    :type identity: list
+    :param version: The `version` parameter is the PysonDB format version of the database
+    :param keys: The `keys` parameter is the list of record keys of the database
+    :type keys: list
+    :param entries: The `entries` parameter is a dictionary of `(start, end, hot)` tuples keyed by id
+    :type entries: dict
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, encoding='utf-8', mode='w') as f:
+            f.write(json.dumps({'format': OFFSETS_VERSION, 'identity': identity, 'version': version, 'keys': keys}) + '\n')
+            for record_id, (start, end, hot) in entries.items():
+                columns = {column: value for column, value in zip(HOT_COLUMNS, hot) if value is not _MISSING}
+                f.write(json.dumps([record_id, start, end, columns]) + '\n')
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+# The `LazyRecords` class is the record dictionary of a database in lazy mode. Only the byte offsets
+# and hot column values of the records are kept in memory, a record is parsed from the file when it is
+# read. Added and changed records are kept in memory until the file is written again.
+class LazyRecords(MutableMapping):
+    def __init__(self, path: str, inode: int, entries: dict, overlay: dict = None, deleted: set = None) -> None:
+        """
+        The function initializes the record dictionary.
+
+        :param path: The `path` parameter is the path of the database file
+        :type path: str
+        :param inode: The `inode` parameter is the inode of the database file the offsets belong to
+        :type inode: int
+        :param entries: The `entries` parameter is a dictionary of `(start, end, hot)` tuples keyed by
+        id, describing the records stored in the file. It is shared between copies and never changed
+        :type entries: dict
+        :param overlay: The `overlay` parameter is a dictionary of the added and changed records
+        :type overlay: dict
+        :param deleted: The `deleted` parameter is the set of ids of the records deleted from the file
+        :type deleted: set
+        """
+        self.path = path
+        self.inode = inode
+        self._entries = entries
+        self._overlay = overlay if overlay is not None else {}
+        self._deleted = deleted if deleted is not None else set()
+
+    def _open(self):
+        f = open(self.path, 'rb')
+        if os.fstat(f.fileno()).st_ino != self.inode:
+            # the file was replaced, the offsets point into a file which is gone
+            f.close()
+            raise OSError(f'The database file {self.path!r} was replaced')
+        return f
+
+    def _read(self, f, record_id: str) -> dict:
+        start, end, _ = self._entries[record_id]
+        f.seek(start)
+        return json.loads(f.read(end - start))
+
+    def __getitem__(self, record_id: str) -> dict:
+        if record_id in self._overlay:
+            return self._overlay[record_id]
+        if record_id in self._deleted or record_id not in self._entries:
+            raise KeyError(record_id)
+        with self._open() as f:
+            return self._read(f, record_id)
+
+    def __setitem__(self, record_id: str, record: dict) -> None:
+        self._overlay[record_id] = record
+        self._deleted.discard(record_id)
+
+    def __delitem__(self, record_id: str) -> None:
+        if record_id not in self:
+            raise KeyError(record_id)
+        self._overlay.pop(record_id, None)
+        if record_id in self._entries:
+            self._deleted.add(record_id)
+
+    def __contains__(self, record_id) -> bool:
+        return record_id in self._overlay or (record_id in self._entries and record_id not in self._deleted)
+
+    def __iter__(self):
+        for record_id in self._entries:
+            if record_id not in self._deleted:
+                yield record_id
+        for record_id in self._overlay:
+            if record_id not in self._entries:
+                yield record_id
+
+    def __len__(self) -> int:
+        return len(self._entries) - len(self._deleted) + sum(1 for record_id in self._overlay if record_id not in self._entries)
+
+    def select(self, ids):
+        """
+        The function `select` yields `(id, record)` for the given ids which exist, reading the file once in
+        offset order.
+
+        :param ids: The `ids` parameter is an iterable of record ids
+        """
+        stored = []
+        for record_id in ids:
+            if record_id in self._overlay:
+                yield record_id, self._overlay[record_id]
+            elif record_id in self._entries and record_id not in self._deleted:
+                stored.append(record_id)
+        if stored:
+            stored.sort(key=lambda record_id: self._entries[record_id][0])
+            with self._open() as f:
+                for record_id in stored:
+                    yield record_id, self._read(f, record_id)
+
+    def items(self):
+        # one pass over the file instead of opening it for every record
+        return self.select(iter(self))
+
+    def values(self):
+        return (record for _, record in self.items())
+
+    def copy(self) -> "LazyRecords":
+        return LazyRecords(self.path, self.inode, self._entries, dict(self._overlay), set(self._deleted))
+
+    def write_items(self):
+        """
+        The function `write_items` yields the `(id, raw, record, hot)` tuples expected by
+        `write_database()`, copying the unchanged records from the file as they are.
+        """
+        with self._open() as f:
+            for record_id in self:
+                if record_id in self._overlay:
+                    record = self._overlay[record_id]
+                    yield record_id, None, record, hot_values(record)
+                else:
+                    start, end, hot = self._entries[record_id]
+                    f.seek(start)
+                    yield record_id, f.read(end - start), None, hot
+
+    def index_view(self) -> "_IndexView":
+        """
+        The function `index_view` returns an object whose `items()` yields every record reduced to its hot
+        columns, enough to rebuild the indexes without reading the file.
+        """
+        return _IndexView(self)
+
+
+class _IndexView:
+    def __init__(self, records: LazyRecords) -> None:
+        self._records = records
+
+    def items(self):
+        records = self._records
+        for record_id in records:
+            if record_id in records._overlay:
+                yield record_id, records._overlay[record_id]
+            else:
+                hot = records._entries[record_id][2]
+                yield record_id, {column: value for column, value in zip(HOT_COLUMNS, hot) if value is not _MISSING}
+
+
+def load_lazy(path: str):
+    """
+    The function `load_lazy` returns the header and the `LazyRecords` of a database file, using its
+    offset index when it is up to date, or else scanning the file and writing the offset index again.
+
+    :param path: The `path` parameter is the path of the database file
+    :type path: str
+    :return: a PysonDB document whose `data` is a `LazyRecords` object.
+    """
+    identity = file_identity(path)
+    offsets = read_offsets(path + OFFSETS_SUFFIX, identity)
+    if offsets is not None:
+        header, entries = offsets
+    else:
+        scanner = DatabaseScanner(path)
+        entries = {}
+        for record_id, start, end, record in scanner.records():
+            entries[record_id] = (start, end, hot_values(record))
+        header = scanner.header
+        write_offsets(path + OFFSETS_SUFFIX, identity, header['version'], header['keys'], entries)
+    return {'version': header['version'], 'keys': header['keys'], 'data': LazyRecords(path, identity[0], entries)}
@@ -0,0 +1,151 @@
+"""This module provides the canonical types of the stored application and endpoint records of the Autonomous Data Collector Agent.
+
+Every record is normalized by `DatabaseHandler` before it is written, so the readers never parse
+strings:
+
+- `payload`, `filters`, `auth_data`, `default_payload` and `default_filters` are dicts and lists, not
+  JSON strings;
+- the counters, page sizes, statuses, connection limits and byte rates are integers, the request
+  rates are floats;
+- `last_sync`, `next_sync` and `failed_time` are POSIX timestamps (floats), or `None` when unset.
+
+Datetimes are still accepted on write as `datetime` objects or `'DD-MM-YYYY hh:mm:ss'` strings, and
+are only formatted back to strings for display. The filter `column_value`s are left as strings, they
+are sent as is to the source systems.
+"""
+
+import json
+from datetime import datetime
+from functools import lru_cache
+
+DATETIME_FORMAT = '%d-%m-%Y %H:%M:%S'
+
+# Fields holding a POSIX timestamp.
+DATETIME_FIELDS = ('last_sync', 'next_sync', 'failed_time')
+
+# Fields holding a dict or a list, with their type.
+JSON_FIELDS = {'payload': dict, 'filters': list, 'auth_data': dict, 'default_payload': dict, 'default_filters': list}
+
+# Fields holding an integer.
+INT_FIELDS = ('page_size', 'process_status', 'failed_count', 'status', 'default_page_size', 'max_connections', 'byte_rate_limit')
+
+# Fields holding a float.
+FLOAT_FIELDS = ('rate_limit',)
+
+
+@lru_cache(maxsize=4096)
+def parse_datetime(value: str) -> float:
+    """
+    The function `parse_datetime` parses a `'DD-MM-YYYY hh:mm:ss'` string. The results are cached, batches
+    of records mostly repeat the same few filter and sync datetimes.
+
+    :param value: The `value` parameter is the datetime string
+    :type value: str
+    :return: the POSIX timestamp as a float, raises `ValueError` when the string is not in the format.
+    """
+    return datetime.strptime(value, DATETIME_FORMAT).timestamp()
+
+
+def to_timestamp(value):
+    """
+    The function `to_timestamp` converts a datetime value to a POSIX timestamp.
+
+    :param value: The `value` parameter is a timestamp, a `datetime` object, a `'DD-MM-YYYY hh:mm:ss'`
+    or ISO 8601 string, or an empty value
+    :return: the timestamp as a float, or `None` for an empty value. Raises `ValueError` when the value
+    is not a datetime.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid datetime {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            return parse_datetime(value)
+        except ValueError:
+            pass
+        try:
+            # `str(datetime)` as older versions stored on update
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            raise ValueError(f"Invalid datetime {value!r}, use the format 'DD-MM-YYYY hh:mm:ss'")
+    raise ValueError(f"Invalid datetime {value!r}")
+
+
+def format_timestamp(value) -> str:
+    """
+    The function `format_timestamp` formats a stored timestamp for display.
+
+    :param value: The `value` parameter is a POSIX timestamp, or `None`
+    :return: the datetime as a `'DD-MM-YYYY hh:mm:ss'` string, an empty string for `None`. Values which
+    are not timestamps are returned unchanged.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value).strftime(DATETIME_FORMAT)
+    return value
+
+
+def normalize_record(record: dict) -> dict:
+    """
+    The function `normalize_record` converts the fields of a record, or of a partial update, to their
+    canonical types. The other fields are kept as they are.
+
+    :param record: The `record` parameter is the record or update to normalize
+    :type record: dict
+    :return: a new normalized dictionary, the given one is not changed. Raises `ValueError` when a field
+    cannot be converted.
+    """
+    normalized = dict(record)
+    for field, value in record.items():
+        if field in DATETIME_FIELDS:
+            normalized[field] = to_timestamp(value)
+        elif field in JSON_FIELDS:
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value) if value.strip() else JSON_FIELDS[field]()
+                except json.decoder.JSONDecodeError:
+                    raise ValueError(f"{field} must be valid JSON")
+            if value is not None and not isinstance(value, JSON_FIELDS[field]):
+                raise ValueError(f"{field} must be a JSON {'object' if JSON_FIELDS[field] is dict else 'list'}")
+            normalized[field] = value
+        elif field in INT_FIELDS and isinstance(value, str):
+            try:
+                normalized[field] = int(value)
+            except ValueError:
+                raise ValueError(f"{field} must be an integer")
+        elif field in FLOAT_FIELDS and isinstance(value, str):
+            try:
+                normalized[field] = float(value)
+            except ValueError:
+                raise ValueError(f"{field} must be a number")
+    return normalized
+
+
+def is_normalized(record: dict) -> bool:
+    """
+    The function `is_normalized` tells whether a stored record already has the canonical types.
+
+    :param record: The `record` parameter is the stored record
+    :type record: dict
+    :return: a boolean value.
+    """
+    for field in DATETIME_FIELDS:
+        value = record.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return False
+    for field in JSON_FIELDS:
+        if isinstance(record.get(field), str):
+            return False
+    for field in INT_FIELDS + FLOAT_FIELDS:
+        if isinstance(record.get(field), str):
+            return False
+    return True
@@ -0,0 +1,58 @@
+"""This module provides the parallel page fetching of the Autonomous Data Collector Agent.
+
+The first page of an endpoint tells the `total` number of records, so the number of pages left is
+known. With a `page_parallelism` above 1 the scheduler requests them at the same time, at most
+`page_parallelism` pages of an endpoint in flight, and reads the responses in page order, so the
+records are saved in the same order as a sequential sync. A large table is synced in about
+`ceil(pages / page_parallelism)` round trips instead of one per page.
+"""
+
+from collections import deque
+
+
+def page_count(total: int, per_page: int) -> int:
+    """
+    The function `page_count` returns the number of pages of an endpoint.
+
+    :param total: The `total` parameter is the total number of records reported by the first page
+    :type total: int
+    :param per_page: The `per_page` parameter is the number of records of the first page
+    :type per_page: int
+    :return: the number of pages, at least 1.
+    """
+    if per_page <= 0:
+        return 1
+    return max(1, -(-int(total) // per_page))
+
+
+def fetch_in_order(fetch_page, pages, parallelism: int, submit):
+    """
+    The function `fetch_in_order` requests pages with at most `parallelism` of them in flight and
+    yields the responses in page order. The requests still in flight are cancelled when the caller stops
+    reading, for example after a failed page.
+
+    :param fetch_page: The `fetch_page` parameter is a callable taking a page number and returning its
+    response
+    :param pages: The `pages` parameter is an iterable of the page numbers to request, in order
+    :param parallelism: The `parallelism` parameter is the maximum number of pages in flight
+    :type parallelism: int
+    :param submit: The `submit` parameter is a callable running `fetch_page` with a page number on a
+    worker and returning a `Future`, like `WorkerPool.submit`
+    :return: a generator of the responses, the error of a failed page is raised when it is reached.
+    """
+    pages = iter(pages)
+    window = deque()
+    try:
+        for page_number in pages:
+            window.append(submit(fetch_page, page_number))
+            if len(window) >= parallelism:
+                break
+        while window:
+            response = window.popleft().result()
+            page_number = next(pages, None)
+            if page_number is not None:
+                window.append(submit(fetch_page, page_number))
+            yield response
+    finally:
+        for future in window:
+            future.cancel()
@@ -0,0 +1,257 @@
+"""This module provides the declarative query API of the Autonomous Data Collector Agent database.
+
+Queries are built from field/operator/value clauses combined with `&` (and) and `|` (or)::
+
+    (where('app_id') == app_id) & (where('status') == 1) & (where('process_status') < 2)
+
+Unlike a lambda, the storage engines can look inside a query to answer it from their indexes, and the
+whole query is compiled once into a single Python predicate used to check the candidate records.
+"""
+
+import re
+
+_FIELD_NAME = re.compile(r'^\w+$')
+
+# Supported operators with the Python and SQL syntax they compile to.
+OPERATORS = {
+    '==': ('==', '='),
+    '!=': ('!=', '!='),
+    '<': ('<', '<'),
+    '<=': ('<=', '<='),
+    '>': ('>', '>'),
+    '>=': ('>=', '>='),
+    'in': ('in', 'IN'),
+}
+
+
+# The `Query` class is the base class of every query node. A query is callable, so it can be passed
+# anywhere a lambda predicate was accepted before.
+class Query:
+    _predicate = None
+
+    def __and__(self, other: "Query") -> "Query":
+        return And(self, other)
+
+    def __or__(self, other: "Query") -> "Query":
+        return Or(self, other)
+
+    def __call__(self, record: dict) -> bool:
+        if self._predicate is None:
+            self._predicate = self.compile()
+        return self._predicate(record)
+
+    def compile(self):
+        """
+        The function `compile` turns the query into one Python function taking a record and returning
+        whether it matches. Comparisons against missing or incomparable values are false.
+        :return: the predicate function.
+        """
+        constants = {}
+        source = f"def predicate(r):\n    try:\n        return bool({self._python(constants)})\n    except TypeError:\n        return False\n"
+        namespace = dict(constants)
+        exec(source, namespace)
+        return namespace['predicate']
+
+    def _python(self, constants: dict) -> str:
+        raise NotImplementedError
+
+    def to_sql(self, column_expr):
+        """
+        The function `to_sql` translates the query into an SQL condition, or returns `None` when part
+        of it cannot be expressed in SQL.
+
+        :param column_expr: The `column_expr` parameter is a function returning the SQL expression of a
+        field
+        :return: a tuple `(sql, params)` or `None`.
+        """
+        raise NotImplementedError
+
+    def plan(self, indexes):
+        """
+        The function `plan` returns the ids of the records that may match the query according to the
+        given indexes, or `None` when the indexes cannot narrow the query down and every record has to
+        be checked. The candidates still have to be checked with the compiled predicate.
+
+        :param indexes: The `indexes` parameter is the `IndexSet` of the database
+        :return: a set of candidate ids or `None`.
+        """
+        raise NotImplementedError
+
+
+# The `Clause` class compares one field of a record with a value.
+class Clause(Query):
+    def __init__(self, field: str, operator: str, value) -> None:
+        """
+        The function initializes a clause.
+
+        :param field: The `field` parameter is the name of the record field to compare
+        :type field: str
+        :param operator: The `operator` parameter is one of `==`, `!=`, `<`, `<=`, `>`, `>=` or `in`
+        :type operator: str
+        :param value: The `value` parameter is the value to compare with. For `in` it is a list of values
+        """
+        if not _FIELD_NAME.match(field):
+            raise ValueError(f"Invalid field name {field!r}")
+        if operator not in OPERATORS:
+            raise ValueError(f"Invalid operator {operator!r}. Only {', '.join(OPERATORS)} are allowed.")
+        if operator == 'in':
+            value = tuple(value)
+        self.field = field
+        self.operator = operator
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"Clause({self.field!r}, {self.operator!r}, {self.value!r})"
+
+    def _python(self, constants: dict) -> str:
+        name = f"v{len(constants)}"
+        constants[name] = self.value
+        return f"(r.get({self.field!r}) {OPERATORS[self.operator][0]} {name})"
+
+    def to_sql(self, column_expr):
+        if self.operator == 'in':
+            if not self.value or not all(_is_scalar(v) for v in self.value):
+                return None
+            return f"{column_expr(self.field)} IN ({', '.join('?' for _ in self.value)})", list(self.value)
+        if self.value is None:
+            if self.operator == '==':
+                return f"{column_expr(self.field)} IS NULL", []
+            if self.operator == '!=':
+                return f"{column_expr(self.field)} IS NOT NULL", []
+            return None
+        if not _is_scalar(self.value):
+            return None
+        if self.operator == '!=':
+            # a missing value is different from anything in Python but unknown in SQL
+            return f"({column_expr(self.field)} IS NULL OR {column_expr(self.field)} != ?)", [self.value]
+        return f"{column_expr(self.field)} {OPERATORS[self.operator][1]} ?", [self.value]
+
+    def plan(self, indexes):
+        if not indexes.is_indexed(self.field):
+            return None
+        # the indexes only hold the records having the field, `None` also matches the records without it
+        if self.operator == '==' and self.value is not None:
+            return _lookup(indexes, {self.field: self.value})
+        if self.operator == 'in' and None not in self.value:
+            ids = set()
+            for value in self.value:
+                ids.update(_lookup(indexes, {self.field: value}))
+            return ids
+        return None
+
+
+# The `And` class matches records matching every one of its queries.
+class And(Query):
+    def __init__(self, *queries: Query) -> None:
+        self.queries = []
+        for query in queries:
+            # flatten nested ands so the planner sees every equality at once
+            self.queries.extend(query.queries if isinstance(query, And) else [query])
+
+    def __repr__(self) -> str:
+        return f"And({', '.join(repr(q) for q in self.queries)})"
+
+    def _python(self, constants: dict) -> str:
+        return "(" + " and ".join(q._python(constants) for q in self.queries) + ")"
+
+    def to_sql(self, column_expr):
+        # push down what SQL can express, the Python predicate re-checks the rest
+        parts = [q.to_sql(column_expr) for q in self.queries]
+        parts = [p for p in parts if p is not None]
+        if not parts:
+            return None
+        return "(" + " AND ".join(sql for sql, _ in parts) + ")", [param for _, params in parts for param in params]
+
+    def plan(self, indexes):
+        looked_up = [
+            q for q in self.queries
+            if isinstance(q, Clause) and q.operator == '==' and q.value is not None and indexes.is_indexed(q.field)
+        ]
+        equalities = {q.field: q.value for q in looked_up}
+        best = _lookup(indexes, equalities) if equalities else None
+        for query in self.queries:
+            if any(query is q for q in looked_up):
+                continue
+            ids = query.plan(indexes)
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+        return best
+
+
+# The `Or` class matches records matching at least one of its queries.
+class Or(Query):
+    def __init__(self, *queries: Query) -> None:
+        self.queries = []
+        for query in queries:
+            self.queries.extend(query.queries if isinstance(query, Or) else [query])
+
+    def __repr__(self) -> str:
+        return f"Or({', '.join(repr(q) for q in self.queries)})"
+
+    def _python(self, constants: dict) -> str:
+        return "(" + " or ".join(q._python(constants) for q in self.queries) + ")"
+
+    def to_sql(self, column_expr):
+        parts = [q.to_sql(column_expr) for q in self.queries]
+        if any(p is None for p in parts):
+            return None
+        return "(" + " OR ".join(sql for sql, _ in parts) + ")", [param for _, params in parts for param in params]
+
+    def plan(self, indexes):
+        ids = set()
+        for query in self.queries:
+            planned = query.plan(indexes)
+            if planned is None:
+                return None
+            ids.update(planned)
+        return ids
+
+
+# The `Field` class builds clauses on one record field with the comparison operators.
+class Field:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __eq__(self, value) -> Clause:
+        return Clause(self.name, '==', value)
+
+    def __ne__(self, value) -> Clause:
+        return Clause(self.name, '!=', value)
+
+    def __lt__(self, value) -> Clause:
+        return Clause(self.name, '<', value)
+
+    def __le__(self, value) -> Clause:
+        return Clause(self.name, '<=', value)
+
+    def __gt__(self, value) -> Clause:
+        return Clause(self.name, '>', value)
+
+    def __ge__(self, value) -> Clause:
+        return Clause(self.name, '>=', value)
+
+    def one_of(self, values) -> Clause:
+        return Clause(self.name, 'in', values)
+
+    __hash__ = None
+
+
+def where(field: str) -> Field:
+    """
+    The function `where` starts a clause on the given record field, for example
+    `where('status') == 1`.
+
+    :param field: The `field` parameter is the name of the record field
+    :type field: str
+    :return: a `Field` object.
+    """
+    return Field(field)
+
+
+def _is_scalar(value) -> bool:
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+def _lookup(indexes, values: dict):
+    planned = indexes.lookup(values)
+    return None if planned is None else planned[0]
@@ -96,17 +96,11 @@ def generate_random_data(app_count: int = 10, endpoints_in_app: int = 10):
     app_db_path = database.get_database_path(config.CONFIG_FILE_PATH, 'app')
     apps = autonomousagent.Applications(app_db_path)
 
-    # Generate 10 applications and 100 endpoints (10 per application)
-    for _ in range(app_count):
-        random_app_data = generate_random_application()
-        
-        #print("Random Application Data:")
-        # print(random_app_data)
-        # Add the random_app_data to your database
-        apps.add(**random_app_data)
-        for _ in range(endpoints_in_app):
-            random_endpoint_data = generate_random_endpoint(random_app_data["short_name"])
-            endpoints.add(**random_endpoint_data)
-            #print("Random Endpoint Data:")
-            #print(random_endpoint_data)
-    return True
\ No newline at end of file
+    # Generate 10 applications and 100 endpoints (10 per application), each written with one batch
+    random_apps = [generate_random_application() for _ in range(app_count)]
+    apps.add_many(random_apps)
+    random_endpoints = [generate_random_endpoint(random_app_data["short_name"])
+                        for random_app_data in random_apps for _ in range(endpoints_in_app)]
+    # rows rejected as duplicates (random names may repeat) are skipped
+    endpoints.add_many(random_endpoints)
+    return True
@@ -0,0 +1,262 @@
+"""This module provides the per host limits of the requests of the Autonomous Data Collector Agent.
+
+Endpoints of the same application, and of the applications sharing a host, are synced in parallel.
+So a source system is not flooded, each host gets a `HostLimiter` set from the fields of its
+applications:
+
+- `max_connections`: the maximum number of endpoints of the host synced at the same time. An endpoint
+  waiting for a free connection does not hold a worker, it is started by the endpoint leaving the host;
+- `rate_limit`: the maximum number of requests per second, a token bucket waited on before each page;
+- `byte_rate_limit`: the maximum number of response bytes per second, a token bucket the received
+  bytes are taken from, the next request waiting until it is paid back.
+
+A value of `0` leaves the limit off, the default of the applications created before the limits
+existed.
+"""
+
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# Fields of an application setting the limits of its host, with their defaults.
+LIMIT_FIELDS = {'max_connections': 0, 'rate_limit': 0.0, 'byte_rate_limit': 0}
+
+
+def parse_retry_after(value, now: float = None):
+    """
+    The function `parse_retry_after` reads the `Retry-After` header of a response.
+
+    :param value: The `value` parameter is the header value, a number of seconds or an HTTP date
+    :param now: The `now` parameter is the current POSIX timestamp, defaults to the current time
+    :type now: float
+    :return: the number of seconds to wait, or None when the header is missing or not valid.
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return max(0.0, date.timestamp() - (time.time() if now is None else now))
+
+
+# The `TokenBucket` class is a thread safe token bucket. Tokens are added at `rate` per second up to
+# `capacity`, and can be taken ahead: the bucket then goes negative and the callers wait until it is
+# paid back, so a burst is allowed once and then spread at the rate.
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic) -> None:
+        """
+        The function initializes a full bucket.
+
+        :param rate: The `rate` parameter is the number of tokens added per second
+        :type rate: float
+        :param capacity: The `capacity` parameter is the maximum number of tokens, defaults to one second
+        of tokens and at least 1
+        :type capacity: float
+        :param clock: The `clock` parameter is the monotonic clock of the bucket
+        """
+        self.lock = threading.Lock()
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(self.rate, 1.0)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        The function `reserve` takes tokens from the bucket.
+
+        :param amount: The `amount` parameter is the number of tokens to take
+        :type amount: float
+        :return: the number of seconds the caller must wait before using them.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """
+        The function `consume` takes tokens already used, like received bytes, without waiting.
+
+        :param amount: The `amount` parameter is the number of tokens to take
+        :type amount: float
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+
+    def delay(self) -> float:
+        """
+        The function `delay` tells how long until the bucket is paid back.
+        :return: a number of seconds, `0` when the bucket is not negative.
+        """
+        with self.lock:
+            self._refill()
+            return max(0.0, -self.tokens / self.rate)
+
+
+# The `HostLimiter` class holds the limits of a host: the connection slots and the request and byte
+# token buckets.
+class HostLimiter:
+    def __init__(self, max_connections: int = 0, rate_limit: float = 0.0, byte_rate_limit: int = 0) -> None:
+        """
+        The function initializes a limiter without any connection in use.
+
+        :param max_connections: The `max_connections` parameter is the maximum number of endpoints synced
+        at the same time, `0` for no limit
+        :type max_connections: int
+        :param rate_limit: The `rate_limit` parameter is the maximum number of requests per second, `0`
+        for no limit
+        :type rate_limit: float
+        :param byte_rate_limit: The `byte_rate_limit` parameter is the maximum number of response bytes
+        per second, `0` for no limit
+        :type byte_rate_limit: int
+        """
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self._waiting = deque()
+        self.settings = None
+        self.configure(max_connections, rate_limit, byte_rate_limit)
+
+    def configure(self, max_connections: int = 0, rate_limit: float = 0.0, byte_rate_limit: int = 0) -> None:
+        """
+        The function `configure` changes the limits, the connections in use are kept.
+
+        :param max_connections: The `max_connections` parameter is the maximum number of endpoints synced
+        at the same time, `0` for no limit
+        :type max_connections: int
+        :param rate_limit: The `rate_limit` parameter is the maximum number of requests per second, `0`
+        for no limit
+        :type rate_limit: float
+        :param byte_rate_limit: The `byte_rate_limit` parameter is the maximum number of response bytes
+        per second, `0` for no limit
+        :type byte_rate_limit: int
+        """
+        settings = (int(max_connections or 0), float(rate_limit or 0), int(byte_rate_limit or 0))
+        if settings == self.settings:
+            return
+        with self.lock:
+            self.settings = settings
+            self.max_connections = settings[0]
+            self.requests = TokenBucket(settings[1]) if settings[1] > 0 else None
+            self.bytes = TokenBucket(settings[2]) if settings[2] > 0 else None
+            starts = self._free_slots()
+        for start in starts:
+            start()
+
+    def _free_slots(self) -> list:
+        # hands the free connections to the waiting endpoints, must be called with the lock held
+        starts = []
+        while self._waiting and (not self.max_connections or self.in_use < self.max_connections):
+            self.in_use += 1
+            starts.append(self._waiting.popleft())
+        return starts
+
+    def enter_or_queue(self, start) -> bool:
+        """
+        The function `enter_or_queue` takes a connection of the host, or queues the endpoint when every
+        connection is in use.
+
+        :param start: The `start` parameter is a callable without parameters starting the endpoint, called
+        once a connection is handed to it
+        :return: `True` when the connection is taken, the caller starts the endpoint itself, `False` when
+        the endpoint is queued.
+        """
+        with self.lock:
+            if not self._waiting and (not self.max_connections or self.in_use < self.max_connections):
+                self.in_use += 1
+                return True
+            self._waiting.append(start)
+            return False
+
+    def leave(self) -> None:
+        """
+        The function `leave` gives back a connection, which is handed to the next queued endpoint.
+        """
+        with self.lock:
+            self.in_use -= 1
+            starts = self._free_slots()
+        for start in starts:
+            start()
+
+    def request_delay(self) -> float:
+        """
+        The function `request_delay` takes a request token.
+        :return: the number of seconds to wait before sending the request.
+        """
+        requests, received = self.requests, self.bytes
+        delay = requests.reserve() if requests is not None else 0.0
+        if received is not None:
+            delay = max(delay, received.delay())
+        return delay
+
+    def wait_for_request(self) -> None:
+        """
+        The function `wait_for_request` takes a request token and sleeps until the request can be sent.
+        """
+        delay = self.request_delay()
+        if delay:
+            time.sleep(delay)
+
+    def received(self, size: int) -> None:
+        """
+        The function `received` takes the bytes of a response from the byte token bucket.
+
+        :param size: The `size` parameter is the number of received bytes
+        :type size: int
+        """
+        received = self.bytes
+        if received is not None and size:
+            received.consume(size)
+
+
+# The `HostLimits` class keeps the `HostLimiter` of every host. Applications sharing a host share its
+# limiter, configured by the application synced last.
+class HostLimits:
+    def __init__(self) -> None:
+        """
+        The function initializes an empty registry.
+        """
+        self.lock = threading.Lock()
+        self._limiters = {}
+
+    def get(self, app_data) -> HostLimiter:
+        """
+        The function `get` returns the limiter of the host of an application, set to its limits.
+
+        :param app_data: The `app_data` parameter is the application record
+        :return: a `HostLimiter` object.
+        """
+        limits = {field: app_data.get(field) or default for field, default in LIMIT_FIELDS.items()}
+        host = app_data.get('host')
+        with self.lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = HostLimiter(**limits)
+                return limiter
+        limiter.configure(**limits)
+        return limiter
+
+
+# Registry shared by the whole process.
+_limits = HostLimits()
+
+
+def get_host_limits() -> HostLimits:
+    """
+    The function `get_host_limits` returns the host limits shared by the process.
+    :return: a `HostLimits` object.
+    """
+    return _limits
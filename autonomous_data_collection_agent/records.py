@@ -0,0 +1,184 @@
+"""This module provides the compact record classes of the applications and endpoints of the Autonomous Data Collector Agent.
+
+The scheduler holds every endpoint of an application in memory. Plain dicts cost a hash table per
+record and a copy of every nested payload and filter, so the records read for a sync are built as
+`__slots__` objects instead:
+
+- the repeated strings (application ids, methods, hosts, auth types) are interned, so every record
+  shares one copy;
+- the dict and list fields are not copied when the record is built: the record keeps a reference to
+  the stored value, which the storage engines never change in place, and copies it on first access,
+  with its keys and short strings (table names, filter column names and operators) interned.
+
+The records also support the read and write access of a dict (`record['name']`, `record.get()`,
+`record['last_sync'] = ...`), so code written for the dict records works with them unchanged.
+"""
+
+import sys
+
+# Strings longer than this are not interned when a nested field is copied.
+INTERN_MAX_LENGTH = 64
+
+
+def intern_string(value):
+    """
+    The function `intern_string` interns a string, so equal strings share one object.
+
+    :param value: The `value` parameter is any value
+    :return: the interned string, or the value unchanged when it is not a string.
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+def copy_interned(value):
+    """
+    The function `copy_interned` copies a nested dict or list field, interning its keys and its short
+    strings (table names, filter column names and operators).
+
+    :param value: The `value` parameter is the stored value of the field
+    :return: the copied value.
+    """
+    if isinstance(value, dict):
+        return {sys.intern(k) if type(k) is str else k: copy_interned(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_interned(v) for v in value]
+    if type(value) is str and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+# The `Record` class is the base of the compact record classes. Subclasses list their `FIELDS`, the
+# `INTERNED` fields and the `NESTED` dict and list fields, which are stored in a slot named after the
+# field with a leading underscore and copied on first access.
+class Record:
+    __slots__ = ('id', '_copied')
+
+    FIELDS = ()
+    INTERNED = frozenset()
+    NESTED = ()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # (field, slot setter, conversion) of every field, worked out once per class
+        cls._plan = tuple(
+            (field, cls.__dict__['_' + field].__set__, None) if field in cls.NESTED
+            else (field, cls.__dict__[field].__set__, intern_string) if field in cls.INTERNED
+            else (field, cls.__dict__[field].__set__, None)
+            for field in cls.FIELDS
+        )
+
+    @classmethod
+    def from_record(cls, record_id: str, record: dict) -> "Record":
+        """
+        The function `from_record` builds a compact record from a stored record. The nested values of the
+        stored record are shared until they are read, so the stored record must not be changed in place
+        afterwards, which the storage engines never do.
+
+        :param record_id: The `record_id` parameter is the id of the record
+        :type record_id: str
+        :param record: The `record` parameter is the stored record
+        :type record: dict
+        :return: a new record object.
+        """
+        self = cls.__new__(cls)
+        self.id = record_id
+        self._copied = 0
+        get = record.get
+        for field, set_slot, conversion in cls._plan:
+            value = get(field)
+            set_slot(self, value if conversion is None else conversion(value))
+        return self
+
+    def __getitem__(self, field: str):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field: str, value) -> None:
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.id!r}, {self.to_dict()!r})"
+
+    def get(self, field: str, default=None):
+        return getattr(self, field) if field in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.FIELDS]
+
+    def to_dict(self) -> dict:
+        """
+        The function `to_dict` returns the record as a plain dictionary.
+        :return: a new dictionary of the record fields.
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def _nested_property(field: str, bit: int) -> property:
+    # copies the shared value of the slot on first access and keeps the copy
+    slot = '_' + field
+
+    def getter(self):
+        if not self._copied & bit:
+            setattr(self, slot, copy_interned(getattr(self, slot)))
+            self._copied |= bit
+        return getattr(self, slot)
+
+    def setter(self, value):
+        setattr(self, slot, value)
+        self._copied |= bit
+
+    return property(getter, setter)
+
+
+# The `EndpointRecord` class is the compact record of an endpoint.
+class EndpointRecord(Record):
+    __slots__ = (
+        'app_id', 'name', 'url_endpoint', 'method', '_payload', '_filters', 'page_size', 'last_sync',
+        'process_status', 'failed_count', 'failed_time', 'status',
+    )
+
+    FIELDS = (
+        'app_id', 'name', 'url_endpoint', 'method', 'payload', 'filters', 'page_size', 'last_sync',
+        'process_status', 'failed_count', 'failed_time', 'status',
+    )
+    INTERNED = frozenset(('app_id', 'method'))
+    NESTED = ('payload', 'filters')
+
+    payload = _nested_property('payload', 1)
+    filters = _nested_property('filters', 2)
+
+
+# The `ApplicationRecord` class is the compact record of an application.
+class ApplicationRecord(Record):
+    __slots__ = (
+        'name', 'short_name', 'host', 'url_scheme', 'auth_type', '_auth_data', 'dump_path', 'sync_frequency',
+        'last_sync', 'next_sync', '_default_payload', '_default_filters', 'default_page_size', 'process_status',
+        'status', 'max_connections', 'rate_limit', 'byte_rate_limit',
+    )
+
+    FIELDS = (
+        'name', 'short_name', 'host', 'url_scheme', 'auth_type', 'auth_data', 'dump_path', 'sync_frequency',
+        'last_sync', 'next_sync', 'default_payload', 'default_filters', 'default_page_size', 'process_status',
+        'status', 'max_connections', 'rate_limit', 'byte_rate_limit',
+    )
+    INTERNED = frozenset(('short_name', 'host', 'url_scheme', 'auth_type', 'sync_frequency'))
+    NESTED = ('auth_data', 'default_payload', 'default_filters')
+
+    auth_data = _nested_property('auth_data', 1)
+    default_payload = _nested_property('default_payload', 2)
+    default_filters = _nested_property('default_filters', 4)
@@ -0,0 +1,165 @@
+"""This module provides the effective request configuration of the endpoints of the Autonomous Data Collector Agent.
+
+The request of an endpoint merges the endpoint with the defaults of its application: an empty
+`payload` or `filters` falls back to `default_payload` or `default_filters`, a `page_size` below 1 to
+`default_page_size`. The merged `RequestSpec` is built once and kept in memory until a change event
+of the endpoint or of its application, so building a request is a lookup.
+"""
+
+import base64
+import json
+import threading
+import time
+
+from autonomous_data_collection_agent.events import ADDED, get_event_bus
+from autonomous_data_collection_agent.normalize import format_timestamp
+
+# Fields of an application and of an endpoint a request spec is built from.
+APP_SPEC_FIELDS = ('url_scheme', 'host', 'auth_type', 'auth_data', 'default_payload', 'default_filters', 'default_page_size')
+ENDPOINT_SPEC_FIELDS = ('url_endpoint', 'method', 'payload', 'filters', 'page_size')
+
+# Filter columns whose empty value is replaced by the last sync datetime.
+SYNC_FILTER_COLUMNS = frozenset(('CREATED_AT', 'UPDATED_AT', 'DELETED_AT'))
+
+
+# The `RequestSpec` class represents the effective request of an endpoint: the URL, the method, the
+# static headers, the merged payload, filters and page size. It is shared between runs and must not be
+# changed.
+class RequestSpec:
+    def __init__(self, app_data: dict, endpoint_data: dict) -> None:
+        """
+        The function merges an endpoint with the defaults of its application.
+
+        :param app_data: The `app_data` parameter is the stored application
+        :type app_data: dict
+        :param endpoint_data: The `endpoint_data` parameter is the stored endpoint
+        :type endpoint_data: dict
+        """
+        self.url = f"{app_data.get('url_scheme') or 'https'}://{app_data.get('host') or 'localhost'}/{endpoint_data.get('url_endpoint') or 'data-export-generic-api'}"
+        self.method = endpoint_data.get('method') or 'POST'
+        self.auth_type = app_data.get('auth_type')
+        self.auth_data = app_data.get('auth_data') or {}
+        self.payload = dict(endpoint_data.get('payload') or app_data.get('default_payload') or {})
+        page_size = endpoint_data.get('page_size') or 0
+        self.page_size = int(page_size if page_size >= 1 else app_data.get('default_page_size') or 0)
+        self.filters = tuple(dict(item) for item in endpoint_data.get('filters') or app_data.get('default_filters') or [])
+        # indexes of the filters taking the last sync datetime, the other filters never change
+        self.sync_filters = tuple(
+            index for index, item in enumerate(self.filters)
+            if item.get('column_name') in SYNC_FILTER_COLUMNS and not str(item.get('column_value') or '').strip()
+        )
+        self.filters_json = None if self.sync_filters else json.dumps(list(self.filters))
+        self.headers = {}
+        if self.auth_type == 'BASIC':
+            credentials = f"{self.auth_data.get('key', '')}:{self.auth_data.get('key', 'secret')}"
+            self.headers['Authorization'] = f"Basic {base64.b64encode(credentials.encode('utf-8')).decode('utf-8')}"
+
+    def request_data(self, last_sync=None) -> dict:
+        """
+        The function `request_data` builds the request data of a run, without the page number.
+
+        :param last_sync: The `last_sync` parameter is the timestamp of the last sync of the endpoint,
+        written in the empty filter values. The current time is used when it is None
+        :return: a new dictionary.
+        """
+        filters_json = self.filters_json
+        if filters_json is None:
+            value = format_timestamp(time.time() if last_sync is None else last_sync)
+            filters = list(self.filters)
+            for index in self.sync_filters:
+                filters[index] = dict(filters[index], column_value=value)
+            filters_json = json.dumps(filters)
+        request_data = {"filters": filters_json, "page_size": self.page_size}
+        request_data.update(self.payload)
+        return request_data
+
+
+# The `RequestSpecCache` class keeps the request spec of every endpoint. An entry is dropped by
+# `invalidate_app()` and `invalidate_endpoint()`, called on the change events of the applications and
+# endpoints touching the fields it was built from, and on the external events of a `DatabaseWatcher`
+# for the changes made by other processes. A hit is a lookup, the records are not compared.
+class RequestSpecCache:
+    def __init__(self) -> None:
+        """
+        The function initializes an empty cache.
+        """
+        self.lock = threading.Lock()
+        # endpoint id -> (app id, spec)
+        self._specs = {}
+
+    def get(self, app_id: str, app_data: dict, endpoint_id: str, endpoint_data: dict) -> RequestSpec:
+        """
+        The function `get` returns the request spec of an endpoint, building it when it is not cached.
+
+        :param app_id: The `app_id` parameter is the id of the application of the endpoint
+        :type app_id: str
+        :param app_data: The `app_data` parameter is the stored application
+        :type app_data: dict
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint
+        :type endpoint_id: str
+        :param endpoint_data: The `endpoint_data` parameter is the stored endpoint
+        :type endpoint_data: dict
+        :return: a `RequestSpec` object.
+        """
+        entry = self._specs.get(endpoint_id)
+        # an endpoint moved to another application is built again
+        if entry is not None and entry[0] == app_id:
+            return entry[1]
+        spec = RequestSpec(app_data, endpoint_data)
+        with self.lock:
+            self._specs[endpoint_id] = (app_id, spec)
+        return spec
+
+    def invalidate_endpoint(self, endpoint_id=None) -> None:
+        """
+        The function `invalidate_endpoint` drops the request spec of an endpoint.
+
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint, every spec is dropped
+        when it is None
+        """
+        with self.lock:
+            if endpoint_id is None:
+                self._specs.clear()
+            else:
+                self._specs.pop(endpoint_id, None)
+
+    def invalidate_app(self, app_id=None) -> None:
+        """
+        The function `invalidate_app` drops the request specs of the endpoints of an application.
+
+        :param app_id: The `app_id` parameter is the id of the application, every spec is dropped when it
+        is None
+        """
+        with self.lock:
+            if app_id is None:
+                self._specs.clear()
+            else:
+                self._specs = {endpoint_id: entry for endpoint_id, entry in self._specs.items() if entry[0] != app_id}
+
+
+# Cache shared by the whole process.
+_cache = RequestSpecCache()
+
+
+def _on_change(event) -> None:
+    # added records have no spec yet, the external events of other processes tell no ids and drop
+    # every spec
+    if event.kind == ADDED:
+        return
+    if event.item_type == 'app' and event.touches(APP_SPEC_FIELDS):
+        for app_id in event.ids if event.ids is not None else [None]:
+            _cache.invalidate_app(app_id)
+    elif event.item_type == 'endpoint' and event.touches(ENDPOINT_SPEC_FIELDS):
+        for endpoint_id in event.ids if event.ids is not None else [None]:
+            _cache.invalidate_endpoint(endpoint_id)
+
+
+get_event_bus().subscribe(_on_change)
+
+
+def get_request_spec_cache() -> RequestSpecCache:
+    """
+    The function `get_request_spec_cache` returns the request spec cache shared by the process.
+    :return: a `RequestSpecCache` object.
+    """
+    return _cache
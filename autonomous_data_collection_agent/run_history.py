@@ -0,0 +1,212 @@
+"""This module provides the sync run history store of the Autonomous Data Collector Agent and its analytics.
+
+Every `process_endpoint` call appends one fixed-size binary record to `<endpoint database>.runs`, so
+recording a run is a single small append and the whole file can be read as one NumPy structured array.
+NumPy is only needed to compute the statistics.
+"""
+
+import os
+import struct
+import threading
+
+# Layout of a run record, little endian and without padding so NumPy can read the file as is.
+RUN_FIELDS = (
+    ('app_id', 'q'),
+    ('endpoint_id', 'q'),
+    ('start', 'd'),
+    ('end', 'd'),
+    ('pages', 'I'),
+    ('records', 'I'),
+    ('bytes', 'Q'),
+    ('http_status', 'H'),
+    ('retries', 'H'),
+    ('failed', 'B'),
+)
+RUN_STRUCT = struct.Struct('<' + ''.join(code for _, code in RUN_FIELDS))
+
+# Suffix replacing the extension of the endpoint database to get the run history file name.
+HISTORY_SUFFIX = '.runs'
+
+# Latency percentiles reported by `compute_stats()`.
+PERCENTILES = (50, 95, 99)
+
+# Locks of the run history files, one per file shared by every `RunHistory` of the process, since a
+# store is created per recorded run.
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _get_lock(path: str) -> threading.Lock:
+    key = os.path.realpath(path)
+    with _locks_lock:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def get_history_path(endpoint_db_path: str) -> str:
+    """
+    The function `get_history_path` returns the path of the run history file kept next to the endpoint
+    database.
+
+    :param endpoint_db_path: The `endpoint_db_path` parameter is the path of the endpoint database
+    :type endpoint_db_path: str
+    :return: the run history path as a string.
+    """
+    return os.path.splitext(endpoint_db_path)[0] + HISTORY_SUFFIX
+
+
+def run_dtype():
+    """
+    The function `run_dtype` returns the NumPy structured dtype matching `RUN_STRUCT`.
+    :return: a `numpy.dtype` object.
+    """
+    import numpy as np
+
+    return np.dtype([(name, '<' + code) for name, code in RUN_FIELDS])
+
+
+# The `RunHistory` class is the append-only store of the sync runs of every endpoint.
+class RunHistory:
+    def __init__(self, path: str) -> None:
+        """
+        The function initializes the store. The file is created by the first recorded run.
+
+        :param path: The `path` parameter is the path of the run history file
+        :type path: str
+        """
+        self.path = path
+        self.lock = _get_lock(path)
+
+    def record(self, app_id: str, endpoint_id: str, start: float, end: float, pages: int = 0, records: int = 0,
+               response_bytes: int = 0, http_status: int = 0, retries: int = 0, failed: bool = False) -> None:
+        """
+        The function `record` appends one run to the store.
+
+        :param app_id: The `app_id` parameter is the id of the application
+        :type app_id: str
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint
+        :type endpoint_id: str
+        :param start: The `start` parameter is the start of the run as a POSIX timestamp
+        :type start: float
+        :param end: The `end` parameter is the end of the run as a POSIX timestamp
+        :type end: float
+        :param pages: The `pages` parameter is the number of pages requested
+        :type pages: int
+        :param records: The `records` parameter is the number of records received
+        :type records: int
+        :param response_bytes: The `response_bytes` parameter is the size of the received responses
+        :type response_bytes: int
+        :param http_status: The `http_status` parameter is the HTTP status of the last response, `0` when
+        no response was received
+        :type http_status: int
+        :param retries: The `retries` parameter is the number of retried requests
+        :type retries: int
+        :param failed: The `failed` parameter tells whether the run failed
+        :type failed: bool
+        """
+        packed = RUN_STRUCT.pack(
+            int(app_id), int(endpoint_id), start, end, pages, records, response_bytes, http_status, min(retries, 0xFFFF), int(failed)
+        )
+        with self.lock:
+            # a single append of a whole record, readers ignore a torn record at the end of the file
+            with open(self.path, 'ab') as f:
+                f.write(packed)
+
+    def __len__(self) -> int:
+        try:
+            return os.path.getsize(self.path) // RUN_STRUCT.size
+        except FileNotFoundError:
+            return 0
+
+    def load(self):
+        """
+        The function `load` reads every recorded run.
+        :return: a NumPy structured array with one row per run.
+        """
+        import numpy as np
+
+        dtype = run_dtype()
+        count = len(self)
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.fromfile(self.path, dtype=dtype, count=count)
+
+
+def compute_stats(runs, by_endpoint: bool = True) -> list:
+    """
+    The function `compute_stats` computes the latency percentiles, throughput and failure rate of the
+    given runs per endpoint or per application, using vectorized NumPy operations only.
+
+    :param runs: The `runs` parameter is the structured array returned by `RunHistory.load()`
+    :param by_endpoint: The `by_endpoint` parameter tells whether the runs are grouped per endpoint,
+    else they are grouped per application
+    :type by_endpoint: bool
+    :return: a list of dictionaries, one per group, sorted by application and endpoint id.
+    """
+    import numpy as np
+
+    if len(runs) == 0:
+        return []
+    latency = runs['end'] - runs['start']
+    # one sort brings the runs of each group together, ordered by latency for the percentiles
+    if by_endpoint:
+        order = np.lexsort((latency, runs['endpoint_id'], runs['app_id']))
+    else:
+        order = np.lexsort((latency, runs['app_id']))
+    runs = runs[order]
+    latency = latency[order]
+    changed = runs['app_id'][1:] != runs['app_id'][:-1]
+    if by_endpoint:
+        changed |= runs['endpoint_id'][1:] != runs['endpoint_id'][:-1]
+    offsets = np.concatenate(([0], np.flatnonzero(changed) + 1))
+    counts = np.diff(np.append(offsets, len(runs)))
+    size = len(offsets)
+
+    def total(values):
+        return np.add.reduceat(values.astype(np.float64), offsets)
+
+    failures = total(runs['failed'])
+    records = total(runs['records'])
+    sizes = total(runs['bytes'])
+    pages = total(runs['pages'])
+    retries = total(runs['retries'])
+    busy = total(latency)
+
+    # read the percentiles at computed positions in each sorted group, with the same linear
+    # interpolation as `numpy.percentile`
+    percentiles = {}
+    for q in PERCENTILES:
+        position = (counts - 1) * (q / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        fraction = position - lower
+        percentiles[q] = latency[offsets + lower] * (1 - fraction) + latency[offsets + upper] * fraction
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        records_per_second = np.where(busy > 0, records / busy, 0.0)
+        bytes_per_second = np.where(busy > 0, sizes / busy, 0.0)
+
+    app_ids = runs['app_id'][offsets]
+    endpoint_ids = runs['endpoint_id'][offsets]
+    stats = []
+    for i in range(size):
+        row = {'app_id': str(app_ids[i])}
+        if by_endpoint:
+            row['endpoint_id'] = str(endpoint_ids[i])
+        row.update({
+            'runs': int(counts[i]),
+            'failures': int(failures[i]),
+            'failure_rate': float(failures[i] / counts[i]),
+            'pages': int(pages[i]),
+            'records': int(records[i]),
+            'bytes': int(sizes[i]),
+            'retries': int(retries[i]),
+            'records_per_second': float(records_per_second[i]),
+            'bytes_per_second': float(bytes_per_second[i]),
+        })
+        for q in PERCENTILES:
+            row[f'p{q}'] = float(percentiles[q][i])
+        stats.append(row)
+    return stats
@@ -11,14 +11,26 @@ import json
 import os
 import requests
 import logging
-from autonomous_data_collection_agent import ERRORS, __app_name__, __version__, autonomousagent, config, database, fileencryption, keycloak_auth
+from autonomous_data_collection_agent import ERRORS, __app_name__, __version__, async_fetch, autonomousagent, config, database, fileencryption, keycloak_auth
 import typer
+from autonomous_data_collection_agent.due_queue import RETRY_INTERVAL, DueQueue
+from autonomous_data_collection_agent.events import DatabaseWatcher, get_event_bus
+from autonomous_data_collection_agent.normalize import format_timestamp, to_timestamp
+from autonomous_data_collection_agent.paging import fetch_in_order, page_count
+from autonomous_data_collection_agent.query import where
+from autonomous_data_collection_agent.rate_limit import get_host_limits
+from autonomous_data_collection_agent.request_spec import RequestSpec, get_request_spec_cache
+from autonomous_data_collection_agent.run_history import RunHistory, get_history_path
+from autonomous_data_collection_agent.worker_pool import WorkerPool
 from datetime import datetime
 import croniter
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
-import concurrent.futures
-import base64
+import asyncio
+import functools
+import struct
+import threading
+import time
 import urllib
 
 # Set up logging
@@ -41,6 +53,19 @@ class SchedulerService(win32serviceutil.ServiceFramework):
         """
         win32serviceutil.ServiceFramework.__init__(self, args)
         self.hWaitStop = win32event.CreateEvent(None, 0, 0, None)
+        # set when another process changes the databases, wakes the service before the next due application
+        self.hWakeUp = win32event.CreateEvent(None, 0, 0, None)
+        # active applications by due time, built again when `_apps_changed` is set
+        self._due = DueQueue()
+        self._apps_changed = threading.Event()
+        self._apps_changed.set()
+        # workers shared by every tick, sized by `concurrent_threads`
+        self._pool = WorkerPool()
+        # workers requesting the pages of the endpoints at the same time, sized by `page_parallelism`
+        self._page_pool = WorkerPool()
+        self._page_parallelism = 1
+        # event loop runner of the asyncio fetch mode, built per tick
+        self._fetcher = None
         socket.setdefaulttimeout(60)  # Set the timeout for network requests
         # self.cron = CronTab('*/30 * * * *')  # Schedule as per the provided cron format
 
@@ -63,60 +88,178 @@ class SchedulerService(win32serviceutil.ServiceFramework):
     def main(self):
         """
         The main function checks if threading is enabled and processes applications accordingly, with an
-        option for concurrent threads.
+        option for concurrent threads. A tick runs when the earliest application is due, the service
+        sleeps until then, or until another process, like the CLI, changes the applications or
+        endpoints.
         """
-        threading_config = config.get_threading_config()
-        if threading_config["enabled"] == "True":
-            while True:
-                self.process_applications(True, threading_config["concurrent_threads"])
-                if win32event.WaitForSingleObject(self.hWaitStop, 60000) == win32event.WAIT_OBJECT_0:
-                    break
-        else:
-            while True:
-                # if self.cron.next(default_utc=True) <= 0:
-                #     self.process_applications()
-                self.process_applications()
+        self.normalize_databases()
+        watcher = self.watch_databases()
+        try:
+            threading_config = config.get_threading_config()
+            if threading_config["enabled"] == "True":
+                while True:
+                    # None when no application is active, the service then waits for a change
+                    due = self.seconds_until_due()
+                    if due is not None and due <= 0:
+                        # batch the database writes of the run into one write per database file
+                        with database.write_back(**config.get_write_back_config()):
+                            self.process_applications(True, threading_config["concurrent_threads"], **config.get_fetch_config())
+                        watcher.sync()
+                        self.defer_due_applications()
+                    if self.wait_for_next_tick(self.seconds_until_due()):
+                        break
+            else:
+                while True:
+                    # if self.cron.next(default_utc=True) <= 0:
+                    #     self.process_applications()
+                    due = self.seconds_until_due()
+                    if due is not None and due <= 0:
+                        # batch the database writes of the run into one write per database file
+                        with database.write_back(**config.get_write_back_config()):
+                            self.process_applications()
+                        # the writes of the tick are not changes to wake up for
+                        watcher.sync()
+                        self.defer_due_applications()
+
+                    # Sleep until the next application is due or the stop signal
+                    if self.wait_for_next_tick(self.seconds_until_due()):
+                        break
+        finally:
+            watcher.stop()
+            self._pool.shutdown()
+            self._page_pool.shutdown()
+
+    def watch_databases(self) -> DatabaseWatcher:
+        """
+        The function `watch_databases` starts watching the application and endpoint databases for the
+        changes made by other processes, which set the `hWakeUp` event.
+        :return: the started `DatabaseWatcher`.
+        """
+        handlers = {item_type: database.get_database_handler(database.get_database_path(config.CONFIG_FILE_PATH, item_type)) for item_type in ('app', 'endpoint')}
+        watcher = DatabaseWatcher(handlers)
+        get_event_bus().subscribe(self.on_change)
+        watcher.start()
+        return watcher
+
+    def on_change(self, event):
+        """
+        The function `on_change` receives the change events. A change of the applications, by the service
+        itself or by another process, makes the due queue be built again. Only the changes of other
+        processes wake the service up, the changes of the service itself are made by the running tick.
+        
+        :param event: The `event` parameter is the `ChangeEvent`
+        """
+        if event.item_type == 'app':
+            self._apps_changed.set()
+        if event.external:
+            win32event.SetEvent(self.hWakeUp)
 
-                # Check for the stop signal every 60 seconds
-                if win32event.WaitForSingleObject(self.hWaitStop, 60000) == win32event.WAIT_OBJECT_0:
-                    break
+    def seconds_until_due(self):
+        """
+        The function `seconds_until_due` tells how long until the earliest application is due, building
+        the due queue again from the `next_sync` of the applications after they changed.
+        :return: a number of seconds, `0` when an application is due, None when there is no application
+        to sync.
+        """
+        if self._apps_changed.is_set():
+            self._apps_changed.clear()
+            applications = self._get_applications().get_app_fields(['next_sync', 'process_status'], values={'status': 1})
+            self._due.rebuild({app_id: app_data for app_id, app_data in applications.items() if (app_data.get('process_status') or 0) < 2})
+        next_due = self._due.next_due()
+        if next_due is None:
+            return None
+        return max(0.0, next_due - time.time())
+
+    def defer_due_applications(self):
+        """
+        The function `defer_due_applications` defers the applications a tick left due, because some of
+        their endpoints failed, so they are synced again after `RETRY_INTERVAL` seconds and not at once.
+        """
+        if self._apps_changed.is_set():
+            self.seconds_until_due()
+        now = time.time()
+        self._due.defer_due(now, now + RETRY_INTERVAL)
+
+    def wait_for_next_tick(self, timeout):
+        """
+        The function `wait_for_next_tick` waits until the next application is due, a change is made by
+        another process or the service is stopped.
+        
+        :param timeout: The `timeout` parameter is the maximum number of seconds to wait, None to wait
+        for a change or the stop signal only
+        :return: `True` when the service is stopping, `False` when the service should check the due
+        applications.
+        """
+        milliseconds = win32event.INFINITE if timeout is None else min(int(timeout * 1000), 0x7FFFFFFF)
+        result = win32event.WaitForMultipleObjects([self.hWaitStop, self.hWakeUp], False, milliseconds)
+        return result == win32event.WAIT_OBJECT_0
+
+    def normalize_databases(self):
+        """
+        The function `normalize_databases` migrates the records written by older versions to native
+        types once at start, so the sync loop never parses strings.
+        """
+        engine = database.get_storage_engine(config.CONFIG_FILE_PATH)
+        for item_type in ('app', 'endpoint'):
+            result = database.normalize_database(database.get_database_path(config.CONFIG_FILE_PATH, item_type), engine)
+            if result.error:
+                logging.error(f"Normalizing the {item_type} records failed with \"{ERRORS[result.error]}\" for IDs: {', '.join(result.item_list)}")
+            elif result.item_list:
+                logging.info(f"Normalized {len(result.item_list)} {item_type} records")
 
     def update_app_processing_status(self):
         """
         The function updates the processing status of active applications and their associated
-        endpoints, and logs the completion of the processing.
+        endpoints, and logs the completion of the processing. Only the applications in progress are
+        read, the others have nothing to complete.
         """
-        all_active_apps = self._get_applications().get_app_by_status(1)
+        applications = self._get_applications()
+        all_active_apps = applications.get_app_fields(['sync_frequency'], values={'status': 1, 'process_status': 1})
+        self.disable_failed_endpoints()
         for app_id in all_active_apps:
             app_data = all_active_apps[app_id]
-            if self.endpoint_processing_completed(app_id):
-                current_time = datetime.now()
-                current_time_str = current_time.strftime("%d-%m-%Y %H:%M:%S")
-                cron = croniter.croniter(app_data["sync_frequency"], current_time)
-                self._get_endpoints().update_endpoints_by_query(lambda x: x['app_id'] == app_id and  x['status'] == 1 and x['process_status'] == 2, {'process_status': 0, 'failed_count':0})
-                self._get_applications().update_app(app_id, {'process_status':0, 'last_sync': current_time_str , 'next_sync': cron.get_next(datetime).strftime("%d-%m-%Y %H:%M:%S")})
-                logging.info(f"App processing completed: {app_id} at: {current_time_str}")
+            endpoints = self._get_endpoints()
+            # the endpoint reset and the application update are committed together
+            with endpoints.transaction(applications):
+                if self.endpoint_processing_completed(app_id, endpoints):
+                    current_time = datetime.now()
+                    current_time_str = current_time.strftime("%d-%m-%Y %H:%M:%S")
+                    cron = croniter.croniter(app_data["sync_frequency"], current_time)
+                    endpoints.update_endpoints_by_query((where('app_id') == app_id) & (where('status') == 1) & (where('process_status') == 2), {'process_status': 0, 'failed_count':0})
+                    applications.update_app(app_id, {'process_status':0, 'last_sync': current_time.timestamp(), 'next_sync': cron.get_next(float)})
+                    logging.info(f"App processing completed: {app_id} at: {current_time_str}")
 
-    def endpoint_processing_completed(self, app_id):
+    def disable_failed_endpoints(self):
         """
-        The function checks if all active endpoints for a given app ID have completed processing.
-        
-        :param app_id: The `app_id` parameter represents the ID of an application
-        :return: a boolean value indicating whether all active endpoints for a given app ID have
-        completed processing.
+        The function `disable_failed_endpoints` disables the endpoints which failed 3 times, once per
+        tick for every application.
         """
-        disable_failed_endpoints = self._get_endpoints().update_endpoints_by_query(lambda x: x['status'] == 1 and x['process_status'] == 1 and x['failed_count'] == 3, {"status": 0, 'process_status': 0, 'failed_count':0})
+        endpoints = self._get_endpoints()
+        disable_failed_endpoints = endpoints.update_endpoints_by_query((where('status') == 1) & (where('process_status') == 1) & (where('failed_count') == 3), {"status": 0, 'process_status': 0, 'failed_count':0})
 
         if len(disable_failed_endpoints):
             disabled_failed_endpoints = ', '.join(disable_failed_endpoints)
-            logging.warning(f"Disabled the endpoints for App ID: {app_id} which failed 3 times. Endpiont IDs: {disabled_failed_endpoints}")
+            logging.warning(f"Disabled the endpoints which failed 3 times. Endpiont IDs: {disabled_failed_endpoints}")
 
-        all_active_app_endpoint_count = len(self._get_endpoints().get_endpoints_by_query(lambda x: x['app_id'] == app_id and x['status'] == 1))
-        completed_app_endpoints = len(self._get_endpoints().get_endpoints_by_query(lambda x: x['app_id'] == app_id and x['status'] == 1 and x['process_status'] == 2))
+    def endpoint_processing_completed(self, app_id, endpoints=None):
+        """
+        The function checks if all active endpoints for a given app ID have completed processing, from
+        the per application status counters of the store.
+        
+        :param app_id: The `app_id` parameter represents the ID of an application
+        :param endpoints: The `endpoints` parameter is the `Endpoints` object to use, so the checks can
+        run inside the caller's transaction (optional)
+        :return: a boolean value indicating whether all active endpoints for a given app ID have
+        completed processing.
+        """
+        endpoints = endpoints or self._get_endpoints()
+        status_counts = endpoints.get_status_counts(app_id)
+        all_active_app_endpoint_count = sum(count for (status, _), count in status_counts.items() if status == 1)
+        completed_app_endpoints = status_counts.get((1, 2), 0)
 
         return all_active_app_endpoint_count == completed_app_endpoints
     
-    def process_applications(self, threading_enabled=False, thread_count=2):
+    def process_applications(self, threading_enabled=False, thread_count=2, fetch_mode="threads", concurrent_requests=100, page_parallelism=1):
         """
         The `process_applications` function processes applications and their associated endpoints,
         either sequentially or using multithreading if enabled.
@@ -128,51 +271,101 @@ class SchedulerService(win32serviceutil.ServiceFramework):
         :param thread_count: The `thread_count` parameter specifies the number of threads to be used for
         processing the endpoints. It determines the maximum number of concurrent threads that can be
         executed at a time, defaults to 2 (optional)
+        :param fetch_mode: The `fetch_mode` parameter tells how the endpoints run when threading is
+        enabled: `threads` runs them on the worker pool, `asyncio` as tasks of one event loop, which
+        needs aiohttp, defaults to `threads` (optional)
+        :param concurrent_requests: The `concurrent_requests` parameter is the maximum number of requests
+        in flight at the same time in the `asyncio` mode, defaults to 100 (optional)
+        :param page_parallelism: The `page_parallelism` parameter is the maximum number of pages of an
+        endpoint requested at the same time when threading is enabled, defaults to 1 (optional)
         """
 
         # Get applications which are already under progress
         self.update_app_processing_status()
-        applications = self._get_applications().get_app_by_query(lambda x: x['status'] == 1 and x['process_status'] < 2 )
+        if threading_enabled and fetch_mode == "asyncio" and not async_fetch.is_available():
+            logging.warning("The asyncio fetch mode needs aiohttp, which is not installed. The endpoints run on worker threads.")
+            fetch_mode = "threads"
+        use_asyncio = threading_enabled and fetch_mode == "asyncio"
+        async_tasks = []
+        self._page_parallelism = max(1, int(page_parallelism)) if threading_enabled else 1
+        if use_asyncio:
+            self._fetcher = async_fetch.AsyncFetcher(concurrent_requests, page_parallelism=self._page_parallelism)
+        elif threading_enabled:
+            self._pool.resize(int(thread_count))
+            # each endpoint worker can have `page_parallelism` pages in flight
+            self._page_pool.resize(int(thread_count) * self._page_parallelism)
+        applications = self._get_applications().get_app_records((where('status') == 1) & (where('process_status') < 2))
         for app_id in applications:
             app_data = applications[app_id]
             app_name = app_data["name"]
             try:
-                if(isinstance(app_data["next_sync"], str)):
-                    if app_data["next_sync"] is None or app_data["next_sync"] == "" or str(app_data["next_sync"]).strip() == "":
-                            app_data["next_sync"] = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-                next_sync_datetime = datetime.strptime(app_data["next_sync"], "%d-%m-%Y %H:%M:%S")
-                # Get the current date and time
-                current_datetime = datetime.now()
+                # stored datetimes are timestamps, an unset next_sync is due now
+                current_time = time.time()
+                if app_data["next_sync"] is None:
+                    app_data["next_sync"] = current_time
+                next_sync_datetime = datetime.fromtimestamp(app_data["next_sync"])
                 # Check if next_sync is due to run now
-                if current_datetime >= next_sync_datetime:
+                if current_time >= app_data["next_sync"]:
                     logging.info(f"next_sync is due to run now for app ID # {app_id} with name {app_name}")
                     self._get_applications().update_app_process_status(app_id, 1)
-                    endpoints = self._get_endpoints().get_endpoints_by_query(lambda x: x['app_id'] == app_id and x['status'] == 1 and x['process_status'] < 2)
+                    endpoints = self._get_endpoints().get_endpoint_records((where('app_id') == app_id) & (where('status') == 1) & (where('process_status') < 2))
                     for endpoint_id in endpoints:
                         endpoint_data = endpoints[endpoint_id]
-                        endpoint_name = endpoint_data['name']
+                        on_done = functools.partial(self.endpoint_processed, endpoint_id, endpoint_data)
                         try:
                             self._get_endpoints().update_endpoint_process_status(endpoint_id, 1)
-                            if threading_enabled:
-                                thread_count = int(thread_count)
-                                with concurrent.futures.ThreadPoolExecutor(max_workers=thread_count) as executor:  # Adjust max_workers as needed
-                                    futures = []
-                                    # Wait for all futures to complete
-                                    concurrent.futures.wait(futures)
-                                    future = executor.submit(self.process_endpoint, app_data, endpoint_data, next_sync_datetime)
-                                    futures.append(future)
-                            else:
-                                self.process_endpoint(app_data, endpoint_data, next_sync_datetime)
-                                
-                            last_sync_datetime =  datetime.strptime(endpoint_data['last_sync'], "%d-%m-%Y %H:%M:%S")    
-                            self._get_endpoints().update_endpoint(endpoint_id, {"failed_time": "", "failed_count": 0, "last_sync": last_sync_datetime.strftime("%d-%m-%Y %H:%M:%S"), 'process_status': 2})
                         except Exception as e:
-                            self._get_endpoints().update_endpoint(endpoint_id, {"failed_time": datetime.now().strftime("%d-%m-%Y %H:%M:%S"), "failed_count": endpoint_data["failed_count"] + 1})
-                            logging.error(f"Error processing endpoint ID: {endpoint_id} with name {endpoint_name}. Error Details : {str(e)}")
+                            on_done(None, e)
+                            continue
+                        if use_asyncio:
+                            # the endpoints of every due application share the event loop
+                            async_tasks.append((functools.partial(self.process_endpoint_async, app_data, endpoint_data, next_sync_datetime, endpoint_id), on_done))
+                        elif threading_enabled:
+                            # the endpoints of every due application share the workers of the pool, an
+                            # endpoint of a host without free connection waits in the queue of the host
+                            # instead of holding a worker
+                            limiter = get_host_limits().get(app_data)
+                            start = functools.partial(self._pool.submit, self.process_endpoint_on_host, limiter, app_data, endpoint_data, next_sync_datetime, endpoint_id, on_done=on_done)
+                            if limiter.enter_or_queue(start):
+                                start()
+                        else:
+                            try:
+                                self.process_endpoint(app_data, endpoint_data, next_sync_datetime, endpoint_id)
+                            except Exception as e:
+                                on_done(None, e)
+                            else:
+                                on_done(None, None)
             except Exception as err:
                 logging.error(f"Error processing app ID: {app_id} with name {app_name}. Error Details: {str(err)}")
+        # the tick ends once every endpoint ran, so its writes are flushed together
+        if use_asyncio:
+            self._fetcher.run(async_tasks)
+        elif threading_enabled:
+            self._pool.wait()
+        # the applications completed by the tick get their next sync at once
+        self.update_app_processing_status()
+
+    def endpoint_processed(self, endpoint_id, endpoint_data, result, error):
+        """
+        The function `endpoint_processed` writes the status of an endpoint once it ran. It is the
+        completion callback of the endpoint tasks of the worker pool.
+        
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint
+        :param endpoint_data: The `endpoint_data` parameter is the endpoint record, with the `last_sync`
+        of the run
+        :param result: The `result` parameter is the result of `process_endpoint`, not used
+        :param error: The `error` parameter is the exception raised by the run, None when it succeeded
+        """
+        if error is None:
+            try:
+                self._get_endpoints().update_endpoint(endpoint_id, {"failed_time": None, "failed_count": 0, "last_sync": endpoint_data['last_sync'], 'process_status': 2})
+                return
+            except Exception as e:
+                error = e
+        self._get_endpoints().update_endpoint(endpoint_id, {"failed_time": time.time(), "failed_count": endpoint_data["failed_count"] + 1})
+        logging.error(f"Error processing endpoint ID: {endpoint_id} with name {endpoint_data['name']}. Error Details : {str(error)}")
 
-    def process_endpoint(self, app_data, endpoint_data, next_sync_datetime):
+    def process_endpoint(self, app_data, endpoint_data, next_sync_datetime, endpoint_id=None):
         """
         The function processes an endpoint by making a request, saving the response, and updating the
         next sync datetime.
@@ -186,11 +379,128 @@ class SchedulerService(win32serviceutil.ServiceFramework):
         :param next_sync_datetime: The `next_sync_datetime` parameter is the datetime value indicating
         the next scheduled synchronization time for the endpoint. It is used to determine when the
         endpoint should be synchronized again
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint. When it is given the run
+        is recorded in the run history
         """
-        response = self.make_request(app_data, endpoint_data)
+        start = time.time()
+        run = {"pages": 0, "records": 0, "response_bytes": 0, "http_status": 0, "retries": 0}
+        failed = True
+        try:
+            response = self.make_request(app_data, endpoint_data, run, endpoint_id)
+            run["records"] = len(response) if response else 0
+
+            if response:
+                self.save_response(app_data, endpoint_data, response, next_sync_datetime)
+            failed = False
+        finally:
+            if endpoint_id is not None:
+                self.record_run(endpoint_data.get("app_id"), endpoint_id, start, run, failed)
+
+    def process_endpoint_on_host(self, limiter, app_data, endpoint_data, next_sync_datetime, endpoint_id=None):
+        """
+        The function `process_endpoint_on_host` runs `process_endpoint` with a connection of the host
+        taken, and gives the connection back to the next endpoint of the host when it is done.
         
-        if response:
-            self.save_response(app_data, endpoint_data, response, next_sync_datetime)  
+        :param limiter: The `limiter` parameter is the `HostLimiter` of the host of the application
+        :param app_data: The `app_data` parameter is the application of the endpoint
+        :param endpoint_data: The `endpoint_data` parameter is the endpoint record
+        :param next_sync_datetime: The `next_sync_datetime` parameter is the datetime of the next
+        scheduled synchronization
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint
+        """
+        try:
+            self.process_endpoint(app_data, endpoint_data, next_sync_datetime, endpoint_id)
+        finally:
+            limiter.leave()
+
+    async def process_endpoint_async(self, app_data, endpoint_data, next_sync_datetime, endpoint_id, session):
+        """
+        The function `process_endpoint_async` is the asyncio version of `process_endpoint`, run as a task
+        of the `AsyncFetcher`. The response is saved on a thread, so the event loop keeps sending the
+        requests of the other endpoints.
+        
+        :param app_data: The `app_data` parameter is the application of the endpoint
+        :param endpoint_data: The `endpoint_data` parameter is the endpoint record
+        :param next_sync_datetime: The `next_sync_datetime` parameter is the datetime of the next
+        scheduled synchronization
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint, the run is recorded in
+        the run history when it is not None
+        :param session: The `session` parameter is the HTTP session of the fetcher
+        """
+        limiter = get_host_limits().get(app_data)
+        # waits for a connection of the host, the other tasks keep running meanwhile
+        await async_fetch.enter_host(limiter)
+        start = time.time()
+        run = {"pages": 0, "records": 0, "response_bytes": 0, "http_status": 0, "retries": 0}
+        failed = True
+        try:
+            response = await self.make_request_async(session, app_data, endpoint_data, run, endpoint_id)
+            run["records"] = len(response) if response else 0
+
+            if response:
+                await asyncio.to_thread(self.save_response, app_data, endpoint_data, response, next_sync_datetime)
+            failed = False
+        finally:
+            limiter.leave()
+            if endpoint_id is not None:
+                self.record_run(endpoint_data.get("app_id"), endpoint_id, start, run, failed)
+
+    async def make_request_async(self, session, app_data, endpoint_data, run=None, endpoint_id=None):
+        """
+        The function `make_request_async` is the asyncio version of `make_request`: it requests every
+        page of an endpoint with the session of the fetcher.
+        
+        :param session: The `session` parameter is the HTTP session of the fetcher
+        :param app_data: The `app_data` parameter is the application of the endpoint
+        :param endpoint_data: The `endpoint_data` parameter is the endpoint record, its `last_sync` is set
+        to the time reported by the source system
+        :param run: The `run` parameter is an optional dictionary counting the run for the run history
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint. When it is given the
+        request spec is taken from the cache
+        :return: a list of all the data retrieved from the API endpoint.
+        """
+        if endpoint_id is None:
+            spec = RequestSpec(app_data, endpoint_data)
+        else:
+            spec = get_request_spec_cache().get(endpoint_data.get("app_id"), app_data, endpoint_id, endpoint_data)
+        request_data = spec.request_data(endpoint_data["last_sync"])
+
+        headers = dict(spec.headers)
+        if spec.auth_type == "KEYCLOAK":
+            # a client per endpoint, the tasks of several applications run at the same time
+            token = await asyncio.to_thread(keycloak_auth.KeycloakAuth(spec.auth_data).get_token)
+            headers = {
+                'Authorization': f'Bearer {token}',
+            }
+
+        try:
+            all_data, response_time = await self._fetcher.fetch_pages(session, spec.method, spec.url, request_data, headers, run, get_host_limits().get(app_data))
+        except Exception as e:
+            logging.error(f"Request to {spec.url} failed. Endpoint name: {endpoint_data['name']} App Name :{app_data['name']}. Error: {e}")
+            raise
+
+        if response_time:
+            # the time reported by the source system, in the format DD-MM-YYYY hh:mm:ss
+            endpoint_data["last_sync"] = to_timestamp(response_time)
+        return all_data
+
+    def record_run(self, app_id, endpoint_id, start, run, failed):
+        """
+        The function `record_run` appends a finished `process_endpoint` call to the run history. A run
+        history which cannot be written is logged and does not fail the sync.
+        
+        :param app_id: The `app_id` parameter is the id of the application of the endpoint
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint
+        :param start: The `start` parameter is the POSIX timestamp at which the run started
+        :param run: The `run` parameter is the dictionary of pages, records, response bytes, HTTP status
+        and retries filled by `make_request`
+        :param failed: The `failed` parameter tells whether the run failed
+        """
+        try:
+            history_path = get_history_path(database.get_database_path(config.CONFIG_FILE_PATH, "endpoint"))
+            RunHistory(history_path).record(app_id, endpoint_id, start, time.time(), failed=failed, **run)
+        except (OSError, ValueError, struct.error) as e:
+            logging.error(f"Recording the run of endpoint ID: {endpoint_id} failed. Error Details : {str(e)}")
 
     def process_filters(self, data, last_sync):
         """
@@ -201,14 +511,12 @@ class SchedulerService(win32serviceutil.ServiceFramework):
         :param data: A list of dictionaries, where each dictionary represents a filter. Each dictionary
         has two keys: "column_name" and "column_value". "column_name" represents the name of the column
         to filter on, and "column_value" represents the value to filter by
-        :param last_sync: The last_sync parameter is a variable that represents the last synchronization
-        time. It is used to determine if a column value is empty or null. If last_sync is None or an
-        empty string, it is replaced with the current datetime
+        :param last_sync: The last_sync parameter is the timestamp of the last synchronization, it is
+        written in the format 'DD-MM-YYYY hh:mm:ss' in the empty column values. If last_sync is None, the
+        current datetime is used
         :return: the modified "data" list after processing the filters.
         """
-        if(isinstance(last_sync, str)):
-            if last_sync is None or last_sync == "" or str(last_sync).strip() == "":
-                    last_sync = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+        last_sync = format_timestamp(time.time() if last_sync is None else last_sync)
         for item in data:
             column_name = item.get("column_name")
             column_value = item.get("column_value")
@@ -220,7 +528,7 @@ class SchedulerService(win32serviceutil.ServiceFramework):
         
         return data
     
-    def make_request(self, app_data, endpoint_data):
+    def make_request(self, app_data, endpoint_data, run=None, endpoint_id=None):
         """
         The `make_request` function is used to build and send HTTP requests based on provided data and
         retrieve all the data from the response.
@@ -229,120 +537,121 @@ class SchedulerService(win32serviceutil.ServiceFramework):
         application. It includes the following keys:
         :param endpoint_data: The `endpoint_data` parameter is a dictionary that contains information
         about the specific endpoint to make a request to. It includes the following keys:
+        :param run: The `run` parameter is an optional dictionary in which the number of pages, the
+        response bytes, the last HTTP status and the number of retries are counted for the run history
+        :param endpoint_id: The `endpoint_id` parameter is the id of the endpoint. When it is given the
+        request spec, the endpoint merged with the defaults of the application, is taken from the cache
         :return: a list of all the data retrieved from the API endpoint.
         """
         # Build the request based on app_data and endpoint_data
         app_name = app_data["name"]    
         endpoint_name = endpoint_data["name"]
         
-        if isinstance(endpoint_data["payload"], str):
-            endpoint_data["payload"] = json.loads(endpoint_data["payload"])
-
-        if len(endpoint_data["payload"]) < 1:
-            if isinstance(app_data["default_payload"], str):
-                app_data["default_payload"] = json.loads(app_data["default_payload"])
-            endpoint_data["payload"] = app_data["default_payload"]
-
-        if isinstance(endpoint_data["filters"], str):
-            endpoint_data["filters"] = json.loads(endpoint_data["filters"])
-        
-        if len(endpoint_data["filters"]) < 1:
-            if isinstance(app_data["default_filters"], str):
-                app_data["default_filters"] = json.loads(app_data["default_filters"])
-            endpoint_data["filters"] = app_data["default_filters"]
-        
-        endpoint_data["filters"] = self.process_filters(endpoint_data["filters"], endpoint_data["last_sync"])
-        
-        if isinstance(endpoint_data["page_size"], str):
-            endpoint_data["page_size"] = int(endpoint_data["page_size"])
-       
-        if endpoint_data["page_size"] < 1:
-            if isinstance(app_data["default_page_size"], str):
-                app_data["default_page_size"] = int(app_data["default_page_size"])
-            endpoint_data["page_size"] = app_data["default_page_size"]
-        
-        if isinstance(app_data["auth_data"], str):
-            app_data["auth_data"] = json.loads(endpoint_data["auth_data"])
-
-        request_data = {
-            "filters": json.dumps(endpoint_data["filters"]),
-            "page_size": endpoint_data["page_size"],
-        }
-
-        for key, value in endpoint_data["payload"].items():
-            request_data[key] = value
+        # the endpoint merged with the defaults of the application, built once per version of both
+        if endpoint_id is None:
+            spec = RequestSpec(app_data, endpoint_data)
+        else:
+            spec = get_request_spec_cache().get(endpoint_data.get("app_id"), app_data, endpoint_id, endpoint_data)
+        request_data = spec.request_data(endpoint_data["last_sync"])
 
-        headers = {}
-        # Add additional payload and headers based on auth_type and auth_data
-        
-        if app_data.get("auth_type") == "BASIC":
-            credentials = f"{app_data.get('auth_data', {}).get('key', '')}:{app_data.get('auth_data', {}).get('key', 'secret')}"
-            # Encode the credentials in base64
-            credentials_encoded = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
-            # Create the header
-            auth_header = f"Basic {credentials_encoded}"
-            headers["Authorization"] = auth_header
-        elif app_data.get("auth_type") == "KEYCLOAK":
-            self._keycloak_client.set_auth_data(app_data.get("auth_data"))
+        # Add additional headers based on auth_type and auth_data
+        headers = dict(spec.headers)
+        if spec.auth_type == "KEYCLOAK":
+            self._keycloak_client.set_auth_data(spec.auth_data)
             
             token = self._keycloak_client.get_token()
             headers = {
                 'Authorization': f'Bearer {token}',
             }
 
-        else:
-            headers = {}
-
-        url = f"{app_data.get('url_scheme', 'https')}://{app_data.get('host', 'localhost')}/{endpoint_data.get('url_endpoint', 'data-export-generic-api')}"
-        method = endpoint_data.get("method", "POST")
+        url = spec.url
+        method = spec.method
+        # the sync requests are safe to repeat, POST included, and the waits asked by the source
+        # system with `Retry-After` are honoured
         retry_strategy = Retry(
             total=3,
             backoff_factor=1,
             status_forcelist=[429, 500, 502, 503, 504],
-            method_whitelist=["HEAD", "GET", "OPTIONS"]
+            allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # the pages requested at the same time share the connections of the session
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=max(10, self._page_parallelism))
         http = requests.Session()
         http.mount("https://", adapter)
         http.mount("http://", adapter)
-        page_number = 1
-        all_data = []
-        
-        while True:
-            request_data["page_number"] = page_number
+        limiter = get_host_limits().get(app_data)
+
+        def fetch_page(page_number):
+            # sends the request of a page, it can run on a worker of the page pool
+            page_request = dict(request_data, page_number=page_number)
+            limiter.wait_for_request()
 
             if method == "POST":
                 try:
-                    response = requests.post(url, headers=headers, json=request_data )
+                    response = http.post(url, headers=headers, json=page_request )
                 except Exception as e:
                     logging.error(f"POST request to {url} failed. Endpoint name: {endpoint_name} App Name :{app_name}. Error: {e}")
+                    raise
             else:
                 # Append the query parameters to the URL
+                page_url = url + "?" + urllib.parse.urlencode(page_request)
                 try:
-                    #url += "?" + "&".join([f"{key}={value}" for key, value in request_data.items()])
-                    url = url + "?" + urllib.parse.urlencode(request_data)
-                    response = requests.get(url, headers=headers)
+                    response = http.get(page_url, headers=headers)
                 except Exception as e:
-                    logging.error(f"GET request to {url} failed. Endpoint name: {endpoint_name} App Name :{app_name}. Error: {e}")
-                
-            if response.status_code == 200:
-                response_json = response.json()
-                total_records = response_json.get("total", 0)
-                current_page_data = response_json.get("data", [])
-                all_data.extend(current_page_data)
-                response_time = response_json.get("response_time", "")
-                if response_json:
-                    # @todo check if response_time is in valid format DD-MM-YYYY hh:mm:ss
-                    endpoint_data["last_sync"] = response_time
-
-                if len(all_data) < total_records:
-                    page_number += 1
+                    logging.error(f"GET request to {page_url} failed. Endpoint name: {endpoint_name} App Name :{app_name}. Error: {e}")
+                    raise
+            limiter.received(len(response.content))
+            return response
+
+        page_number = 1
+        all_data = []
+        response_time = ""
+        # responses of the pages left once the first page told the total, read in page order
+        following = None
+
+        try:
+            while True:
+                response = next(following, None) if following is not None else None
+                if response is None:
+                    # pages past the count, when records were added meanwhile, are requested one by one
+                    following = None
+                    response = fetch_page(page_number)
+
+                if run is not None:
+                    run["pages"] += 1
+                    run["response_bytes"] += len(response.content)
+                    run["http_status"] = response.status_code
+                    retries = getattr(response.raw, "retries", None)
+                    run["retries"] += len(retries.history) if retries is not None else 0
+
+                if response.status_code == 200:
+                    response_json = response.json()
+                    total_records = response_json.get("total", 0)
+                    current_page_data = response_json.get("data", [])
+                    all_data.extend(current_page_data)
+                    response_time = response_json.get("response_time", response_time)
+
+                    if len(all_data) < total_records:
+                        if page_number == 1 and self._page_parallelism > 1 and current_page_data:
+                            # the first page tells the number of pages left, they are requested at the same time
+                            pages = range(2, page_count(total_records, len(current_page_data)) + 1)
+                            following = fetch_in_order(fetch_page, pages, self._page_parallelism, self._page_pool.submit)
+                        page_number += 1
+                    else:
+                        break
                 else:
-                    break
-            else:
-                logging.error(f"Request to {url} failed with status code {response.status_code}. Endpoint name: {endpoint_name} App Name :{app_name}")
-                raise Exception(f"Request to {url} failed with status code {response.status_code}")
+                    logging.error(f"Request to {url} failed with status code {response.status_code}. Endpoint name: {endpoint_name} App Name :{app_name}")
+                    raise Exception(f"Request to {url} failed with status code {response.status_code}")
+        finally:
+            if following is not None:
+                # cancels the pages not requested yet
+                following.close()
         
+        if response_time:
+            # the time reported by the source system, in the format DD-MM-YYYY hh:mm:ss
+            endpoint_data["last_sync"] = to_timestamp(response_time)
         return all_data
 
     def save_response(self, app_data, endpoint_data, response, next_sync_datetime):
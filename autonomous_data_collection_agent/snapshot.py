@@ -0,0 +1,152 @@
+"""This module provides the binary snapshot storage engine of the Autonomous Data Collector Agent database.
+
+A snapshot holds the same document as a PysonDB JSON file (`version`, `keys` and `data`) in a compact
+binary encoding preceded by a header::
+
+    b'ADCASNAP' | format version (1 byte) | codec (1 byte) | payload
+
+The payload is encoded with msgpack when it is installed, or else with the standard library `marshal`
+module, so snapshots work without any extra dependency.
+"""
+
+import marshal
+import os
+
+from pysondb import errors as pysonErrors
+
+from autonomous_data_collection_agent.json_db import JOURNAL_FIELDS, JsonDB
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional
+    msgpack = None
+
+SNAPSHOT_MAGIC = b'ADCASNAP'
+SNAPSHOT_VERSION = 1
+
+CODEC_MSGPACK = 1
+CODEC_MARSHAL = 2
+
+_HEADER_SIZE = len(SNAPSHOT_MAGIC) + 2
+
+
+# The `SnapshotError` exception is raised when a file is not a snapshot this version can read.
+class SnapshotError(ValueError):
+    pass
+
+
+def default_codec() -> int:
+    """
+    The function `default_codec` returns the codec used to write new snapshots, msgpack when it is
+    installed and `marshal` otherwise.
+    :return: one of `CODEC_MSGPACK` or `CODEC_MARSHAL`.
+    """
+    return CODEC_MSGPACK if msgpack is not None else CODEC_MARSHAL
+
+
+def encode_snapshot(doc: dict, codec: int = None) -> bytes:
+    """
+    The function `encode_snapshot` encodes a PysonDB document as a snapshot.
+
+    :param doc: The `doc` parameter is the document with the `version`, `keys` and `data` keys
+    :type doc: dict
+    :param codec: The `codec` parameter is the codec of the payload, defaults to `default_codec()`
+    :type codec: int
+    :return: the snapshot as bytes.
+    """
+    codec = codec or default_codec()
+    document = {'version': doc['version'], 'keys': list(doc['keys']), 'data': dict(doc['data'])}
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise SnapshotError('msgpack is not installed')
+        payload = msgpack.packb(document, use_bin_type=True)
+    elif codec == CODEC_MARSHAL:
+        payload = marshal.dumps(document)
+    else:
+        raise SnapshotError(f'Unknown snapshot codec {codec}')
+    return SNAPSHOT_MAGIC + bytes((SNAPSHOT_VERSION, codec)) + payload
+
+
+def decode_snapshot(raw: bytes) -> dict:
+    """
+    The function `decode_snapshot` decodes a snapshot back to a PysonDB document.
+
+    :param raw: The `raw` parameter is the content of the snapshot file
+    :type raw: bytes
+    :return: the document with the `version`, `keys` and `data` keys.
+    """
+    if len(raw) < _HEADER_SIZE or not raw.startswith(SNAPSHOT_MAGIC):
+        raise SnapshotError('Not a database snapshot')
+    version, codec = raw[len(SNAPSHOT_MAGIC)], raw[len(SNAPSHOT_MAGIC) + 1]
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f'Unsupported snapshot version {version}')
+    try:
+        if codec == CODEC_MSGPACK:
+            if msgpack is None:
+                raise SnapshotError('The snapshot is encoded with msgpack, which is not installed')
+            doc = msgpack.unpackb(raw[_HEADER_SIZE:], raw=False)
+        elif codec == CODEC_MARSHAL:
+            doc = marshal.loads(raw[_HEADER_SIZE:])
+        else:
+            raise SnapshotError(f'Unknown snapshot codec {codec}')
+    except (EOFError, TypeError, ValueError) as error:
+        if isinstance(error, SnapshotError):
+            raise
+        raise SnapshotError(f'Corrupted snapshot: {error}') from error
+    if not isinstance(doc, dict) or not isinstance(doc.get('data'), dict):
+        raise pysonErrors.SchemaTypeError('"data" key in the DB must be of type dict')
+    return doc
+
+
+def write_snapshot(path: str, doc: dict, codec: int = None) -> None:
+    """
+    The function `write_snapshot` writes a PysonDB document to a snapshot file atomically.
+
+    :param path: The `path` parameter is the path of the snapshot file
+    :type path: str
+    :param doc: The `doc` parameter is the document with the `version`, `keys` and `data` keys
+    :type doc: dict
+    :param codec: The `codec` parameter is the codec of the payload, defaults to `default_codec()`
+    :type codec: int
+    """
+    raw = encode_snapshot(doc, codec)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> dict:
+    """
+    The function `read_snapshot` reads a snapshot file.
+
+    :param path: The `path` parameter is the path of the snapshot file
+    :type path: str
+    :return: the document with the `version`, `keys` and `data` keys.
+    """
+    with open(path, 'rb') as f:
+        return decode_snapshot(f.read())
+
+
+# The `SnapshotDB` class is a `JsonDB` storing its document in a binary snapshot file instead of a
+# pretty-printed JSON file. Caching, indexes, write-back, the sync state journal and transactions work
+# exactly as for `JsonDB`, only the encoding of the database file differs.
+class SnapshotDB(JsonDB):
+    def __init__(self, filename: str, journal_fields: tuple = JOURNAL_FIELDS) -> None:
+        """
+        The function initializes the engine and creates the snapshot file if it does not exist.
+
+        :param filename: The `filename` parameter is a string that represents the path to the snapshot
+        file
+        :type filename: str
+        :param journal_fields: The `journal_fields` parameter is the tuple of fields whose updates are
+        appended to the journal, an empty tuple disables the journal
+        :type journal_fields: tuple
+        """
+        super().__init__(filename, journal_fields=journal_fields)
+
+    def _load_file(self) -> dict:
+        return read_snapshot(self.filename)
+
+    def _dump_file(self, data: dict) -> None:
+        write_snapshot(self.filename, data)
@@ -0,0 +1,593 @@
+"""This module provides the SQLite (WAL) storage engine for the Autonomous Data Collector Agent database."""
+
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from pysondb import errors as pysonErrors
+
+from autonomous_data_collection_agent.file_lock import OwnRevisions
+from autonomous_data_collection_agent.indexes import COMPOSITE_INDEXES, COUNTERS, HOT_COLUMNS
+from autonomous_data_collection_agent.query import Query
+
+_COLUMN_NAME = re.compile(r'^\w+$')
+
+
+def _column_expr(column: str) -> str:
+    """
+    The function `_column_expr` returns the SQL expression reading a column out of the JSON record.
+
+    :param column: The `column` parameter is the name of the column
+    :type column: str
+    :return: the SQL expression as a string.
+    """
+    if not _COLUMN_NAME.match(column):
+        raise ValueError(f'Invalid column name {column!r}')
+    return f"json_extract(data, '$.{column}')"
+
+def _decode_field(value, json_type: str):
+    # rebuild the Python value of a field read with json_extract() and json_type()
+    if json_type in ('true', 'false'):
+        return json_type == 'true'
+    if json_type in ('object', 'array'):
+        return json.loads(value)
+    return value
+
+# The `SQLiteDB` class stores records in an SQLite database running in WAL mode. It exposes the same
+# methods as `PysonDB` so `DatabaseHandler` can use either engine interchangeably, but every mutation
+# only touches the affected rows instead of re-serializing the whole database file.
+class SQLiteDB:
+    def __init__(self, filename: str) -> None:
+        """
+        The function opens (or creates) the SQLite database file, switches it to WAL mode and makes
+        sure the record and meta tables exist.
+
+        :param filename: The `filename` parameter is a string that represents the path to the SQLite
+        database file
+        :type filename: str
+        """
+        self.filename = filename
+        self.lock = threading.RLock()
+        self._txn_depth = 0
+        # revisions written by this object, recorded once committed, and the ones of the open transaction
+        self._own_revisions = OwnRevisions()
+        self._txn_revisions = []
+        self._conn = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS records (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        for columns in [(column,) for column in HOT_COLUMNS] + [tuple(c) for c in COMPOSITE_INDEXES]:
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{'_'.join(columns)} ON records ({', '.join(_column_expr(c) for c in columns)})"
+            )
+
+    def _gen_id(self) -> str:
+        # generates a random 18 digit uuid, same as PysonDB
+        return str(int(uuid.uuid4()))[:18]
+
+    @contextmanager
+    def _write(self):
+        """
+        The function `_write` runs the enclosed statements inside a single immediate transaction and
+        rolls it back if anything fails. Inside a transaction started with `begin()` a savepoint is used
+        instead, so a failed operation does not leave half of its changes behind.
+        """
+        with self.lock:
+            if self._txn_depth:
+                self._conn.execute("SAVEPOINT operation")
+                try:
+                    revision = self._bump_revision()
+                    yield self._conn
+                except BaseException:
+                    self._conn.execute("ROLLBACK TO operation")
+                    self._conn.execute("RELEASE operation")
+                    raise
+                else:
+                    self._conn.execute("RELEASE operation")
+                    self._txn_revisions.append(revision)
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                revision = self._bump_revision()
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+                self._own_revisions.add(revision)
+
+    def _bump_revision(self) -> int:
+        # SQLite already serializes writers across processes, the revision only tells them apart
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('revision', '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0])
+
+    def wrote_revisions(self, since: int, until: int) -> bool:
+        """
+        The function `wrote_revisions` tells whether the store moved from revision `since` to `until`
+        by its own committed writes only, see `OwnRevisions.covers()`.
+        """
+        return self._own_revisions.covers(since, until)
+
+    def revision(self) -> int:
+        """
+        The function `revision` returns the revision of the store, a number increased by every write of
+        any process.
+        """
+        with self.lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+            return int(row[0]) if row else 0
+
+    def _get_keys(self) -> list:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'keys'").fetchone()
+        return json.loads(row[0]) if row else []
+
+    def _set_keys(self, keys: list) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('keys', ?)", (json.dumps(sorted(keys)),))
+
+    def _check_new_keys(self, data: dict) -> None:
+        keys = self._get_keys()
+        if len(keys) == 0:
+            self._set_keys(list(data.keys()))
+        elif not sorted(keys) == sorted(data.keys()):
+            raise pysonErrors.UnknownKeyError(
+                f'Unrecognized / missing key(s) {set(keys) ^ set(data.keys())}'
+                '(Either the key(s) does not exists in the DB or is missing in the given data)'
+            )
+
+    def _check_update_keys(self, new_data: dict) -> None:
+        keys = self._get_keys()
+        if not all(i in keys for i in new_data):
+            raise pysonErrors.UnknownKeyError(f'Unrecognized key(s) {[i for i in new_data if i not in keys]}')
+
+    def _rows(self):
+        for record_id, data in self._conn.execute("SELECT id, data FROM records"):
+            yield record_id, json.loads(data)
+
+    def _match_query(self, query):
+        """
+        The function `_match_query` yields the ids and records matching `query`. A `Query` is pushed
+        down to SQL so the expression indexes can be used, and the decoded records are checked again
+        with the compiled predicate. A plain callable is checked against every record. Must be called
+        with the lock held.
+
+        :param query: The `query` parameter is a `Query` or a callable that takes a record and returns
+        a boolean
+        """
+        if not callable(query):
+            raise TypeError(f'"query" must be a callable and not {type(query)!r}')
+        sql, params = "SELECT id, data FROM records", []
+        if isinstance(query, Query):
+            where = query.to_sql(_column_expr)
+            if where is not None:
+                sql, params = f"{sql} WHERE {where[0]}", where[1]
+        for record_id, data in self._conn.execute(sql, params).fetchall():
+            values = json.loads(data)
+            if query(values):
+                yield record_id, values
+
+    def add(self, data: dict) -> str:
+        """
+        The function `add` inserts a single record and returns its generated id.
+
+        :param data: The `data` parameter is a dictionary that represents the record to be added
+        :type data: dict
+        :return: the id of the new record as a string.
+        """
+        if not isinstance(data, dict):
+            raise TypeError(f'data must be of type dict and not {type(data)}')
+        with self._write() as conn:
+            self._check_new_keys(data)
+            _id = self._gen_id()
+            conn.execute("INSERT INTO records (id, data) VALUES (?, ?)", (_id, json.dumps(data)))
+            return _id
+
+    def add_many(self, data: list, json_response: bool = False):
+        """
+        The function `add_many` inserts a list of records inside one transaction.
+
+        :param data: The `data` parameter is a list of dictionaries, each representing a record
+        :type data: list
+        :param json_response: When `True` the new records are returned keyed by their ids
+        :type json_response: bool
+        :return: a dictionary of the new records keyed by id if `json_response` is `True`, else `None`.
+        """
+        if not data:
+            return None
+        if not isinstance(data, list):
+            raise TypeError(f'data must be of type "list" and not {type(data)}')
+        if not all(isinstance(i, dict) for i in data):
+            raise TypeError('all the new data in the data list must of type dict')
+
+        new_data = {}
+        with self._write() as conn:
+            for d in data:
+                self._check_new_keys(d)
+            rows = []
+            for d in data:
+                _id = self._gen_id()
+                rows.append((_id, json.dumps(d)))
+                if json_response:
+                    new_data[_id] = d
+            conn.executemany("INSERT INTO records (id, data) VALUES (?, ?)", rows)
+        return new_data if json_response else None
+
+    def import_records(self, records: dict) -> None:
+        """
+        The function `import_records` replaces the content of the database with the given records,
+        keeping their existing ids. It is used when migrating from another storage engine.
+
+        :param records: The `records` parameter is a dictionary of records keyed by their ids
+        :type records: dict
+        """
+        with self._write() as conn:
+            conn.execute("DELETE FROM records")
+            keys = sorted(next(iter(records.values())).keys()) if records else []
+            self._set_keys(keys)
+            conn.executemany("INSERT INTO records (id, data) VALUES (?, ?)", [(str(k), json.dumps(v)) for k, v in records.items()])
+
+    def get_all_select_keys(self, keys: list) -> dict:
+        """
+        The function `get_all_select_keys` returns every record reduced to the given keys.
+
+        :param keys: The `keys` parameter is the list of keys to keep in each record
+        :type keys: list
+        :return: a dictionary of partial records keyed by id.
+        """
+        with self.lock:
+            existing_keys = self._get_keys()
+            if not set(keys).issubset(existing_keys):
+                raise pysonErrors.UnknownKeyError(
+                    f'Unrecognized key(s) {set(keys) ^ set(existing_keys)}'
+                    '(Unable to find the key(s) in the DB)'
+                )
+            return {k: {i: v[i] for i in keys} for k, v in self._rows()}
+
+    def get_all(self) -> dict:
+        """
+        The function `get_all` returns every record keyed by id.
+        :return: a dictionary of records keyed by id.
+        """
+        with self.lock:
+            return dict(self._rows())
+
+    def get_by_id(self, id: str) -> dict:
+        """
+        The function `get_by_id` returns the record with the given id.
+
+        :param id: The `id` parameter is the id of the record to retrieve
+        :type id: str
+        :return: the record as a dictionary.
+        """
+        if not isinstance(id, str):
+            raise TypeError(f'id must be of type "str" and not {type(id)}')
+        with self.lock:
+            row = self._conn.execute("SELECT data FROM records WHERE id = ?", (id,)).fetchone()
+        if row is None:
+            raise pysonErrors.IdDoesNotExistError(f'{id!r} does not exists in the DB')
+        return json.loads(row[0])
+
+    def get_by_columns(self, values: dict) -> dict:
+        """
+        The function `get_by_columns` returns every record whose columns equal the given values. The
+        lookup is answered by the expression indexes on the hot columns.
+
+        :param values: The `values` parameter is a dictionary of column names and values to match
+        :type values: dict
+        :return: a dictionary of matching records keyed by id.
+        """
+        where, params, _ = self._columns_where(values)
+        sql = "SELECT id, data FROM records" + where
+        with self.lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # json_extract() turns booleans into integers, so double check the decoded values
+        result = {}
+        for record_id, data in rows:
+            record = json.loads(data)
+            if all(record.get(column) == value for column, value in values.items()):
+                result[record_id] = record
+        return result
+
+    def _columns_where(self, values: dict):
+        """
+        The function `_columns_where` translates column values to match into an SQL `WHERE` clause.
+
+        :param values: The `values` parameter is a dictionary of column names and values to match
+        :type values: dict
+        :return: a tuple `(sql, params, exact)`, where `exact` tells whether the SQL condition alone is
+        enough or the decoded records must be checked again in Python.
+        """
+        clauses = []
+        params = []
+        exact = True
+        for column, value in values.items():
+            if value is None:
+                clauses.append(f"{_column_expr(column)} IS NULL")
+            elif isinstance(value, (dict, list)):
+                # nested values are compared in Python
+                exact = False
+            else:
+                # json_extract() turns booleans into integers
+                exact = exact and not isinstance(value, bool)
+                clauses.append(f"{_column_expr(column)} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params, exact
+
+    def get_fields(self, fields: list, query=None, values: dict = None) -> dict:
+        """
+        The function `get_fields` returns only the given fields of every record, or of the records
+        matching `query` or `values`. Without a query the fields are extracted by SQLite, so the other
+        fields are never decoded. A missing field is `None`.
+
+        :param fields: The `fields` parameter is the list of fields to return, an empty list returns the
+        matching ids only
+        :type fields: list
+        :param query: The `query` parameter is an optional `Query` or callable to filter the records
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: a dictionary of partial records keyed by id.
+        """
+        if query is not None:
+            with self.lock:
+                return {record_id: {field: record.get(field) for field in fields} for record_id, record in self._match_query(query)}
+        where, params, exact = self._columns_where(values or {})
+        if not exact:
+            records = self.get_by_columns(values)
+            return {record_id: {field: record.get(field) for field in fields} for record_id, record in records.items()}
+        # json_type() tells booleans, objects and arrays apart, which json_extract() flattens
+        selected = ", ".join(f"json_extract(data, '$.{field}'), json_type(data, '$.{field}')" for field in fields if _column_expr(field))
+        sql = f"SELECT id{', ' + selected if selected else ''} FROM records{where}"
+        with self.lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return {row[0]: {field: _decode_field(row[1 + 2 * i], row[2 + 2 * i]) for i, field in enumerate(fields)} for row in rows}
+
+    def get_records(self, factory, query=None, values: dict = None) -> dict:
+        """
+        The function `get_records` builds an object from every record, or from the records matching
+        `query` or `values`.
+
+        :param factory: The `factory` parameter is a callable taking the id and the record and returning
+        the object
+        :param query: The `query` parameter is an optional `Query` or callable to filter the records
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: a dictionary of the built objects keyed by id.
+        """
+        if query is not None:
+            with self.lock:
+                return {record_id: factory(record_id, record) for record_id, record in self._match_query(query)}
+        if values is not None:
+            records = self.get_by_columns(values)
+        else:
+            records = self.get_all()
+        return {record_id: factory(record_id, record) for record_id, record in records.items()}
+
+    def count(self, query=None, values: dict = None) -> int:
+        """
+        The function `count` returns the number of records, or of the records matching `query` or
+        `values`, counted by SQLite when no Python check is needed.
+
+        :param query: The `query` parameter is an optional `Query` or callable to filter the records
+        :param values: The `values` parameter is an optional dictionary of column names and values to
+        match
+        :type values: dict
+        :return: the number of records.
+        """
+        if query is not None:
+            with self.lock:
+                return sum(1 for _ in self._match_query(query))
+        where, params, exact = self._columns_where(values or {})
+        if not exact:
+            return len(self.get_by_columns(values))
+        with self.lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM records{where}", params).fetchone()[0]
+
+    def group_counts(self, group_column: str, group_value) -> dict:
+        """
+        The function `group_counts` returns the number of records of a group for each combination of the
+        counted columns, grouped by SQLite on the composite index.
+
+        :param group_column: The `group_column` parameter is the column the records are grouped by, for
+        example `'app_id'`
+        :type group_column: str
+        :param group_value: The `group_value` parameter is the value of the group column
+        :return: a dictionary keyed by tuples of values of the counted columns.
+        """
+        counted = dict(COUNTERS).get(group_column)
+        if counted is None:
+            raise ValueError(f'The column {group_column!r} has no counter')
+        columns = ', '.join(_column_expr(column) for column in counted)
+        sql = f"SELECT {columns}, COUNT(*) FROM records WHERE {_column_expr(group_column)} = ? GROUP BY {columns}"
+        with self.lock:
+            rows = self._conn.execute(sql, [group_value]).fetchall()
+        return {tuple(row[:-1]): row[-1] for row in rows}
+
+    def get_by_query(self, query) -> dict:
+        """
+        The function `get_by_query` returns every record matching the `query`.
+
+        :param query: The `query` parameter is a `Query` or a callable that takes a record and returns
+        a boolean
+        :return: a dictionary of matching records keyed by id.
+        """
+        with self.lock:
+            return dict(self._match_query(query))
+
+    def update_by_id(self, id: str, new_data: dict) -> dict:
+        """
+        The function `update_by_id` merges `new_data` into the record with the given id.
+
+        :param id: The `id` parameter is the id of the record to update
+        :type id: str
+        :param new_data: The `new_data` parameter is a dictionary of the values to change
+        :type new_data: dict
+        :return: the updated record.
+        """
+        if not isinstance(new_data, dict):
+            raise TypeError(f'new_data must be of type dict and not {type(new_data)!r}')
+        with self._write() as conn:
+            self._check_update_keys(new_data)
+            row = conn.execute("SELECT data FROM records WHERE id = ?", (id,)).fetchone()
+            if row is None:
+                raise pysonErrors.IdDoesNotExistError(f'The id {id!r} does noe exists in the DB')
+            record = {**json.loads(row[0]), **new_data}
+            conn.execute("UPDATE records SET data = ? WHERE id = ?", (json.dumps(record), id))
+            return record
+
+    def update_by_query(self, query, new_data: dict) -> list:
+        """
+        The function `update_by_query` merges `new_data` into every record matching the `query`.
+
+        :param query: The `query` parameter is a `Query` or a callable that takes a record and returns
+        a boolean
+        :param new_data: The `new_data` parameter is a dictionary of the values to change
+        :type new_data: dict
+        :return: the list of updated ids.
+        """
+        if not isinstance(new_data, dict):
+            raise TypeError(f'"new_data" must be of type dict and not f{type(new_data)!r}')
+        with self._write() as conn:
+            self._check_update_keys(new_data)
+            updated = [(json.dumps({**values, **new_data}), record_id) for record_id, values in self._match_query(query)]
+            conn.executemany("UPDATE records SET data = ? WHERE id = ?", updated)
+            return [record_id for _, record_id in updated]
+
+    def delete_by_id(self, id: str) -> None:
+        """
+        The function `delete_by_id` removes the record with the given id.
+
+        :param id: The `id` parameter is the id of the record to remove
+        :type id: str
+        """
+        with self._write() as conn:
+            cursor = conn.execute("DELETE FROM records WHERE id = ?", (str(id),))
+            if cursor.rowcount == 0:
+                raise pysonErrors.IdDoesNotExistError(f'ID {id} does not exists in the DB')
+
+    def delete_by_query(self, query) -> list:
+        """
+        The function `delete_by_query` removes every record matching the `query`.
+
+        :param query: The `query` parameter is a `Query` or a callable that takes a record and returns
+        a boolean
+        :return: the list of deleted ids.
+        """
+        with self._write() as conn:
+            ids_to_delete = [record_id for record_id, _ in self._match_query(query)]
+            conn.executemany("DELETE FROM records WHERE id = ?", [(i,) for i in ids_to_delete])
+            return ids_to_delete
+
+    def add_fields(self, defaults: dict) -> list:
+        """
+        The function `add_fields` adds fields to the schema of a database written by an older version,
+        the records get the default values. A database without any record is not changed, its keys are
+        set by its first record.
+
+        :param defaults: The `defaults` parameter maps the fields to add to their default values
+        :type defaults: dict
+        :return: the list of the updated ids.
+        """
+        with self.lock:
+            keys = self._get_keys()
+            if not keys or defaults.keys() <= set(keys):
+                return []
+        with self._write() as conn:
+            keys = self._get_keys()
+            missing = {k: v for k, v in defaults.items() if k not in keys}
+            if not keys or not missing:
+                return []
+            self._set_keys(keys + list(missing))
+            updated = [
+                (json.dumps({**{k: v for k, v in missing.items() if k not in values}, **values}), record_id)
+                for record_id, values in self._rows() if not missing.keys() <= values.keys()
+            ]
+            conn.executemany("UPDATE records SET data = ? WHERE id = ?", updated)
+            return [record_id for _, record_id in updated]
+
+    def purge(self) -> None:
+        """
+        The function `purge` removes every record and the stored key schema.
+        """
+        with self._write() as conn:
+            conn.execute("DELETE FROM records")
+            conn.execute("DELETE FROM meta WHERE key = 'keys'")
+
+    def begin(self) -> None:
+        """
+        The function `begin` starts an immediate transaction and keeps the lock until `commit()` or
+        `rollback()`. A transaction started while another one is active joins it, and only the outermost
+        one commits or rolls back.
+        """
+        self.lock.acquire()
+        if self._txn_depth == 0:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except BaseException:
+                self.lock.release()
+                raise
+        self._txn_depth += 1
+
+    def commit(self) -> None:
+        """
+        The function `commit` commits the transaction, or rolls it back when the commit fails.
+        """
+        try:
+            self._txn_depth -= 1
+            if self._txn_depth == 0:
+                revisions, self._txn_revisions = self._txn_revisions, []
+                try:
+                    self._conn.execute("COMMIT")
+                except sqlite3.Error:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                    raise
+                for revision in revisions:
+                    self._own_revisions.add(revision)
+        finally:
+            self.lock.release()
+
+    def rollback(self) -> None:
+        """
+        The function `rollback` drops the changes of the transaction.
+        """
+        try:
+            self._txn_depth -= 1
+            if self._txn_depth == 0:
+                self._txn_revisions = []
+                self._conn.execute("ROLLBACK")
+        finally:
+            self.lock.release()
+
+    def set_write_back(self, enabled: bool, flush_operations: int = 0, flush_interval: float = 0.0) -> None:
+        """
+        The function `set_write_back` exists for compatibility with `JsonDB`. Every SQLite mutation
+        already writes only the rows it touches, so there is nothing to batch.
+        """
+
+    def flush(self) -> None:
+        """
+        The function `flush` exists for compatibility with `JsonDB`, SQLite commits every mutation.
+        """
+
+    def compact(self) -> None:
+        """
+        The function `compact` checkpoints the write-ahead log into the database file and truncates it.
+        """
+        with self.lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        """
+        The function `close` closes the underlying SQLite connection.
+        """
+        with self.lock:
+            self._conn.close()
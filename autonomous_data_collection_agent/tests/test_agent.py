@@ -1,12 +1,35 @@
+import asyncio
+import functools
+import json
 import os
 import pytest
+import threading
+import time
+import tracemalloc
 from typer.testing import CliRunner
 from autonomous_data_collection_agent import (
+    SUCCESS,
     __app_name__,
     __version__,
     cli,
-    autonomousagent
+    app_resolver,
+    autonomousagent,
+    bulk_io,
+    config,
+    database
 )
+from autonomous_data_collection_agent.query import where
+from autonomous_data_collection_agent.request_spec import ENDPOINT_SPEC_FIELDS, get_request_spec_cache
+from autonomous_data_collection_agent.run_history import RUN_STRUCT, RunHistory, compute_stats, get_history_path
+from autonomous_data_collection_agent.app_resolver import get_app_resolver
+from autonomous_data_collection_agent.async_fetch import AsyncFetcher
+from autonomous_data_collection_agent.due_queue import DueQueue
+from autonomous_data_collection_agent.events import ADDED, CHANGED, REMOVED, UPDATED, DatabaseWatcher, get_event_bus
+from autonomous_data_collection_agent.json_db import JsonDB
+from autonomous_data_collection_agent.normalize import format_timestamp, is_normalized
+from autonomous_data_collection_agent.paging import fetch_in_order, page_count
+from autonomous_data_collection_agent.rate_limit import LIMIT_FIELDS, HostLimiter, TokenBucket, parse_retry_after
+from autonomous_data_collection_agent.worker_pool import WorkerPool
 
 # Create a Pytest fixture to set up a CliRunner
 # @pytest.fixture
@@ -222,6 +245,24 @@ def test_generate_fake():
     assert result.exit_code == 0
     assert "Random Application Data and endpoint data generated successfully!" in result.output
 
+def test_migrate_storage_sqlite():
+    """
+    The function `test_migrate_storage_sqlite` tests migrating the PysonDB JSON databases to the SQLite
+    storage engine. The tests that follow run against the SQLite databases.
+    """
+    result = runner.invoke(cli.app, ["migrate-storage", "--storage-engine", "sqlite", "--force"])
+    assert result.exit_code == 0
+    assert "Storage engine is set to sqlite." in result.output
+
+def test_list_endpoints_sqlite():
+    """
+    The function `test_list_endpoints_sqlite` tests that the migrated endpoints are listed from the
+    SQLite database.
+    """
+    result = runner.invoke(cli.app, ["list-endpoints"])
+    assert result.exit_code == 0
+    assert "Endpoint List" in result.output
+
 # def test_fake_server():
 #     result = runner.invoke(cli.app, "run-fake-server")
 #     assert result.exit_code == 0
@@ -372,6 +413,1032 @@ def test_clear_apps():
     assert result.exit_code == 0
     assert "All applications were removed" in result.output
 
+def test_migrate_storage_json():
+    """
+    The function `test_migrate_storage_json` tests migrating the SQLite databases back to the PysonDB
+    JSON storage engine.
+    """
+    result = runner.invoke(cli.app, ["migrate-storage", "--storage-engine", "json", "--force"])
+    assert result.exit_code == 0
+    assert "Storage engine is set to json." in result.output
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_query(tmp_path, engine):
+    """
+    The function `test_query` checks that a `where()` query selects, updates and deletes the same
+    records as the equivalent lambda on both storage engines.
+    """
+    db_path = str(tmp_path / f"endpoints{database.STORAGE_ENGINES[engine]}")
+    assert database.init_database(db_path, engine) == 0
+    handler = database.DatabaseHandler(db_path, engine)
+    handler.write_items([
+        {"app_id": app_id, "status": status, "process_status": process_status}
+        for app_id in ("a", "b") for status in (0, 1) for process_status in (0, 1, 2)
+    ])
+    query = (where("app_id") == "a") & (where("status") == 1) & (where("process_status") < 2)
+    expected = handler.get_by_query(lambda x: x["app_id"] == "a" and x["status"] == 1 and x["process_status"] < 2).item_list
+    assert handler.get_by_query(query).item_list == expected
+    assert len(expected) == 2
+    assert len(handler.get_by_query((where("status") == 0) | where("process_status").one_of([2])).item_list) == 8
+    assert len(handler.update_by_query(query, {"process_status": 2}).item_list) == 2
+    assert handler.get_by_query(query).item_list == {}
+    assert len(handler.delete_by_query(where("app_id") != "a").item_list) == 6
+
+def test_query_none_values(tmp_path):
+    """
+    The function `test_query_none_values` checks that a query for `None` on an indexed field selects the
+    same records as a full scan, the records without the field included.
+    """
+    db_path = tmp_path / "endpoints.json"
+    db_path.write_text(json.dumps({"version": 2, "keys": ["name", "status"], "data": {
+        "1": {"name": "a", "status": 1}, "2": {"name": "b", "status": None}, "3": {"name": "c"},
+    }}))
+    db = JsonDB(str(db_path))
+    assert db.indexes.is_indexed("status")
+    for query in [
+        where("status") == None,
+        where("status").one_of([None, 1]),
+        (where("status") == None) & (where("name") == "c"),
+    ]:
+        assert db.get_by_query(query) == db.get_by_query(lambda record: query(record))
+    assert sorted(db.get_by_query(where("status") == None)) == ["2", "3"]
+    assert sorted(db.get_by_columns({"status": None})) == ["2", "3"]
+    assert list(db.get_by_columns({"status": None, "name": "c"})) == ["3"]
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_projection(tmp_path, engine):
+    """
+    The function `test_projection` checks that projection reads return only the requested fields and
+    that counts match the number of matching records on both storage engines.
+    """
+    db_path = str(tmp_path / f"endpoints{database.STORAGE_ENGINES[engine]}")
+    assert database.init_database(db_path, engine) == 0
+    handler = database.DatabaseHandler(db_path, engine)
+    records = handler.write_items([
+        {"app_id": app_id, "status": status, "payload": {"size": status}, "enabled": status == 1}
+        for app_id in ("a", "b") for status in (0, 1, 1)
+    ]).item_list
+    expected = {record_id: {"status": record["status"], "payload": record["payload"], "enabled": record["enabled"]} for record_id, record in records.items()}
+    assert handler.get_fields(["status", "payload", "enabled"]).item_list == expected
+    assert handler.get_fields(["status", "missing"], values={"app_id": "a", "status": 1}).item_list == {
+        record_id: {"status": 1, "missing": None} for record_id, record in records.items() if record["app_id"] == "a" and record["status"] == 1
+    }
+    assert set(handler.get_fields([], query_str=where("app_id") == "b").item_list) == {record_id for record_id, record in records.items() if record["app_id"] == "b"}
+    assert handler.count().item_list == [6]
+    assert handler.count(values={"app_id": "a", "status": 1}).item_list == [2]
+    assert handler.count(values={"enabled": True}).item_list == [4]
+    assert handler.count(query_str=where("status") < 1).item_list == [2]
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_status_counts(tmp_path, engine):
+    """
+    The function `test_status_counts` checks that the per application status counters follow adds,
+    updates, deletes and rolled back transactions on both storage engines.
+    """
+    db_path = str(tmp_path / f"endpoints{database.STORAGE_ENGINES[engine]}")
+    database.init_database(db_path, engine)
+    handler = database.DatabaseHandler(db_path, engine)
+    records = handler.write_items([
+        {"app_id": app_id, "status": 1, "process_status": process_status}
+        for app_id in ("a", "b") for process_status in (0, 1, 2)
+    ]).item_list
+    assert handler.group_counts("app_id", "a").item_list == [{(1, 0): 1, (1, 1): 1, (1, 2): 1}]
+    handler.update_by_query(where("app_id") == "a", {"process_status": 2})
+    first = next(record_id for record_id, record in records.items() if record["app_id"] == "b")
+    handler.update_by_id(first, {"status": 0})
+    handler.delete_by_query((where("app_id") == "b") & (where("process_status") == 2))
+    with pytest.raises(RuntimeError):
+        with handler.transaction():
+            handler.update_by_query(where("app_id") == "a", {"status": 0})
+            raise RuntimeError("step failed")
+    assert handler.group_counts("app_id", "a").item_list == [{(1, 2): 3}]
+    assert handler.group_counts("app_id", "b").item_list == [{(0, 0): 1, (1, 1): 1}]
+    assert handler.group_counts("app_id", "c").item_list == [{}]
+    assert handler.count(values={"app_id": "b", "status": 1}).item_list == [1]
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_transaction(tmp_path, engine):
+    """
+    The function `test_transaction` checks that a transaction spanning the application and endpoint
+    databases commits every change together and rolls every change back when it fails.
+    """
+    db_paths = [str(tmp_path / f"{name}{database.STORAGE_ENGINES[engine]}") for name in ("apps", "endpoints")]
+    for db_path in db_paths:
+        database.init_database(db_path, engine)
+    apps, endpoints = [database.DatabaseHandler(db_path, engine) for db_path in db_paths]
+    app_id = next(iter(apps.write_items([{"short_name": "app", "process_status": 1}]).item_list))
+    endpoints.write_items([{"app_id": app_id, "process_status": 2}, {"app_id": app_id, "process_status": 2}])
+
+    with pytest.raises(RuntimeError):
+        with endpoints.transaction(apps):
+            endpoints.update_by_query(where("app_id") == app_id, {"process_status": 0})
+            apps.update_by_id(app_id, {"process_status": 0})
+            raise RuntimeError("step failed")
+    assert len(endpoints.get_by_column("process_status", 2).item_list) == 2
+    assert apps.get_by_id(app_id).item_list[0]["process_status"] == 1
+
+    with endpoints.transaction(apps):
+        endpoints.update_by_query(where("app_id") == app_id, {"process_status": 0})
+        apps.update_by_id(app_id, {"process_status": 0})
+    apps, endpoints = [database.DatabaseHandler(db_path, engine) for db_path in db_paths]
+    assert len(endpoints.get_by_column("process_status", 0).item_list) == 2
+    assert apps.get_by_id(app_id).item_list[0]["process_status"] == 0
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_host_limit_fields_migration(tmp_path, monkeypatch, engine):
+    """
+    The function `test_host_limit_fields_migration` checks that an applications database written before
+    the host limits existed gets them, so applications can be added and their limits updated.
+    """
+    monkeypatch.setattr(database, "get_storage_engine", lambda config_file: engine)
+    db_path = str(tmp_path / f"apps{database.STORAGE_ENGINES[engine]}")
+    # the names of the applications are resolved from the application database of the config file
+    monkeypatch.setattr(app_resolver, "get_database_path", lambda config_file, item_type: db_path)
+    database.init_database(db_path, engine)
+    old_app = {field: default for field, default in bulk_io.APP_FIELDS.items() if field not in LIMIT_FIELDS}
+    old_app.update(name="Old App", short_name="oldapp", host="old.example.com", dump_path=str(tmp_path / "old"))
+    old_id = next(iter(database.get_database_handler(db_path).write_items([old_app]).item_list))
+
+    applications = autonomousagent.Applications(db_path)
+    assert applications.get_app_by_id(old_id).application.items() >= LIMIT_FIELDS.items()
+    added = applications.add("New App", "newapp", "new.example.com", "https", "NONE", {}, str(tmp_path / "new"), "0 23 * * *", None, None, {}, [], 100, 0, 1, max_connections=2)
+    assert added.error == SUCCESS
+    assert applications.update_app(old_id, {"max_connections": 4}).error == SUCCESS
+    assert applications.get_app_by_id(old_id).application["max_connections"] == 4
+    get_app_resolver().invalidate()
+
+def test_database_handler_registry(tmp_path):
+    """
+    The function `test_database_handler_registry` checks that handlers are shared per database file and
+    that a removed database file is opened again.
+    """
+    db_path = str(tmp_path / "endpoints.sqlite3")
+    database.init_database(db_path, "sqlite")
+    handler = database.get_database_handler(db_path, "sqlite")
+    assert database.get_database_handler(str(tmp_path / "." / "endpoints.sqlite3"), "sqlite") is handler
+    assert database.DatabaseHandler(db_path, "sqlite")._db is handler._db
+    handler.add_item({"name": "first"})
+
+    os.remove(db_path)
+    database.init_database(db_path, "sqlite")
+    reopened = database.get_database_handler(db_path, "sqlite")
+    assert reopened is not handler
+    assert reopened.read_items().item_list == {}
+
+def test_write_back(tmp_path):
+    """
+    The function `test_write_back` checks that handlers created inside a `write_back()` block share
+    their pending changes and only write the database file when it is flushed.
+    """
+    db_path = str(tmp_path / "endpoints.json")
+    database.init_database(db_path)
+
+    def _stored_count():
+        with open(db_path) as file:
+            return len(json.load(file)["data"])
+
+    with database.write_back(flush_operations=3):
+        database.DatabaseHandler(db_path, "json").add_item({"name": "first", "status": 1})
+        database.DatabaseHandler(db_path, "json").add_item({"name": "second", "status": 1})
+        assert _stored_count() == 0
+        assert len(database.DatabaseHandler(db_path, "json").get_by_column("status", 1).item_list) == 2
+        database.DatabaseHandler(db_path, "json").update_by_query(where("name") == "first", {"status": 0})
+        assert _stored_count() == 2
+        database.DatabaseHandler(db_path, "json").delete_by_query(where("status") == 0)
+        assert _stored_count() == 2
+    assert _stored_count() == 1
+
+def test_sync_state_journal(tmp_path):
+    """
+    The function `test_sync_state_journal` checks that sync state updates are appended to the journal
+    without rewriting the database file, are replayed on load and are folded back by compaction.
+    """
+    db_path = str(tmp_path / "endpoints.json")
+    database.init_database(db_path)
+    handler = database.DatabaseHandler(db_path, "json")
+    endpoint_id = next(iter(handler.write_items([{"name": "first", "process_status": 0, "failed_count": 0}]).item_list))
+    with open(db_path) as file:
+        stored = file.read()
+
+    handler.update_by_id(endpoint_id, {"name": "first", "process_status": 1, "failed_count": 2})
+    with open(db_path) as file:
+        assert file.read() == stored
+    assert os.path.isfile(db_path + ".journal")
+    reloaded = database.DatabaseHandler(db_path, "json")
+    assert reloaded.get_by_id(endpoint_id).item_list[0]["process_status"] == 1
+
+    assert reloaded.compact().error == 0
+    assert not os.path.isfile(db_path + ".journal")
+    with open(db_path) as file:
+        assert json.load(file)["data"][endpoint_id]["failed_count"] == 2
+
+def test_set_write_back():
+    """
+    The function `test_set_write_back` tests enabling and disabling write-back with the
+    `set-write-back` command.
+    """
+    result = runner.invoke(cli.app, ["set-write-back", "-e", "True", "--flush-operations", "50"])
+    assert result.exit_code == 0
+    assert "Write-back is set to enabled." in result.output
+    result = runner.invoke(cli.app, ["set-write-back", "-e", "False"])
+    assert result.exit_code == 0
+    assert "Write-back is set to disabled." in result.output
+
+def test_lazy_load(tmp_path):
+    """
+    The function `test_lazy_load` checks that a lazily loaded JSON database reads, queries and updates
+    records like a fully loaded one, keeps the PysonDB file format and reuses its offset index.
+    """
+    db_path = str(tmp_path / "endpoints.json")
+    database.init_database(db_path)
+    eager = JsonDB(db_path)
+    eager.add_many([{"app_id": f"app{i % 3}", "name": f"end point \u00e9 {i}", "status": i % 2, "tags": [i, {"n": i}]} for i in range(50)])
+    expected = eager.get_all()
+
+    lazy = JsonDB(db_path, lazy=True)
+    assert lazy.get_all() == expected
+    assert os.path.isfile(db_path + ".offsets")
+    record_id = next(iter(expected))
+    assert lazy.get_by_id(record_id) == expected[record_id]
+    query = (where("app_id") == "app1") & (where("status") == 1)
+    assert lazy.get_by_query(query) == eager.get_by_query(query)
+
+    lazy.update_by_id(record_id, {"status": 5})
+    lazy.delete_by_query(where("app_id") == "app2")
+    expected[record_id]["status"] = 5
+    expected = {k: v for k, v in expected.items() if v["app_id"] != "app2"}
+    with open(db_path) as file:
+        assert json.load(file)["data"] == expected
+    assert JsonDB(db_path).get_all() == expected
+    assert JsonDB(db_path, lazy=True).get_by_columns({"app_id": "app0"}) == eager.get_by_columns({"app_id": "app0"})
+
+    result = runner.invoke(cli.app, ["enable-lazy-load", "-e", "True"])
+    assert result.exit_code == 0
+    assert "Lazy load is set to enabled." in result.output
+    result = runner.invoke(cli.app, ["enable-lazy-load", "-e", "False"])
+    assert result.exit_code == 0
+
+def test_snapshot(tmp_path):
+    """
+    The function `test_snapshot` checks the binary snapshot storage engine and the export and import of
+    a database as a PysonDB JSON file.
+    """
+    snap_path = str(tmp_path / "endpoints.snap")
+    assert database.init_database(snap_path, "snapshot") == SUCCESS
+    handler = database.DatabaseHandler(snap_path, "snapshot")
+    records = handler.write_items([{"app_id": "app1", "name": f"end point {i}", "status": 1, "tags": [i]} for i in range(5)]).item_list
+    with open(snap_path, "rb") as file:
+        assert file.read(8) == b"ADCASNAP"
+    assert database.DatabaseHandler(snap_path, "snapshot").read_items().item_list == records
+
+    json_path = str(tmp_path / "endpoints.json")
+    assert database.export_database(snap_path, "snapshot", json_path).error == SUCCESS
+    with open(json_path) as file:
+        assert json.load(file)["data"] == records
+    database.init_database(snap_path, "snapshot")
+    assert database.import_database(json_path, snap_path, "snapshot").error == SUCCESS
+    assert database.DatabaseHandler(snap_path, "snapshot").read_items().item_list == records
+
+    result = runner.invoke(cli.app, ["export-database", "endpoint", str(tmp_path / "export.json")])
+    assert result.exit_code == 0
+    assert "Exported" in result.output
+    result = runner.invoke(cli.app, ["import-database", "endpoint", str(tmp_path / "export.json"), "-f"])
+    assert result.exit_code == 0
+    assert "Imported" in result.output
+
+def test_concurrent_writers(tmp_path):
+    """
+    The function `test_concurrent_writers` checks that changes kept in memory by write-back mode are
+    applied on top of the writes another process made in the meantime instead of overwriting them.
+    """
+    db_path = str(tmp_path / "endpoints.json")
+    database.init_database(db_path)
+    scheduler = JsonDB(db_path)
+    operator = JsonDB(db_path)
+    first, second = scheduler.add_many([{"name": "first", "status": 1}, {"name": "second", "status": 1}], json_response=True)
+    revision = scheduler.revision()
+
+    scheduler.set_write_back(True)
+    scheduler.update_by_query(where("name") == "first", {"status": 2})
+    scheduler.add({"name": "third", "status": 1})
+    operator.update_by_id(second, {"status": 3})
+    operator.add({"name": "fourth", "status": 1})
+    scheduler.set_write_back(False)
+
+    statuses = {record["name"]: record["status"] for record in JsonDB(db_path).get_all().values()}
+    assert statuses == {"first": 2, "second": 3, "third": 1, "fourth": 1}
+    assert scheduler.revision() == operator.revision() > revision
+
+def test_run_history_stats(tmp_path):
+    """
+    The function `test_run_history_stats` records sync runs and checks the statistics computed from them
+    and the `stats` command.
+    """
+    np = pytest.importorskip("numpy")
+    history = RunHistory(str(tmp_path / "endpoints.runs"))
+    latencies = {("1", "11"): [0.5, 1.0, 2.0, 4.0], ("1", "12"): [3.0], ("2", "21"): [1.0, 1.0]}
+    for (app_id, endpoint_id), values in latencies.items():
+        for i, latency in enumerate(values):
+            history.record(app_id, endpoint_id, 1000.0, 1000.0 + latency, pages=2, records=10, response_bytes=2048, http_status=200 if i else 500, failed=not i)
+    runs = history.load()
+    assert len(runs) == len(history) == 7
+
+    stats = {(row["app_id"], row["endpoint_id"]): row for row in compute_stats(runs)}
+    row = stats[("1", "11")]
+    assert row["runs"] == 4 and row["failures"] == 1 and row["failure_rate"] == 0.25
+    for q in (50, 95, 99):
+        assert row[f"p{q}"] == pytest.approx(np.percentile(latencies[("1", "11")], q))
+    assert row["records_per_second"] == pytest.approx(40 / 7.5)
+    per_app = {row["app_id"]: row for row in compute_stats(runs, by_endpoint=False)}
+    assert per_app["1"]["runs"] == 5 and per_app["2"]["records"] == 20
+
+    history_path = get_history_path(database.get_database_path(config.CONFIG_FILE_PATH, "endpoint"))
+    RunHistory(history_path).record("1", "11", 1000.0, 1001.0, records=5)
+    result = runner.invoke(cli.app, ["stats"])
+    assert result.exit_code == 0
+    assert "Sync run statistics" in result.output
+    result = runner.invoke(cli.app, ["stats", "--by-app"])
+    assert result.exit_code == 0
+
+def test_run_history_concurrent_records(tmp_path):
+    """
+    The function `test_run_history_concurrent_records` checks that the runs recorded at the same time by
+    several threads, each with its own `RunHistory` of the same file, are all kept whole.
+    """
+    history_path = str(tmp_path / "endpoints.runs")
+    thread_count, run_count = 8, 200
+
+    def _record(thread_number):
+        for run_number in range(run_count):
+            RunHistory(history_path).record(str(thread_number + 1), str(run_number), 1000.0, 1000.0 + run_number, pages=thread_number, records=run_number)
+
+    threads = [threading.Thread(target=_record, args=(thread_number,)) for thread_number in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert RunHistory(history_path).lock is RunHistory(str(tmp_path / "." / "endpoints.runs")).lock
+    assert len(RunHistory(history_path)) == thread_count * run_count
+    with open(history_path, "rb") as file:
+        rows = [row[:6] for row in RUN_STRUCT.iter_unpack(file.read())]
+    assert sorted(rows) == sorted(
+        (thread_number + 1, run_number, 1000.0, 1000.0 + run_number, thread_number, run_number)
+        for thread_number in range(thread_count) for run_number in range(run_count)
+    )
+
+def test_bulk_import_export(tmp_path):
+    """
+    The function `test_bulk_import_export` imports applications from a JSON Lines file and endpoints
+    from a CSV file, checks that a batch with a rejected record writes nothing, and exports the records
+    back.
+    """
+    apps_path = tmp_path / "apps.jsonl"
+    apps_path.write_text("\n".join(json.dumps({
+        "name": f"Bulk App {i}", "short_name": f"bulkapp{i}", "host": "bulk.example.com", "dump_path": str(tmp_path / f"dump{i}"),
+        "default_filters": [{"column_name": "CREATED_AT", "operator": ">", "column_value": "01-01-2023 00:00:00"}],
+    }) for i in range(2)))
+    result = runner.invoke(cli.app, ["import", "app", str(apps_path)])
+    assert result.exit_code == 0
+    assert "Imported 2 app records" in result.output
+    assert os.path.isdir(tmp_path / "dump1")
+
+    endpoints_path = tmp_path / "endpoints.csv"
+    endpoints_path.write_text(
+        "name,app_short_name,url_endpoint,page_size,payload\n"
+        + "".join(f'Bulk Endpoint {i},bulkapp{i % 2},bulk-api-{i},50,"{{""table_name"": ""t{i}""}}"\n' for i in range(10))
+    )
+    result = runner.invoke(cli.app, ["import", "endpoint", str(endpoints_path)])
+    assert result.exit_code == 0
+    assert "Imported 10 endpoint records" in result.output
+    endpoints = autonomousagent.Endpoints(database.get_database_path(config.CONFIG_FILE_PATH, "endpoint"))
+    imported = endpoints.get_endpoint_by_name("Bulk Endpoint 3").endpoint
+    assert [(record["page_size"], record["payload"]) for record in imported.values()] == [(50, {"table_name": "t3"})]
+    count = endpoints.count_endpoints()
+
+    rejected_path = tmp_path / "rejected.jsonl"
+    rejected_path.write_text("\n".join([
+        json.dumps({"name": "Bulk Endpoint 11", "app_short_name": "bulkapp0", "url_endpoint": "bulk-api-11"}),
+        json.dumps({"name": "Bulk Endpoint 1", "app_short_name": "bulkapp1", "url_endpoint": "bulk-api-1"}),
+        json.dumps({"name": "Bulk Endpoint 12", "app_short_name": "missing", "url_endpoint": "bulk-api-12"}),
+        json.dumps({"name": "Bulk Endpoint 13", "app_short_name": "bulkapp0", "url_endpoint": "bulk-api-13", "method": "PUT"}),
+    ]))
+    result = runner.invoke(cli.app, ["import", "endpoint", str(rejected_path)])
+    assert result.exit_code == 1
+    assert "line 2: duplicate endpoint" in result.output
+    assert "line 3: application 'missing' not found" in result.output
+    assert "line 4: method must be GET or POST" in result.output
+    assert endpoints.count_endpoints() == count
+
+    export_path = tmp_path / "export.jsonl"
+    result = runner.invoke(cli.app, ["export", "endpoint", str(export_path)])
+    assert result.exit_code == 0
+    exported = [json.loads(line) for line in export_path.read_text().splitlines()]
+    assert len(exported) == count
+    assert {"name": "Bulk Endpoint 3", "app_short_name": "bulkapp1", "page_size": 50}.items() <= next(
+        record for record in exported if record["name"] == "Bulk Endpoint 3"
+    ).items()
+    result = runner.invoke(cli.app, ["export", "app", str(tmp_path / "apps.csv")])
+    assert result.exit_code == 0
+    assert "bulkapp1" in (tmp_path / "apps.csv").read_text()
+
+def test_add_many(tmp_path):
+    """
+    The function `test_add_many` checks that a batch adds its valid records with per-row errors for the
+    rejected ones, and that an atomic batch with a rejected record writes nothing.
+    """
+    apps = autonomousagent.Applications(database.get_database_path(config.CONFIG_FILE_PATH, "app"))
+    result = apps.add_many([
+        {"name": "Many App 0", "short_name": "manyapp0", "host": "many.example.com", "dump_path": str(tmp_path / "many0")},
+        {"name": "Many App 0", "short_name": "manyapp1", "host": "many.example.com", "dump_path": str(tmp_path / "many1")},
+        {"name": "Many App 2", "short_name": "manyapp2", "host": "many.example.com", "dump_path": str(tmp_path / "many2"), "auth_type": "TOKEN"},
+    ])
+    assert result.error == SUCCESS
+    assert [record["short_name"] for record in result.records.values()] == ["manyapp0"]
+    assert result.errors == [(1, "duplicate application name 'Many App 0'"), (2, "auth_type must be NONE, KEYCLOAK or BASIC")]
+    assert os.path.isdir(tmp_path / "many0")
+
+    endpoints = autonomousagent.Endpoints(database.get_database_path(config.CONFIG_FILE_PATH, "endpoint"))
+    batch = [
+        {"name": f"Many Endpoint {i}", "app_short_name": "manyapp0", "url_endpoint": f"many-api-{i}", "last_sync": "01-01-2023 00:00:00"}
+        for i in range(3)
+    ]
+    result = endpoints.add_many(batch + [dict(batch[1]), {"name": "Many Endpoint 4", "app_short_name": "missing", "url_endpoint": "x"}])
+    assert result.error == SUCCESS
+    assert len(result.records) == 3
+    assert [index for index, _ in result.errors] == [3, 4]
+    assert all(isinstance(record["last_sync"], float) for record in result.records.values())
+    count = endpoints.count_endpoints()
+
+    result = endpoints.add_many([
+        {"name": "Many Endpoint 5", "app_short_name": "manyapp0", "url_endpoint": "many-api-5"},
+        {"name": "Many Endpoint 0", "app_short_name": "manyapp0", "url_endpoint": "many-api-0"},
+    ], atomic=True)
+    assert result.records == {}
+    assert result.errors[0][0] == 1
+    assert endpoints.count_endpoints() == count
+
+def test_normalize_records(tmp_path):
+    """
+    The function `test_normalize_records` checks that the records are written with native types and
+    timestamps, and that records written by older versions are migrated.
+    """
+    legacy = {
+        "app_id": "1", "name": "legacy", "payload": '{"table_name": "t"}', "filters": "[]", "page_size": "50",
+        "last_sync": "15-03-2023 10:58:15", "failed_time": "", "failed_count": 0, "process_status": 0, "status": 1,
+    }
+    db_path = str(tmp_path / "endpoints.json")
+    with open(db_path, "w") as f:
+        json.dump({"version": 2, "keys": sorted(legacy), "data": {"100000000000000001": legacy}}, f)
+    handler = database.get_database_handler(db_path, "json")
+    added = handler.add_item(dict(legacy, name="added")).item_list[0]
+    record = handler.get_by_id(added).item_list[0]
+    assert is_normalized(record)
+    assert record["payload"] == {"table_name": "t"} and record["page_size"] == 50 and record["failed_time"] is None
+    assert format_timestamp(record["last_sync"]) == "15-03-2023 10:58:15"
+    assert handler.update_by_id(added, {"last_sync": "not a date"}).error == database.JSON_ERROR
+
+    result = database.normalize_database(db_path, "json")
+    assert result.error == SUCCESS and result.item_list == ["100000000000000001"]
+    assert handler.get_by_id("100000000000000001").item_list[0] == record | {"name": "legacy"}
+    assert database.normalize_database(db_path, "json").item_list == []
+
+def test_app_resolver(tmp_path, monkeypatch):
+    """
+    The function `test_app_resolver` checks that the cached application names follow the changes made
+    through `Applications` and, through a `DatabaseWatcher`, by other processes, and that the sync state
+    updates do not read them again.
+    """
+    result = runner.invoke(cli.app, ["add-app", "Resolver App", "--short-name", "resolverapp", "--host", "resolver.com", "--dump-path", str(tmp_path)])
+    assert result.exit_code == 0
+    resolver = get_app_resolver()
+    app_id = resolver.id_by_short_name("resolverapp")
+    assert app_id and resolver.id_by_name("Resolver App") == app_id
+    assert autonomousagent.get_application_id_by_short_name("resolverapp") == app_id
+
+    app_db_path = database.get_database_path(config.CONFIG_FILE_PATH, "app")
+    applications = autonomousagent.Applications(app_db_path)
+    assert applications.update_app(app_id, {"short_name": "resolverapp2"}).error == SUCCESS
+    assert resolver.id_by_short_name("resolverapp") is None
+    assert resolver.short_name_by_id(app_id) == "resolverapp2"
+
+    reads = []
+    monkeypatch.setattr(app_resolver, "get_database_handler", lambda db_path: reads.append(db_path) or database.get_database_handler(db_path))
+    assert applications.update_app_process_status(app_id, 1).error == SUCCESS
+    assert resolver.short_name_by_id(app_id) == "resolverapp2" and reads == []
+
+    # another process renames the application
+    watcher = DatabaseWatcher({"app": database.get_database_handler(app_db_path)})
+    other = database.open_storage(app_db_path, database.get_storage_engine(config.CONFIG_FILE_PATH))
+    other.update_by_id(app_id, {"short_name": "resolverapp3"})
+    assert watcher.poll() == ["app"]
+    assert resolver.short_names()[app_id] == "resolverapp3" and len(reads) == 1
+
+    assert applications.remove(app_id).error == SUCCESS
+    assert resolver.id_by_short_name("resolverapp3") is None
+
+def test_request_spec_cache(tmp_path):
+    """
+    The function `test_request_spec_cache` checks that the request spec of an endpoint merges the
+    defaults of its application once, and is built again after a change event of the endpoint or of the
+    application.
+    """
+    apps = autonomousagent.Applications(database.get_database_path(config.CONFIG_FILE_PATH, "app"))
+    apps.add_many([{
+        "name": "Spec App", "short_name": "specapp", "host": "spec.example.com", "dump_path": str(tmp_path),
+        "auth_type": "BASIC", "auth_data": {"key": "k"}, "default_payload": {"table_name": "t"}, "default_page_size": 20,
+    }])
+    endpoints = autonomousagent.Endpoints(database.get_database_path(config.CONFIG_FILE_PATH, "endpoint"))
+    endpoint_id = next(iter(endpoints.add_many([{"name": "Spec Endpoint", "app_short_name": "specapp", "url_endpoint": "spec-api"}]).records))
+    app_id = get_app_resolver().id_by_short_name("specapp")
+    app_data = apps.get_app_by_id(app_id).application
+    # filters filled with the last sync datetime are not accepted on write, the scheduler may still meet them
+    app_data["default_filters"] = [{"column_name": "UPDATED_AT", "operator": ">", "column_value": ""}]
+    endpoint_data = endpoints.get_endpoint_fields(list(ENDPOINT_SPEC_FIELDS) + ["app_id"])[endpoint_id]
+
+    cache = get_request_spec_cache()
+    spec = cache.get(app_id, app_data, endpoint_id, endpoint_data)
+    assert spec.url == "https://spec.example.com/spec-api"
+    assert spec.headers["Authorization"].startswith("Basic ")
+    request_data = spec.request_data(1672531200.0)
+    assert (request_data["page_size"], request_data["table_name"]) == (1000, "t")
+    assert json.loads(request_data["filters"])[0]["column_value"] == format_timestamp(1672531200.0)
+    assert spec.filters[0]["column_value"] == ""
+    assert cache.get(app_id, dict(app_data), endpoint_id, dict(endpoint_data)) is spec
+
+    assert endpoints.update_endpoint(endpoint_id, {"page_size": 5}).error == SUCCESS
+    endpoint_data["page_size"] = 5
+    spec = cache.get(app_id, app_data, endpoint_id, endpoint_data)
+    assert spec.page_size == 5
+    # the sync state updates keep the spec
+    assert endpoints.update_endpoint_process_status(endpoint_id, 1).error == SUCCESS
+    assert cache.get(app_id, app_data, endpoint_id, endpoint_data) is spec
+
+    # a change made by another process is seen through the watcher
+    app_db_path = database.get_database_path(config.CONFIG_FILE_PATH, "app")
+    watcher = DatabaseWatcher({"app": database.get_database_handler(app_db_path)})
+    other = database.open_storage(app_db_path, database.get_storage_engine(config.CONFIG_FILE_PATH))
+    other.update_by_id(app_id, {"host": "other.example.com"})
+    app_data["host"] = "other.example.com"
+    assert cache.get(app_id, app_data, endpoint_id, endpoint_data) is spec
+    assert watcher.poll() == ["app"]
+    assert cache.get(app_id, app_data, endpoint_id, endpoint_data).url == "https://other.example.com/spec-api"
+
+def test_records(tmp_path):
+    """
+    The function `test_records` checks that the compact endpoint records hold the stored values, share
+    their repeated strings, copy their nested fields on first access only and take less memory than the
+    dictionary records.
+    """
+    apps = autonomousagent.Applications(database.get_database_path(config.CONFIG_FILE_PATH, "app"))
+    apps.add_many([{"name": "Record App", "short_name": "recordapp", "host": "record.example.com", "dump_path": str(tmp_path)}])
+    endpoints = autonomousagent.Endpoints(database.get_database_path(config.CONFIG_FILE_PATH, "endpoint"))
+    endpoints.add_many([
+        {"name": f"Record Endpoint {i}", "app_short_name": "recordapp", "url_endpoint": f"record-api-{i}", "payload": {"table_name": "records"}}
+        for i in range(500)
+    ])
+    app_id = get_app_resolver().id_by_short_name("recordapp")
+    stored = endpoints.get_endpoints_by_columns({"app_id": app_id})
+    records = endpoints.get_endpoint_records(values={"app_id": app_id})
+    assert {record_id: record.to_dict() for record_id, record in records.items()} == stored
+
+    first, second = list(records.values())[:2]
+    assert first.app_id is second.app_id and first["method"] is second["method"]
+    assert first.payload == {"table_name": "records"} and first.get("filters") == []
+    assert first.payload["table_name"] is second.payload["table_name"]
+    first.payload["table_name"] = "changed"
+    first["last_sync"] = 1672531200.0
+    assert endpoints.get_endpoint_records(values={"app_id": app_id})[first.id].payload == {"table_name": "records"}
+
+    assert next(iter(apps.get_app_records(values={"short_name": "recordapp"}).values())).host == "record.example.com"
+
+    tracemalloc.start()
+    copies = endpoints.get_endpoints_by_columns({"app_id": app_id})
+    dict_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copies
+    tracemalloc.start()
+    records = endpoints.get_endpoint_records(values={"app_id": app_id})
+    record_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert record_size < dict_size / 2
+
+def test_change_events(tmp_path):
+    """
+    The function `test_change_events` checks that the application and endpoint mutations publish change
+    events, that a rolled back transaction publishes a `CHANGED` event and that the database watcher
+    reports the writes of other processes.
+    """
+    events = []
+    unsubscribe = get_event_bus().subscribe(events.append, "endpoint")
+    apps = autonomousagent.Applications(database.get_database_path(config.CONFIG_FILE_PATH, "app"))
+    apps.add_many([{"name": "Event App", "short_name": "eventapp", "host": "event.example.com", "dump_path": str(tmp_path)}])
+    endpoint_db_path = database.get_database_path(config.CONFIG_FILE_PATH, "endpoint")
+    endpoints = autonomousagent.Endpoints(endpoint_db_path)
+    endpoint_id = next(iter(endpoints.add_many([{"name": "Event Endpoint", "app_short_name": "eventapp", "url_endpoint": "event-api"}]).records))
+    endpoints.update_endpoint_process_status(endpoint_id, 1)
+    with pytest.raises(RuntimeError):
+        with endpoints.transaction():
+            endpoints.update_endpoint_status(endpoint_id, 0)
+            raise RuntimeError("step failed")
+    endpoints.remove(endpoint_id)
+    assert [(event.kind, event.ids, event.fields) for event in events] == [
+        (ADDED, [endpoint_id], None),
+        (UPDATED, [endpoint_id], ("process_status",)),
+        (UPDATED, [endpoint_id], ("status",)),
+        (CHANGED, None, None),
+        (REMOVED, [endpoint_id], None),
+    ]
+    assert not events[1].touches(("url_endpoint", "payload")) and events[3].touches(("payload",))
+
+    handler = database.get_database_handler(endpoint_db_path)
+    watcher = DatabaseWatcher({"endpoint": handler})
+    assert watcher.poll() == []
+    other = database.open_storage(endpoint_db_path, database.get_storage_engine(config.CONFIG_FILE_PATH))
+    other.add({
+        "app_id": "x", "name": "Other Endpoint", "url_endpoint": "other-api", "method": "GET", "payload": {}, "filters": [],
+        "page_size": 1, "last_sync": None, "process_status": 0, "failed_count": 0, "failed_time": None, "status": 1,
+    })
+    events.clear()
+    assert watcher.poll() == ["endpoint"]
+    assert [(event.kind, event.external) for event in events] == [(CHANGED, True)]
+    unsubscribe()
+    watcher.poll()
+    assert len(events) == 1
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_watcher_skips_own_writes(tmp_path, monkeypatch, engine):
+    """
+    The function `test_watcher_skips_own_writes` checks that a running database watcher does not report
+    the writes made through `Endpoints` and `Applications` of the current process as external changes,
+    while the writes of another process still are.
+    """
+    monkeypatch.setattr(database, "get_storage_engine", lambda config_file: engine)
+    db_paths = {item_type: str(tmp_path / f"{item_type}{database.STORAGE_ENGINES[engine]}") for item_type in ("app", "endpoint")}
+    monkeypatch.setattr(app_resolver, "get_database_path", lambda config_file, item_type: db_paths[item_type])
+    for db_path in db_paths.values():
+        database.init_database(db_path, engine)
+    apps = autonomousagent.Applications(db_paths["app"])
+    app_id = next(iter(apps.add_many([{"name": "Own App", "short_name": "ownapp", "host": "own.example.com", "dump_path": str(tmp_path)}]).records))
+    endpoints = autonomousagent.Endpoints(db_paths["endpoint"])
+    endpoint_id = next(iter(endpoints.add_many([{"name": "Own Endpoint", "app_short_name": "ownapp", "url_endpoint": "own-api"}]).records))
+
+    events = []
+    unsubscribe = get_event_bus().subscribe(lambda event: event.external and events.append(event))
+    watcher = DatabaseWatcher({item_type: database.get_database_handler(db_path) for item_type, db_path in db_paths.items()}, interval=0.01)
+    watcher.start()
+    try:
+        for process_status in (1, 0, 1):
+            endpoints.update_endpoint_process_status(endpoint_id, process_status)
+            apps.update_app_process_status(app_id, process_status)
+            time.sleep(0.03)
+        with endpoints.transaction():
+            endpoints.update_endpoint_status(endpoint_id, 0)
+            endpoints.update_endpoint_process_status(endpoint_id, 0)
+        time.sleep(0.05)
+        assert events == []
+
+        other = database.open_storage(db_paths["endpoint"], engine)
+        other.update_by_id(endpoint_id, {"status": 1})
+        for _ in range(100):
+            if events:
+                break
+            time.sleep(0.01)
+        assert [(event.item_type, event.kind) for event in events] == [("endpoint", CHANGED)]
+    finally:
+        watcher.stop()
+        unsubscribe()
+        get_app_resolver().invalidate()
+
+def test_async_fetcher():
+    """
+    The function `test_async_fetcher` checks that the asyncio fetcher requests the pages of many endpoints
+    at the same time within `concurrent_requests`, retries the failed `GET` requests and reports the
+    result or error of every endpoint to its callback.
+    """
+    in_flight = {"now": 0, "max": 0}
+    failures = {"flaky": 1}
+
+    # a fake HTTP session serving 3 pages of 2 records per endpoint
+    class FakeResponse:
+        headers = {}
+
+        def __init__(self, url):
+            self.url = url
+
+        async def __aenter__(self):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            if "broken" in self.url:
+                self.status = 404
+            elif "flaky" in self.url and failures["flaky"]:
+                failures["flaky"] -= 1
+                self.status = 503
+            else:
+                self.status = 200
+            return self
+
+        async def __aexit__(self, *args):
+            in_flight["now"] -= 1
+
+        async def read(self):
+            page_number = int(self.url.split("page_number=")[1])
+            return json.dumps({"total": 6, "data": [page_number] * 2, "response_time": f"0{page_number}-01-2024 00:00:00"}).encode()
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        def request(self, method, url, headers=None, **kwargs):
+            return FakeResponse(url)
+
+    fetcher = AsyncFetcher(4, session_factory=FakeSession)
+    done = {}
+    runs = {}
+
+    def make_task(name):
+        async def task(session):
+            runs[name] = {"pages": 0, "records": 0, "response_bytes": 0, "http_status": 0, "retries": 0}
+            return await fetcher.fetch_pages(session, "GET", f"http://example.com/{name}", {"page_size": 2}, {}, runs[name])
+        return task
+
+    names = [f"endpoint{number}" for number in range(10)] + ["flaky", "broken"]
+    fetcher.run([(make_task(name), lambda result, error, name=name: done.__setitem__(name, (result, error))) for name in names])
+
+    assert in_flight["max"] == 4
+    assert done["endpoint0"] == (([1, 1, 2, 2, 3, 3], "03-01-2024 00:00:00"), None)
+    assert done["flaky"][0] == done["endpoint0"][0] and runs["flaky"]["retries"] == 1 and runs["flaky"]["pages"] == 3
+    assert done["broken"][0] is None and "404" in str(done["broken"][1])
+    assert config.get_fetch_config() == {"mode": "threads", "concurrent_requests": 100, "page_parallelism": 1}
+
+def test_parallel_pages():
+    """
+    The function `test_parallel_pages` checks that once the first page tells the total, the pages left
+    are requested at the same time, at most `page_parallelism` of them, and read in page order, with the
+    worker threads and with the asyncio fetcher.
+    """
+    assert page_count(10, 3) == 4 and page_count(9, 3) == 3 and page_count(5, 0) == 1
+
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+
+    def fetch_page(page_number):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        # the later pages answer first
+        time.sleep(0.05 / page_number)
+        with lock:
+            in_flight["now"] -= 1
+        return page_number
+
+    pool = WorkerPool(8)
+    assert list(fetch_in_order(fetch_page, range(2, 11), 3, pool.submit)) == list(range(2, 11))
+    assert in_flight["max"] == 3
+    pool.shutdown()
+
+    # a fake endpoint of 20 records served 2 by page
+    class FakeResponse:
+        headers = {}
+
+        def __init__(self, url):
+            self.url = url
+            self.page_number = int(url.split("page_number=")[1])
+
+        async def __aenter__(self):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01 / self.page_number)
+            self.status = 200
+            return self
+
+        async def __aexit__(self, *args):
+            in_flight["now"] -= 1
+
+        async def read(self):
+            data = [self.page_number * 10, self.page_number * 10 + 1]
+            return json.dumps({"total": 20, "data": data, "response_time": f"{self.page_number:02}-01-2024 00:00:00"}).encode()
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        def request(self, method, url, headers=None, **kwargs):
+            return FakeResponse(url)
+
+    in_flight["max"] = 0
+    fetcher = AsyncFetcher(100, session_factory=FakeSession, page_parallelism=4)
+    done = {}
+    run = {"pages": 0, "records": 0, "response_bytes": 0, "http_status": 0, "retries": 0}
+
+    async def task(session):
+        return await fetcher.fetch_pages(session, "GET", "http://example.com/table", {"page_size": 2}, {}, run)
+
+    fetcher.run([(task, lambda result, error: done.update(result=result, error=error))])
+    records, response_time = done["result"]
+    assert done["error"] is None and in_flight["max"] == 4 and run["pages"] == 10
+    assert records == [number for page_number in range(1, 11) for number in (page_number * 10, page_number * 10 + 1)]
+    assert response_time == "10-01-2024 00:00:00"
+
+def test_due_queue():
+    """
+    The function `test_due_queue` checks that the due queue gives the earliest due application, that a
+    rescheduled application keeps one live entry and that an application left due by a sync is deferred
+    until its `next_sync` changes.
+    """
+    queue = DueQueue()
+    assert queue.next_due() is None
+    queue.rebuild({"1": {"next_sync": 300.0}, "2": {"next_sync": 100.0}, "3": {"next_sync": 200.0}})
+    assert queue.next_due() == 100.0 and len(queue) == 3
+    queue.schedule("2", 400.0)
+    assert queue.next_due() == 200.0 and len(queue) == 3
+    queue.schedule("4")
+    assert queue.next_due() == 0.0
+
+    # "4" and "3" are still due after a sync at 250
+    assert queue.defer_due(250.0, 310.0) == ["4", "3"]
+    assert queue.next_due() == 300.0
+    queue.rebuild({"1": {"next_sync": 300.0}, "3": {"next_sync": 200.0}, "4": {"next_sync": None}})
+    assert queue.next_due() == 300.0 and "2" not in queue
+    # a new next_sync ends the deferral
+    queue.schedule("3", 150.0)
+    assert queue.next_due() == 150.0
+
+@pytest.mark.parametrize("threading_enabled", ["True", "False"])
+def test_scheduler_idle(monkeypatch, threading_enabled):
+    """
+    The function `test_scheduler_idle` checks that the service loop waits for a change, without a
+    tick, when no application is active.
+    """
+    scheduler = pytest.importorskip("autonomous_data_collection_agent.scheduler")
+
+    class FakeWatcher:
+        def sync(self):
+            pass
+
+        def stop(self):
+            pass
+
+    service = scheduler.SchedulerService.__new__(scheduler.SchedulerService)
+    service._due = DueQueue()
+    service._apps_changed = threading.Event()
+    service._pool = WorkerPool()
+    service._page_pool = WorkerPool()
+    ticks = []
+    waits = []
+    service.normalize_databases = lambda: None
+    service.watch_databases = FakeWatcher
+    service.process_applications = lambda *args, **kwargs: ticks.append(args)
+    # the first wait is stopped by the stop signal
+    service.wait_for_next_tick = lambda timeout: waits.append(timeout) or True
+    monkeypatch.setattr(config, "get_threading_config", lambda: {"enabled": threading_enabled, "concurrent_threads": "2"})
+
+    service.main()
+    assert ticks == [] and waits == [None]
+
+def test_scheduler_spec_reuse(tmp_path, monkeypatch):
+    """
+    The function `test_scheduler_spec_reuse` checks that the scheduler running an endpoint on two ticks,
+    with the database watcher running, reuses the request spec built by the first tick.
+    """
+    scheduler = pytest.importorskip("autonomous_data_collection_agent.scheduler")
+    db_paths = {item_type: str(tmp_path / f"{item_type}.json") for item_type in ("app", "endpoint")}
+    monkeypatch.setattr(database, "get_storage_engine", lambda config_file: "json")
+    monkeypatch.setattr(database, "get_database_path", lambda config_file, item_type: db_paths[item_type])
+    monkeypatch.setattr(app_resolver, "get_database_path", lambda config_file, item_type: db_paths[item_type])
+    for db_path in db_paths.values():
+        database.init_database(db_path)
+    apps = autonomousagent.Applications(db_paths["app"])
+    app_id = next(iter(apps.add_many([{"name": "Tick App", "short_name": "tickapp", "host": "tick.example.com", "dump_path": str(tmp_path)}]).records))
+    endpoints = autonomousagent.Endpoints(db_paths["endpoint"])
+    endpoint_id = next(iter(endpoints.add_many([{"name": "Tick Endpoint", "app_short_name": "tickapp", "url_endpoint": "tick-api"}]).records))
+
+    class FakeResponse:
+        status_code = 200
+        content = b"{}"
+        raw = None
+
+        def json(self):
+            return {"total": 1, "data": [{"id": 1}]}
+
+    class FakeSession:
+        def mount(self, prefix, adapter):
+            pass
+
+        def get(self, url, headers=None):
+            return FakeResponse()
+
+    monkeypatch.setattr(scheduler.requests, "Session", FakeSession)
+    cache = get_request_spec_cache()
+    specs = []
+    cached_get = cache.get
+    monkeypatch.setattr(cache, "get", lambda *args: specs.append(cached_get(*args)) or specs[-1])
+    service = scheduler.SchedulerService.__new__(scheduler.SchedulerService)
+    service._pool = WorkerPool()
+    service._page_pool = WorkerPool()
+    service.save_response = lambda *args: None
+    service.record_run = lambda *args: None
+    watcher = DatabaseWatcher({item_type: database.get_database_handler(db_path) for item_type, db_path in db_paths.items()}, interval=0.01)
+    watcher.start()
+    try:
+        for _ in range(2):
+            service.process_applications()
+            assert apps.get_app_by_id(app_id).application["process_status"] == 0
+            # the application is due again on the next tick, once the watcher saw the writes
+            apps.update_app(app_id, {"next_sync": None})
+            time.sleep(0.05)
+    finally:
+        watcher.stop()
+        service._pool.shutdown()
+        service._page_pool.shutdown()
+        get_app_resolver().invalidate()
+    assert len(specs) == 2 and specs[0] is specs[1]
+    cache.invalidate_endpoint(endpoint_id)
+
+def test_host_limits():
+    """
+    The function `test_host_limits` checks the token bucket, the `Retry-After` parsing and that an
+    endpoint of a host without free connection is queued and started by the endpoint leaving the host.
+    """
+    now = [0.0]
+    bucket = TokenBucket(2, clock=lambda: now[0])
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+    now[0] = 1.5
+    assert bucket.delay() == 0
+    bucket.consume(5)
+    assert bucket.delay() == 1.5
+
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480.0) == 10.0
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
+
+    limiter = HostLimiter(max_connections=2)
+    started = []
+    assert limiter.enter_or_queue(lambda: started.append("a"))
+    assert limiter.enter_or_queue(lambda: started.append("b"))
+    assert not limiter.enter_or_queue(lambda: started.append("c"))
+    assert not limiter.enter_or_queue(lambda: started.append("d"))
+    limiter.leave()
+    assert started == ["c"] and limiter.in_use == 2
+    limiter.configure(max_connections=3)
+    assert started == ["c", "d"] and limiter.in_use == 3
+    assert limiter.request_delay() == 0
+
+    pool = WorkerPool(2)
+    limiter = HostLimiter(max_connections=1)
+    running = {"now": 0, "max": 0}
+
+    def endpoint():
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        time.sleep(0.01)
+        running["now"] -= 1
+        limiter.leave()
+
+    for _ in range(4):
+        start = functools.partial(pool.submit, endpoint)
+        if limiter.enter_or_queue(start):
+            start()
+    assert pool.wait(10)
+    assert running["max"] == 1 and limiter.in_use == 0
+    pool.shutdown()
+
+def test_worker_pool():
+    """
+    The function `test_worker_pool` checks that the worker pool runs its tasks at the same time and that
+    the completion callbacks get the result or the error of every task before `wait()` returns.
+    """
+    pool = WorkerPool(4)
+    # the tasks only pass the barrier when 4 of them run at the same time
+    barrier = threading.Barrier(4, timeout=5)
+    done = {}
+
+    def task(number):
+        barrier.wait()
+        if number == 3:
+            raise ValueError("task failed")
+        return number * 10
+
+    for number in range(4):
+        pool.submit(task, number, on_done=lambda result, error, number=number: done.__setitem__(number, (result, error)))
+    assert pool.wait(10)
+    assert {number: result for number, (result, _) in done.items()} == {0: 0, 1: 10, 2: 20, 3: None}
+    assert [number for number, (_, error) in done.items() if error is not None] == [3]
+
+    pool.resize(1)
+    names = set()
+    for _ in range(3):
+        pool.submit(lambda: names.add(threading.current_thread().name))
+    assert pool.wait(10) and len(names) == 1
+    pool.shutdown()
+
 def test_version_callback():
     """
     The function `test_version_callback` checks if the output of the command `--version` contains the
@@ -0,0 +1,123 @@
+"""This module provides the worker pool running the endpoint syncs of the Autonomous Data Collector Agent.
+
+The scheduler keeps one `WorkerPool` for its whole life. Every due endpoint of every due application is
+submitted to it, so up to `concurrent_threads` endpoints are synced at the same time, and the status of
+each endpoint is written by a completion callback running in the worker, right after the sync.
+"""
+
+import concurrent.futures
+import logging
+import threading
+import time
+
+# Prefix of the names of the worker threads.
+THREAD_NAME_PREFIX = 'adca-worker'
+
+
+# The `WorkerPool` class runs tasks on a long-lived thread pool. The threads are started on the first
+# submitted task and kept between the ticks of the scheduler. Each task can have a completion
+# callback, called in the worker with the result or the error of the task before the task counts as
+# done, so `wait()` returns once the bookkeeping of every task is written.
+class WorkerPool:
+    def __init__(self, max_workers: int = 2) -> None:
+        """
+        The function initializes a pool, the threads are only started when a task is submitted.
+
+        :param max_workers: The `max_workers` parameter is the maximum number of tasks running at the
+        same time
+        :type max_workers: int
+        """
+        self.lock = threading.Lock()
+        self.max_workers = max(1, int(max_workers))
+        self._executor = None
+        self._pending = set()
+
+    def resize(self, max_workers: int) -> None:
+        """
+        The function `resize` changes the number of workers. The running tasks are waited for before the
+        threads are replaced, so it should be called between two ticks.
+
+        :param max_workers: The `max_workers` parameter is the new maximum number of tasks running at the
+        same time
+        :type max_workers: int
+        """
+        max_workers = max(1, int(max_workers))
+        if max_workers == self.max_workers:
+            return
+        with self.lock:
+            executor, self._executor = self._executor, None
+            self.max_workers = max_workers
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def submit(self, task, *args, on_done=None) -> concurrent.futures.Future:
+        """
+        The function `submit` runs a task on a worker.
+
+        :param task: The `task` parameter is the callable to run
+        :param args: The `args` parameter is the positional arguments of the task
+        :param on_done: The `on_done` parameter is a callable taking the result and the error of the task,
+        the error being None when the task succeeded. It runs in the worker after the task and its
+        errors are logged
+        :return: a `Future` done once the task and its callback ran.
+        """
+        with self.lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=THREAD_NAME_PREFIX)
+            future = self._executor.submit(self._run, task, args, on_done)
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    @staticmethod
+    def _run(task, args, on_done):
+        result, error = None, None
+        try:
+            result = task(*args)
+        except Exception as e:
+            error = e
+        if on_done is not None:
+            try:
+                on_done(result, error)
+            except Exception as e:
+                logging.error(f"Completion callback {on_done!r} failed. Error Details : {str(e)}")
+        if error is not None and on_done is None:
+            raise error
+        return result
+
+    def _discard(self, future) -> None:
+        with self.lock:
+            self._pending.discard(future)
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        The function `wait` waits for the submitted tasks to be done, callbacks included, and for the
+        tasks they submit before they are done.
+
+        :param timeout: The `timeout` parameter is the maximum number of seconds to wait, no limit when
+        it is None
+        :type timeout: float
+        :return: `True` when every task is done, `False` when the timeout expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                pending = list(self._pending)
+            if not pending:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            concurrent.futures.wait(pending, timeout=remaining)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        The function `shutdown` stops the threads of the pool, a later task starts new ones.
+
+        :param wait: The `wait` parameter tells whether to wait for the submitted tasks
+        :type wait: bool
+        """
+        with self.lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)